@@ -0,0 +1,226 @@
+import asyncio
+import math
+import time
+from collections import Counter, OrderedDict, deque
+
+from app.telemetry import observe_admission, observe_admission_rejected, observe_admission_wait
+
+STAGES = ("inference", "llm")
+_HOLD_EWMA_ALPHA = 0.1  # Smoothing for the average time a request holds a stage slot
+MAX_RETRY_AFTER_S = 30
+
+
+class AdmissionRejected(Exception):
+    """A request turned away before any work (or before its first chunk) was sent."""
+
+    def __init__(self, status_code: int, reason: str, retry_after: int, stage: str | None = None):
+        super().__init__(reason)
+        self.status_code = status_code  # 429 for this client's own limit, 503 when the server is full
+        self.reason = reason
+        self.retry_after = retry_after
+        self.stage = stage
+
+
+class StageLimiter:
+    """Concurrency limit for one pipeline stage, with a bounded, per-client fair wait queue.
+
+    A request takes a free slot immediately if there is one. Otherwise it waits, up to
+    `timeout_s`, in a queue of at most `max_queue` requests. Freed slots go to waiting
+    clients in round-robin order, so one client with many queued requests can't starve
+    the others. The asyncio state is only touched from the event loop.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, timeout_s: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout_s = timeout_s
+        self.active = 0
+        self.queued = 0
+        self._waiters: OrderedDict[str, deque] = OrderedDict()
+        self.avg_hold_s = 1.0  # Updated as requests release their slots
+        self.admitted = self.waited = 0
+        self.wait_s = 0.0
+        self.rejected: Counter = Counter()
+
+    def full(self) -> bool:
+        return self.active >= self.limit and self.queued >= self.max_queue
+
+    def retry_after(self) -> int:
+        # Time for the queue ahead to drain, from the average slot hold time
+        estimate = (self.queued + 1) / max(self.limit, 1) * self.avg_hold_s
+        return min(max(math.ceil(estimate), 1), MAX_RETRY_AFTER_S)
+
+    def reject(self, reason: str, status_code: int = 503) -> AdmissionRejected:
+        self.rejected[reason] += 1
+        observe_admission_rejected(self.name, reason)
+        return AdmissionRejected(status_code, reason, self.retry_after(), self.name)
+
+    def _observe(self):
+        observe_admission(self.name, self.active, self.queued)
+
+    async def acquire(self, client: str) -> float:
+        """Take a slot for `client`; returns the time spent queued. Raises AdmissionRejected."""
+        if self.active < self.limit and not self.queued:
+            self.active += 1
+            self.admitted += 1
+            self._observe()
+            observe_admission_wait(self.name, 0.0)
+            return 0.0
+        if self.queued >= self.max_queue:
+            raise self.reject("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue = self._waiters.setdefault(client, deque())
+        queue.append(waiter)
+        self.queued += 1
+        self._observe()
+        t0 = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.timeout_s)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # Handed a slot just as this request gave up: pass it on
+            else:
+                self._remove(client, waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise self.reject("queue_timeout") from None
+        waited = time.perf_counter() - t0
+        self.admitted += 1
+        self.waited += 1
+        self.wait_s += waited
+        observe_admission_wait(self.name, waited)
+        return waited
+
+    def _remove(self, client: str, waiter):
+        queue = self._waiters.get(client)
+        if queue is None or waiter not in queue:
+            return  # Already popped by release()
+        queue.remove(waiter)
+        self.queued -= 1
+        if not queue:
+            del self._waiters[client]
+        self._observe()
+
+    def release(self, held_s: float | None = None):
+        if held_s is not None:
+            self.avg_hold_s += _HOLD_EWMA_ALPHA * (held_s - self.avg_hold_s)
+        while self._waiters:
+            client, queue = next(iter(self._waiters.items()))
+            waiter = queue.popleft()
+            self.queued -= 1
+            if queue:
+                self._waiters.move_to_end(client)  # Round-robin between waiting clients
+            else:
+                del self._waiters[client]
+            if not waiter.done():
+                waiter.set_result(None)  # The slot passes straight to the waiter
+                self._observe()
+                return
+        self.active -= 1
+        self._observe()
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "queued_before_admission": self.waited,
+            "avg_wait_ms": 1000 * self.wait_s / max(self.waited, 1),
+            "avg_hold_ms": 1000 * self.avg_hold_s,
+            "rejected": dict(self.rejected),
+        }
+
+
+class AdmissionTicket:
+    """One admitted chat computation: holds the inference slot, then the LLM slot, then nothing."""
+
+    def __init__(self, controller: "AdmissionController", client: str):
+        self.controller = controller
+        self.client = client
+        self.stage: str | None = "inference"
+        self._stage_t0 = time.perf_counter()
+
+    def _leave_stage(self):
+        if self.stage is not None:
+            self.controller.stages[self.stage].release(time.perf_counter() - self._stage_t0)
+            self.stage = None
+
+    async def enter_llm(self):
+        """Trade the inference slot for an LLM streaming slot (waits if all are streaming)."""
+        if self.stage == "llm":
+            return
+        self._leave_stage()
+        await self.controller.stages["llm"].acquire(self.client)
+        self.stage = "llm"
+        self._stage_t0 = time.perf_counter()
+
+    def release(self):
+        # Idempotent; called when the response finishes, fails or the client disconnects
+        self._leave_stage()
+
+
+class AdmissionController:
+    """Admission control for /chat.
+
+    - Per-client limit (`enter_client`): each client (API key, or IP address) may have at
+      most `per_client_limit` requests in flight. Beyond that it gets a 429.
+    - Inference stage: intent classification, embeddings and retrieval run for at most
+      `inference_limit` requests at a time. The CPU-bound models are bounded by the
+      inference pool anyway, so more concurrency only adds queueing inside it.
+    - LLM stage: at most `llm_limit` OpenAI streams are open at once.
+    - Stage slots are taken per chat computation (`admit`), so requests sharing one through
+      app.singleflight don't take any.
+    - Each stage queues at most `max_queue` requests for up to `queue_timeout_s`. When a
+      queue is full or the wait times out, the request gets a 503 with a Retry-After
+      estimated from the queue length and the average time per stage.
+    """
+
+    def __init__(
+        self,
+        inference_limit: int = 8,
+        llm_limit: int = 64,
+        max_queue: int = 32,
+        queue_timeout_s: float = 10.0,
+        per_client_limit: int = 4,  # 0 disables the per-client limit
+    ):
+        self.stages = {
+            "inference": StageLimiter("inference", inference_limit, max_queue, queue_timeout_s),
+            "llm": StageLimiter("llm", llm_limit, max_queue, queue_timeout_s),
+        }
+        self.per_client_limit = per_client_limit
+        self._clients: Counter = Counter()
+        self.client_rejections = 0
+
+    def enter_client(self, client: str):
+        """Count a request against its client's limit; pair with `leave_client`."""
+        if self.per_client_limit and self._clients[client] >= self.per_client_limit:
+            self.client_rejections += 1
+            observe_admission_rejected("client", "client_limit")
+            raise AdmissionRejected(429, "client_limit", 1)
+        self._clients[client] += 1
+
+    async def admit(self, client: str) -> AdmissionTicket:
+        """Wait for an inference slot for one chat computation, queued fairly under `client`."""
+        llm = self.stages["llm"]
+        if llm.full():
+            # Reject up front instead of after the inference work for a request with no LLM slot
+            raise llm.reject("queue_full")
+        await self.stages["inference"].acquire(client)
+        return AdmissionTicket(self, client)
+
+    def leave_client(self, client: str):
+        self._clients[client] -= 1
+        if self._clients[client] <= 0:
+            del self._clients[client]
+
+    def stats(self) -> dict:
+        return {
+            **{name: stage.stats() for name, stage in self.stages.items()},
+            "clients": len(self._clients),
+            "per_client_limit": self.per_client_limit,
+            "client_limit_rejections": self.client_rejections,
+        }
@@ -1,23 +1,235 @@
-from app.bootstrap import chat_fn
-from app.schemas import ChatRequest
-from fastapi import APIRouter
-from fastapi.responses import StreamingResponse
+import asyncio
+import hashlib
+from functools import partial
+
+from app import bootstrap
+from app.admission import AdmissionRejected
+from app.bootstrap import batchers, caches, speculation_stats
+from app.config import (
+    ADMISSION_CLIENT_HEADER,
+    ADMISSION_TRUST_FORWARDED,
+    RECOMMEND_BATCH_MAX_QUERIES,
+    RECOMMEND_BATCH_SIZE,
+)
+from app.media_retriever import to_recommendations
+from app.schemas import ChatRequest, RecommendBatchRequest
+from app.stream_shaping import SSE_HEADERS, text_only, to_sse
+from fastapi import APIRouter, HTTPException, Request
+from app.telemetry import metrics_payload
+from app.transport import pools
+from fastapi.responses import Response, StreamingResponse
 
 router = APIRouter()
 
 
+def client_id(request: Request) -> str:
+    # Keys aren't validated here: ADMISSION_CLIENT_HEADER should be one an authenticating
+    # gateway sets, or empty, since otherwise a caller can dodge its limit by rotating keys
+    api_key = request.headers.get(ADMISSION_CLIENT_HEADER) if ADMISSION_CLIENT_HEADER else None
+    if api_key:
+        return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:16]
+    forwarded = request.headers.get("x-forwarded-for") if ADMISSION_TRUST_FORWARDED else None
+    if forwarded:
+        return "ip:" + forwarded.split(",")[0].strip()
+    return "ip:" + (request.client.host if request.client else "unknown")
+
+
+def rejection(e: AdmissionRejected) -> HTTPException:
+    detail = (
+        "Too many concurrent requests from this client"
+        if e.status_code == 429
+        else f"Server busy ({e.stage} stage: {e.reason.replace('_', ' ')})"
+    )
+    return HTTPException(status_code=e.status_code, detail=detail, headers={"Retry-After": str(e.retry_after)})
+
+
+async def release_when_done(generator, ticket):
+    # Holds the computation's stage slots until its stream ends, fails or is closed
+    try:
+        async for chunk in generator:
+            yield chunk
+    finally:
+        await generator.aclose()
+        ticket.release()
+
+
+async def stream_response(first, generator, done=None):
+    try:
+        if first is not None:
+            yield first
+        async for chunk in generator:
+            yield chunk
+    finally:
+        await generator.aclose()
+        if done is not None:
+            done()
+
+
 @router.post("/chat")
-async def chat_endpoint(req: ChatRequest):
-    def response_stream():
-        generator = chat_fn(
-            question=req.question,
-            history=req.history,
-            media_type=req.media_type,
-            genres=req.genres,
-            providers=req.providers,
-            year_range=tuple(req.year_range),
+async def chat_endpoint(req: ChatRequest, request: Request):
+    if bootstrap.chat_fn is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Models are still loading",
+            headers={"Retry-After": "5"},
         )
-        for chunk in generator:
-            yield chunk
+    chat_args = dict(
+        question=req.question,
+        history=req.history,
+        media_type=req.media_type,
+        genres=req.genres,
+        providers=req.providers,
+        year_range=tuple(req.year_range),
+    )
+    client, admission = client_id(request), bootstrap.admission
+    # Plain text by default; SSE clients also get the retrieved titles before the answer
+    sse = "text/event-stream" in request.headers.get("accept", "")
+
+    def response(stream):
+        if sse:
+            return StreamingResponse(to_sse(stream), media_type="text/event-stream", headers=SSE_HEADERS)
+        return StreamingResponse(stream, media_type="text/plain")
+
+    async def start_chat():
+        # Stage slots are per chat computation, so requests joining a shared one don't queue
+        if admission is None:
+            return bootstrap.chat_fn(**chat_args)
+        ticket = await admission.admit(client)
+        return release_when_done(bootstrap.chat_fn(**chat_args, admission_ticket=ticket), ticket)
+
+    key = bootstrap.single_flight.key(**chat_args) if bootstrap.single_flight is not None else None
+    if admission is None and key is None:
+        generator = await start_chat()
+        return response(generator if sse else text_only(generator))
+
+    done = None
+    try:
+        if admission is not None:
+            admission.enter_client(client)
+            done = partial(admission.leave_client, client)
+        generator = bootstrap.single_flight.subscribe(key, start_chat) if key is not None else await start_chat()
+    except AdmissionRejected as e:
+        if done is not None:
+            done()
+        raise rejection(e)
+
+    # Run up to the first chunk before responding, so a request turned away at admission
+    # or at the LLM stage still gets a 503 instead of an empty 200. For SSE the first chunk
+    # can be the metadata event, sent before the LLM stage; to_sse reports a rejection there
+    if not sse:
+        generator = text_only(generator)
+    try:
+        first = await anext(generator, None)
+    except BaseException as e:
+        await generator.aclose()
+        if done is not None:
+            done()
+        if isinstance(e, AdmissionRejected):
+            raise rejection(e)
+        raise
+    return response(stream_response(first, generator, done))
+
+
+@router.post("/recommend/batch")
+async def recommend_batch_endpoint(req: RecommendBatchRequest, request: Request):
+    """Ranked recommendations for many queries at once, without the LLM (precomputed pages)."""
+    if bootstrap.retriever is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Models are still loading",
+            headers={"Retry-After": "5"},
+        )
+    if len(req.queries) > RECOMMEND_BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {RECOMMEND_BATCH_MAX_QUERIES} queries per request",
+        )
+    queries = [query.model_dump(mode="json") for query in req.queries]
+    job = partial(
+        bootstrap.retriever.recommend_batch,
+        queries,
+        batch_size=RECOMMEND_BATCH_SIZE,
+        with_context=req.include_context,
+    )
+
+    # A batch takes one inference slot, like a /chat request, so it can't crowd out chat traffic
+    client, admission, ticket = client_id(request), bootstrap.admission, None
+    if admission is not None:
+        try:
+            admission.enter_client(client)
+        except AdmissionRejected as e:
+            raise rejection(e)
+        try:
+            ticket = await admission.admit(client)
+        except BaseException as e:
+            admission.leave_client(client)
+            if isinstance(e, AdmissionRejected):
+                raise rejection(e)
+            raise
+    try:
+        results = await asyncio.get_running_loop().run_in_executor(bootstrap.batch_executor, job)
+    finally:
+        if ticket is not None:
+            ticket.release()
+            admission.leave_client(client)
+
+    return {
+        "results": [
+            {"question": query["question"], "recommendations": to_recommendations(points, req.include_context)}
+            for query, points in zip(queries, results)
+        ]
+    }
+
+
+@router.get("/stats/batching")
+def batching_stats():
+    return {name: batcher.stats() for name, batcher in batchers.items()}
+
+
+@router.get("/stats/cache")
+def cache_stats():
+    stats = {name: cache.stats() for name, cache in caches.items()}
+    disk_backend = next((c.disk_backend for c in caches.values() if c.disk_backend is not None), None)
+    if disk_backend is not None:
+        stats["disk"] = disk_backend.stats()
+    if bootstrap.response_cache is not None:
+        stats["response"] = bootstrap.response_cache.stats()
+    return stats
+
+
+@router.get("/stats/speculation")
+def speculation_stats_endpoint():
+    return speculation_stats.stats()
+
+
+@router.get("/stats/admission")
+def admission_stats():
+    return bootstrap.admission.stats() if bootstrap.admission is not None else {}
+
+
+@router.get("/stats/single_flight")
+def single_flight_stats():
+    return bootstrap.single_flight.stats() if bootstrap.single_flight is not None else {}
+
+
+@router.get("/stats/bm25")
+def bm25_stats():
+    if bootstrap.bm25_reloader is not None:
+        return bootstrap.bm25_reloader.stats()
+    return {"version": bootstrap.retriever.bm25_version if bootstrap.retriever is not None else None}
+
+
+@router.get("/stats/facets")
+def facet_stats():
+    return bootstrap.facet_refresher.stats() if bootstrap.facet_refresher is not None else {}
+
+
+@router.get("/stats/http")
+def http_stats():
+    return {name: pool.stats() for name, pool in pools.items()}
+
 
-    return StreamingResponse(response_stream(), media_type="text/plain")
+@router.get("/metrics")
+def metrics():
+    body, content_type = metrics_payload()
+    return Response(body, media_type=content_type)
@@ -0,0 +1,105 @@
+import asyncio
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Callable, List
+
+
+class MicroBatcher:
+    """Collects concurrent single-item calls for a few milliseconds and runs them as one batch.
+
+    `batch_fn` receives a list of inputs and must return a list of results in the same order.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List], List],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        name: str = "batcher",
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+
+        self._queue: queue.Queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes: Counter = Counter()
+        self._items = 0
+        self._total_wait = 0.0
+        self._max_wait_seen = 0.0
+
+        self._worker = threading.Thread(
+            target=self._run, name=f"{name}-worker", daemon=True
+        )
+        self._worker.start()
+
+    def submit(self, item) -> Future:
+        future: Future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def __call__(self, item):
+        return self.submit(item).result()
+
+    async def call_async(self, item):
+        return await asyncio.wrap_future(self.submit(item))
+
+    def _collect_batch(self) -> list:
+        batch = [self._queue.get()]
+        deadline = batch[0][2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # Skip items whose caller cancelled while queued (e.g. a client disconnect); the
+            # rest are marked running so a late cancel can't race set_result
+            batch = [e for e in self._collect_batch() if e[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            self._record(len(batch), [started - enqueued for _, _, enqueued in batch])
+
+            try:
+                results = self.batch_fn([item for item, _, _ in batch])
+                # A short result list would otherwise leave the remaining callers waiting forever
+                pairs = list(zip(batch, results, strict=True))
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future, _), result in pairs:
+                future.set_result(result)
+
+    def _record(self, batch_size: int, waits: List[float]):
+        with self._stats_lock:
+            self._batch_sizes[batch_size] += 1
+            self._items += batch_size
+            self._total_wait += sum(waits)
+            self._max_wait_seen = max(self._max_wait_seen, max(waits))
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            batches = sum(self._batch_sizes.values())
+            return {
+                "name": self.name,
+                "batches": batches,
+                "items": self._items,
+                "avg_batch_size": self._items / batches if batches else 0.0,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "avg_queue_wait_ms": 1000 * self._total_wait / self._items if self._items else 0.0,
+                "max_queue_wait_ms": 1000 * self._max_wait_seen,
+                "queue_depth": self._queue.qsize(),
+            }
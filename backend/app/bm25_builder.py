@@ -0,0 +1,172 @@
+import json
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Hashable, Iterable, List
+
+import numpy as np
+
+from app.bm25_index import CompactBM25
+
+
+class IncrementalBM25:
+    """BM25 corpus statistics for one media type, updated as documents are added or removed.
+
+    Keeps per-term document frequencies, the corpus size and the total document length, so
+    idf and avgdl follow every update without refitting `rank_bm25` on the whole corpus.
+    idf uses BM25Okapi's formula, including its floor for negative idf (epsilon times the
+    average idf), so a model built here matches one fitted on the same documents.
+
+    Vocab ids are append-only: a term keeps its id for good, since documents' sparse
+    vectors in Qdrant are indexed by them. Documents added here are tracked by point id
+    (their term counts are kept), so they can later be updated or removed. Documents from
+    a model fitted offline (`from_bm25okapi`) only contribute their counts.
+    """
+
+    def __init__(
+        self,
+        vocab: Dict[str, int] | None = None,
+        df: Iterable[int] = (),
+        corpus_size: int = 0,
+        total_length: int = 0,
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25,
+    ):
+        self.vocab = dict(vocab or {})
+        self.df = list(df)  # Documents containing each term, by vocab id
+        self.df += [0] * (max(self.vocab.values(), default=-1) + 1 - len(self.df))
+        self.corpus_size = corpus_size
+        self.total_length = total_length
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self.docs: Dict[Hashable, Dict[int, int]] = {}  # Tracked point id -> term id -> tf
+
+    @classmethod
+    def from_bm25okapi(cls, model, vocab: Dict[str, int]) -> "IncrementalBM25":
+        # Document frequencies from the fitted model's per-document term counts
+        builder = cls(
+            vocab,
+            corpus_size=int(model.corpus_size),
+            total_length=int(sum(model.doc_len)),
+            k1=float(model.k1),
+            b=float(model.b),
+            epsilon=float(model.epsilon),
+        )
+        for term, df in Counter(t for doc in model.doc_freqs for t in doc).items():
+            builder.df[builder._term_id(term)] = df
+        return builder
+
+    @property
+    def avgdl(self) -> float:
+        return self.total_length / self.corpus_size if self.corpus_size else 0.0
+
+    def _term_id(self, term: str) -> int:
+        idx = self.vocab.get(term)
+        if idx is None:
+            idx = self.vocab[term] = len(self.df)
+            self.df.append(0)
+        return idx
+
+    def add(self, doc_id: Hashable, terms: List[str]):
+        """Add a document's analyzed terms; replaces an earlier version of the same document."""
+        self.remove(doc_id)
+        counts = Counter(self._term_id(term) for term in terms)
+        for idx in counts:
+            self.df[idx] += 1
+        self.corpus_size += 1
+        self.total_length += len(terms)
+        self.docs[doc_id] = dict(counts)
+
+    def remove(self, doc_id: Hashable) -> bool:
+        counts = self.docs.pop(doc_id, None)
+        if counts is None:
+            return False
+        for idx in counts:
+            self.df[idx] -= 1
+        self.corpus_size -= 1
+        self.total_length -= sum(counts.values())
+        return True
+
+    def idf(self) -> np.ndarray:
+        df = np.asarray(self.df, dtype=np.float64)
+        present = df > 0
+        idf = np.zeros(len(df))
+        idf[present] = np.log(self.corpus_size - df[present] + 0.5) - np.log(df[present] + 0.5)
+        if present.any():
+            average_idf = idf[present].mean()
+            idf[present & (idf < 0)] = self.epsilon * average_idf
+        return idf  # 0 for vocab terms no current document contains
+
+    def document_vector(self, doc_id: Hashable) -> Dict:
+        """Sparse vector of a tracked document, as stored in the collection.
+
+        BM25's term-frequency saturation and length normalization, without idf:
+        `MediaRetriever.embed_sparse` puts idf in the query vector, so the dot product of
+        the two is the document's BM25 score for the query.
+        """
+        counts = self.docs[doc_id]
+        indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        length = tf.sum()
+        weights = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / self.avgdl))
+        return {"indices": indices.tolist(), "values": weights.tolist()}
+
+    def to_compact(self, version: str | None = None) -> CompactBM25:
+        sorted_terms = sorted(self.vocab)
+        return CompactBM25(
+            terms=np.array([t.encode("utf-8") for t in sorted_terms], dtype=np.bytes_),
+            term_ids=np.array([self.vocab[t] for t in sorted_terms], dtype=np.int64),
+            idf=self.idf(),
+            avgdl=self.avgdl,
+            k1=self.k1,
+            b=self.b,
+            corpus_size=self.corpus_size,
+            version=version,
+        )
+
+    @staticmethod
+    def _stats_path(directory: Path, prefix: str) -> Path:
+        return directory / f"{prefix}_bm25_stats.npz"
+
+    @classmethod
+    def exists(cls, directory: str | Path, prefix: str) -> bool:
+        return cls._stats_path(Path(directory), prefix).exists()
+
+    def save(self, directory: str | Path, prefix: str):
+        """Write the query-side tables plus the statistics needed to continue updating."""
+        directory = Path(directory)
+        self.to_compact().save(directory, prefix)
+        doc_ids = list(self.docs)
+        lengths = [len(self.docs[d]) for d in doc_ids]
+        np.savez(
+            self._stats_path(directory, prefix),
+            df=np.asarray(self.df, dtype=np.int64),
+            params=np.array([self.corpus_size, self.total_length, self.k1, self.b, self.epsilon]),
+            doc_ids=np.array([json.dumps(d) for d in doc_ids], dtype=np.str_),
+            doc_indptr=np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]),
+            doc_term_ids=np.array([i for d in doc_ids for i in self.docs[d]], dtype=np.int64),
+            doc_tfs=np.array([tf for d in doc_ids for tf in self.docs[d].values()], dtype=np.int64),
+        )
+
+    @classmethod
+    def load(cls, directory: str | Path, prefix: str) -> "IncrementalBM25":
+        directory = Path(directory)
+        tables = CompactBM25.load(directory, prefix, mmap=False)
+        vocab = {t.decode("utf-8"): int(i) for t, i in zip(tables.terms, tables.term_ids)}
+        with np.load(cls._stats_path(directory, prefix)) as stats:
+            corpus_size, total_length, k1, b, epsilon = stats["params"].tolist()
+            builder = cls(
+                vocab,
+                df=stats["df"].tolist(),
+                corpus_size=int(corpus_size),
+                total_length=int(total_length),
+                k1=k1,
+                b=b,
+                epsilon=epsilon,
+            )
+            indptr, term_ids, tfs = stats["doc_indptr"], stats["doc_term_ids"], stats["doc_tfs"]
+            for i, doc_id in enumerate(stats["doc_ids"]):
+                start, end = indptr[i], indptr[i + 1]
+                builder.docs[json.loads(str(doc_id))] = dict(zip(term_ids[start:end].tolist(), tfs[start:end].tolist()))
+        return builder
@@ -0,0 +1,120 @@
+import json
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+
+class CompactBM25:
+    """Query-side BM25 statistics as flat NumPy arrays.
+
+    Holds only what `MediaRetriever.embed_sparse` needs: idf by vocab id, the term -> id
+    map (as a sorted UTF-8 term array searched with `np.searchsorted`) and the
+    avgdl/k1/b parameters. Saved arrays are memory-mapped on load, so worker processes
+    share the same pages.
+    """
+
+    def __init__(
+        self,
+        terms: np.ndarray,
+        term_ids: np.ndarray,
+        idf: np.ndarray,
+        avgdl: float,
+        k1: float,
+        b: float,
+        corpus_size: int,
+        version: str | None = None,
+    ):
+        self.terms = terms  # Sorted UTF-8 encoded terms (dtype S)
+        self.term_ids = term_ids  # Vocab id of terms[i]
+        self.idf = idf  # idf[vocab_id], 0 for vocab terms the model has no idf for
+        self.avgdl = avgdl
+        self.k1 = k1
+        self.b = b
+        self.corpus_size = corpus_size
+        self.version = version  # Published version (app.bm25_versions), None for the flat layout
+
+    @classmethod
+    def from_bm25okapi(cls, model, vocab: Dict[str, int]) -> "CompactBM25":
+        idf = np.zeros(max(vocab.values(), default=-1) + 1, dtype=np.float64)
+        for term, idx in vocab.items():
+            idf[idx] = model.idf.get(term, 0)
+
+        sorted_terms = sorted(vocab)
+        return cls(
+            terms=np.array([t.encode("utf-8") for t in sorted_terms], dtype=np.bytes_),
+            term_ids=np.array([vocab[t] for t in sorted_terms], dtype=np.int64),
+            idf=idf,
+            avgdl=float(model.avgdl),
+            k1=float(model.k1),
+            b=float(model.b),
+            corpus_size=int(model.corpus_size),
+        )
+
+    def term_id(self, term: str) -> int | None:
+        key = term.encode("utf-8")
+        pos = int(np.searchsorted(self.terms, key))
+        if pos < len(self.terms) and self.terms[pos] == key:
+            return int(self.term_ids[pos])
+        return None
+
+    def term_ids_for(self, terms: List[str]) -> np.ndarray:
+        """Vocab ids of many terms in one vectorized lookup; -1 for terms not in the vocab."""
+        if not terms or not len(self.terms):
+            return np.full(len(terms), -1, dtype=np.int64)
+        keys = np.array([t.encode("utf-8") for t in terms], dtype=np.bytes_)
+        pos = np.minimum(np.searchsorted(self.terms, keys), len(self.terms) - 1)
+        return np.where(self.terms[pos] == keys, self.term_ids[pos], -1)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    @staticmethod
+    def _paths(directory: Path, prefix: str) -> Dict[str, Path]:
+        return {
+            "terms": directory / f"{prefix}_bm25_terms.npy",
+            "term_ids": directory / f"{prefix}_bm25_term_ids.npy",
+            "idf": directory / f"{prefix}_bm25_idf.npy",
+            "meta": directory / f"{prefix}_bm25_meta.json",
+        }
+
+    @classmethod
+    def exists(cls, directory: str | Path, prefix: str) -> bool:
+        return all(p.exists() for p in cls._paths(Path(directory), prefix).values())
+
+    def save(self, directory: str | Path, prefix: str):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        paths = self._paths(directory, prefix)
+        np.save(paths["terms"], self.terms)
+        np.save(paths["term_ids"], self.term_ids)
+        np.save(paths["idf"], self.idf)
+        paths["meta"].write_text(
+            json.dumps(
+                {
+                    "avgdl": self.avgdl,
+                    "k1": self.k1,
+                    "b": self.b,
+                    "corpus_size": self.corpus_size,
+                    "vocab_size": len(self.terms),
+                }
+            )
+        )
+
+    @classmethod
+    def load(
+        cls, directory: str | Path, prefix: str, mmap: bool = True, version: str | None = None
+    ) -> "CompactBM25":
+        paths = cls._paths(Path(directory), prefix)
+        mmap_mode = "r" if mmap else None
+        meta = json.loads(paths["meta"].read_text())
+        return cls(
+            terms=np.load(paths["terms"], mmap_mode=mmap_mode),
+            term_ids=np.load(paths["term_ids"], mmap_mode=mmap_mode),
+            idf=np.load(paths["idf"], mmap_mode=mmap_mode),
+            avgdl=meta["avgdl"],
+            k1=meta["k1"],
+            b=meta["b"],
+            corpus_size=meta["corpus_size"],
+            version=version,
+        )
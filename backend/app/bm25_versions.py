@@ -0,0 +1,187 @@
+import fcntl
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict
+
+from app.bm25_index import CompactBM25
+from app.telemetry import logger
+
+MEDIA_PREFIXES = ("movie", "tv")
+CURRENT_FILE = "CURRENT"  # Name of the published version, under the BM25 root
+VERSIONS_DIR = "versions"
+LOCK_FILE = ".update.lock"  # Held by writers from reading CURRENT until publishing
+
+
+def current_version(root: str | Path) -> str | None:
+    """The published version under `root`, or None for the flat (unversioned) layout."""
+    try:
+        return (Path(root) / CURRENT_FILE).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+@contextmanager
+def update_lock(root: str | Path):
+    """Exclusive lock for a load -> publish -> prune cycle under `root`.
+
+    Without it, two concurrent updates could both start from the same version and the
+    second publish would silently drop the first one's documents. Blocks until any other
+    holder releases it; readers (BM25Reloader) never take it.
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    with (root / LOCK_FILE).open("a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def version_dir(root: str | Path, version: str) -> Path:
+    return Path(root) / VERSIONS_DIR / version
+
+
+def load_tables(root: str | Path, version: str | None = None) -> Dict[str, CompactBM25]:
+    """Query-side tables of a published version (the current one by default).
+
+    Version directories are never modified after publishing, so their arrays can stay
+    memory-mapped while a newer version is loaded next to them.
+    """
+    version = version or current_version(root)
+    directory = version_dir(root, version) if version else Path(root)
+    return {media: CompactBM25.load(directory, media, version=version) for media in MEDIA_PREFIXES}
+
+
+def _fsync_dir(path: Path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def publish_version(root: str | Path, version: str, write: Callable[[Path], None]) -> Path:
+    """Write a new version with `write(directory)`, then make it current atomically.
+
+    The files go to a temporary directory that is renamed into place once complete, and
+    CURRENT is replaced with os.replace, so readers see either the old or the new version,
+    never a partial one.
+    """
+    root = Path(root)
+    final = version_dir(root, version)
+    if final.exists():
+        raise FileExistsError(f"BM25 version '{version}' already exists in {root}")
+    staging = final.with_name(f".{version}.tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    write(staging)
+    for path in staging.iterdir():
+        with path.open("rb") as f:
+            os.fsync(f.fileno())
+    staging.rename(final)
+    _fsync_dir(final.parent)
+
+    pointer = root / f".{CURRENT_FILE}.tmp"
+    with pointer.open("w") as f:
+        f.write(version + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer, root / CURRENT_FILE)
+    _fsync_dir(root)
+    return final
+
+
+def prune_versions(root: str | Path, keep: int) -> list[str]:
+    """Delete all but the newest `keep` versions (never the current one); returns the deleted.
+
+    Workers that still map an old version's arrays keep reading them safely: on POSIX the
+    data stays until the last mapping is closed.
+    """
+    versions_root = Path(root) / VERSIONS_DIR
+    if not versions_root.exists():
+        return []
+    current = current_version(root)
+    versions = sorted(
+        (p for p in versions_root.iterdir() if p.is_dir() and not p.name.startswith(".")),
+        key=lambda p: p.name,
+    )
+    deleted = []
+    for path in versions[: max(len(versions) - keep, 0)]:
+        if path.name != current:
+            shutil.rmtree(path)
+            deleted.append(path.name)
+    return deleted
+
+
+class BM25Reloader:
+    """Polls the CURRENT pointer and hands newly published tables to `on_load`.
+
+    Each worker process runs its own poller, so every worker picks up a new version within
+    `interval_s` without a restart. A version that fails to load is logged and retried on
+    the next change; the worker keeps serving the tables it has.
+    """
+
+    def __init__(
+        self,
+        root: str | Path,
+        on_load: Callable[[Dict[str, CompactBM25], str], None],
+        interval_s: float = 30.0,
+        version: str | None = None,  # Version already loaded at startup
+    ):
+        self.root = Path(root)
+        self.on_load = on_load
+        self.interval_s = interval_s
+        self.version = version
+        self.reloads = 0
+        self.failures = 0
+        self.last_error: str | None = None
+        self.loaded_at = time.time()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def check(self) -> bool:
+        """Load the current version if it changed; returns whether tables were swapped."""
+        version = current_version(self.root)
+        if version is None or version == self.version:
+            return False
+        try:
+            tables = load_tables(self.root, version)
+        except Exception as e:
+            if self.last_error != f"{version}: {e}":
+                logger.error("Failed to load BM25 version '%s': %s", version, e)
+            self.failures += 1
+            self.last_error = f"{version}: {e}"
+            return False
+        self.on_load(tables, version)
+        logger.info("Switched to BM25 version '%s' (was '%s')", version, self.version)
+        self.version, self.last_error = version, None
+        self.reloads += 1
+        self.loaded_at = time.time()
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            self.check()
+
+    def start(self) -> threading.Thread:
+        self._thread = threading.Thread(target=self._run, name="bm25-reload", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "interval_s": self.interval_s,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "loaded_at": self.loaded_at,
+        }
@@ -1,65 +1,264 @@
+import gc
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-import joblib
-import nltk
+from app.admission import AdmissionController
+from app.batcher import MicroBatcher
+from app.bm25_index import CompactBM25
+from app.bm25_versions import BM25Reloader, current_version, load_tables
+from app.cache import SqliteCacheBackend, TTLCache
 from app.chatbot import build_chat_fn
+from app.context_builder import ContextBuilder, TokenCounter
+from app.facet_index import FacetIndex, FacetRefresher
 from app.config import (
+    ADMISSION_ENABLED,
+    ADMISSION_INFERENCE_CONCURRENCY,
+    ADMISSION_LLM_CONCURRENCY,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_PER_CLIENT_LIMIT,
+    ADMISSION_QUEUE_TIMEOUT_S,
+    BATCH_MAX_SIZE,
+    BATCH_MAX_WAIT_MS,
     BM25_PATH,
+    BM25_RELOAD_INTERVAL_S,
+    CACHE_DISK_MAX_ROWS,
+    CACHE_DISK_PATH,
+    CACHE_ENABLED,
+    CACHE_MAX_ENTRIES,
+    CACHE_RETRIEVAL_TTL_SECONDS,
+    CACHE_TTL_SECONDS,
+    CONTEXT_ITEM_MAX_TOKENS,
+    FACET_EXACT_MAX_IDS,
+    FACET_EXACT_THRESHOLD,
+    FACET_INDEX_ENABLED,
+    FACET_REFRESH_INTERVAL_S,
+    HISTORY_TOKEN_BUDGET,
+    HTTP_CONNECT_TIMEOUT_S,
+    HTTP_KEEPALIVE_EXPIRY_S,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE,
+    PAYLOAD_CACHE_MAX_ENTRIES,
+    INFERENCE_MAX_WORKERS,
+    INTENT_BACKEND,
+    LOG_LEVEL,
+    INTENT_HEAD_PATH,
+    INTENT_MODE,
     INTENT_MODEL,
+    LOCAL_INDEX_ANN,
+    LOCAL_INDEX_PATH,
+    MICRO_BATCHING_ENABLED,
     NLTK_PATH,
+    ONNX_MODEL_DIR,
+    OPENAI_MODEL,
+    OTEL_ENABLED,
+    PROMPT_TOKEN_BUDGET,
     QDRANT_API_KEY,
     QDRANT_ENDPOINT,
+    QDRANT_GRPC_PORT,
+    QDRANT_HTTP2,
+    QDRANT_MAX_RETRIES,
     QDRANT_MOVIE_COLLECTION_NAME,
+    QDRANT_PREFER_GRPC,
+    QDRANT_RETRIEVAL_MODE,
+    QDRANT_RETRY_BACKOFF_MS,
+    QDRANT_TIMEOUT_S,
     QDRANT_TV_COLLECTION_NAME,
+    QDRANT_TWO_PHASE_RETRIEVAL,
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_SIMILARITY,
+    RESPONSE_CACHE_TTL_SECONDS,
+    RERANK_DEBUG_SAMPLE_RATE,
+    RESPONSE_CACHE_WITH_HISTORY,
+    SINGLE_FLIGHT_ENABLED,
+    SPECULATION_MODE,
+    STARTUP_MAX_WORKERS,
+    STREAM_COALESCE_MAX_DELAY_MS,
+    STREAM_COALESCE_MIN_CHARS,
+    VECTOR_BACKEND,
 )
-from app.llm_services import load_sentence_model
+from app.inference_backends import load_intent_pipeline
+from app.inference_pool import init_inference_pool
+from app.intent_head import EmbeddingIntentClassifier
+from app.local_vectorstore import LocalVectorStore
+from app.llm_services import SYSTEM_PROMPT, load_sentence_model
+from app.query_analyzer import QueryAnalyzer
+from app.response_cache import SemanticResponseCache
 from app.retriever import get_media_retriever
-from app.vectorstore import connect_qdrant
-from rank_bm25 import BM25Okapi
-from transformers import pipeline
+from app.singleflight import SingleFlight
+from app.speculation import SpeculationStats
+from app.startup import StartupOrchestrator
+from app.telemetry import init_telemetry, logger
+from app.transport import HttpSettings
+from app.vectorstore import (
+    connect_async_qdrant,
+    connect_local_vectorstore,
+    connect_qdrant,
+)
 
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
+# Shared micro-batchers and caches, keyed by name, for stats reporting
+batchers: dict[str, MicroBatcher] = {}
+caches: dict[str, TTLCache] = {}
+speculation_stats = SpeculationStats()
+admission = (
+    AdmissionController(
+        inference_limit=ADMISSION_INFERENCE_CONCURRENCY,
+        llm_limit=ADMISSION_LLM_CONCURRENCY,
+        max_queue=ADMISSION_MAX_QUEUE,
+        queue_timeout_s=ADMISSION_QUEUE_TIMEOUT_S,
+        per_client_limit=ADMISSION_PER_CLIENT_LIMIT,
+    )
+    if ADMISSION_ENABLED
+    else None
+)
+single_flight = SingleFlight() if SINGLE_FLIGHT_ENABLED else None
+# /recommend/batch jobs run one at a time per worker, beside the inference pool /chat uses
+batch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recommend-batch")
+
 
-def load_bm25_files() -> tuple[dict[str, BM25Okapi], dict[str, int]]:
+def load_bm25_indexes() -> dict[str, CompactBM25]:
     bm25_dir = Path(BM25_PATH)
-    try:
-        bm25_models = {
-            "movie": joblib.load(bm25_dir / "movie_bm25_model.joblib"),
-            "tv": joblib.load(bm25_dir / "tv_bm25_model.joblib"),
-        }
-        bm25_vocabs = {
-            "movie": joblib.load(bm25_dir / "movie_bm25_vocab.joblib"),
-            "tv": joblib.load(bm25_dir / "tv_bm25_vocab.joblib"),
-        }
-    except FileNotFoundError as e:
-        raise FileNotFoundError(f"Missing BM25 files: {e}")
-    return bm25_models, bm25_vocabs
-
-
-def setup_retriever():
-    embed_model = load_sentence_model()
-    qdrant_client = connect_qdrant(endpoint=QDRANT_ENDPOINT, api_key=QDRANT_API_KEY)
+    version = current_version(bm25_dir)
+    if version is not None:
+        # Published by scripts/bm25_incremental_update.py
+        print(f"📚 Loading BM25 tables version '{version}'")
+        return load_tables(bm25_dir, version)
+
+    bm25_indexes = {}
+    for media in ("movie", "tv"):
+        if CompactBM25.exists(bm25_dir, media):
+            bm25_indexes[media] = CompactBM25.load(bm25_dir, media)
+            continue
+
+        # Fall back to the full rank_bm25 model; run scripts/export_bm25_tables.py to skip this
+        print(f"⚠️ No compact BM25 tables for '{media}', converting joblib model")
+        import joblib
+
+        try:
+            bm25_indexes[media] = CompactBM25.from_bm25okapi(
+                joblib.load(bm25_dir / f"{media}_bm25_model.joblib"),
+                joblib.load(bm25_dir / f"{media}_bm25_vocab.joblib"),
+            )
+        except FileNotFoundError as e:
+            raise FileNotFoundError(f"Missing BM25 files: {e}")
+    return bm25_indexes
+
+
+def setup_caches() -> dict[str, TTLCache]:
+    if not CACHE_ENABLED:
+        return {}
+
+    disk_backend = SqliteCacheBackend(CACHE_DISK_PATH, max_rows=CACHE_DISK_MAX_ROWS) if CACHE_DISK_PATH else None
+    for name, ttl, max_size in [
+        ("embedding", CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES),
+        ("sparse", CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES),
+        ("retrieval", CACHE_RETRIEVAL_TTL_SECONDS, CACHE_MAX_ENTRIES),
+        ("payload", CACHE_RETRIEVAL_TTL_SECONDS, PAYLOAD_CACHE_MAX_ENTRIES),
+    ]:
+        caches[name] = TTLCache(
+            name,
+            max_size=max_size,
+            ttl_seconds=ttl,
+            disk_backend=disk_backend,
+        )
+    print(f"🗃️ Query caches enabled{' (with disk layer)' if disk_backend else ''}")
+    return caches
+
+
+def load_facet_indexes(client, verbose: bool = True) -> dict[str, FacetIndex]:
+    facet_indexes = {}
+    for collection in (QDRANT_MOVIE_COLLECTION_NAME, QDRANT_TV_COLLECTION_NAME):
+        if isinstance(client, LocalVectorStore):
+            local = client.collection(collection)
+            facet_indexes[collection] = FacetIndex.from_payloads(local.ids, local.payloads)
+        else:
+            facet_indexes[collection] = FacetIndex.from_qdrant(client, collection)
+        index = facet_indexes[collection]
+        if verbose:
+            print(
+                f"🧭 Facet index for '{collection}': {len(index)} points, "
+                f"{len(index.genres)} genres, {len(index.providers)} providers"
+            )
+    return facet_indexes
+
+
+def connect_vector_store():
+    if VECTOR_BACKEND == "local":
+        # In-process index; async retrieval falls back to worker threads
+        return connect_local_vectorstore(LOCAL_INDEX_PATH, ann=LOCAL_INDEX_ANN), None
+    # Sync and async clients each keep their own sized keep-alive pool for the process
+    http_settings = HttpSettings(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_S,
+        http2=QDRANT_HTTP2,
+        connect_timeout=HTTP_CONNECT_TIMEOUT_S,
+        timeout=QDRANT_TIMEOUT_S,
+        max_retries=QDRANT_MAX_RETRIES,
+        backoff_ms=QDRANT_RETRY_BACKOFF_MS,
+    )
+    options = dict(http_settings=http_settings, prefer_grpc=QDRANT_PREFER_GRPC, grpc_port=QDRANT_GRPC_PORT)
+    return (
+        connect_qdrant(endpoint=QDRANT_ENDPOINT, api_key=QDRANT_API_KEY, **options),
+        connect_async_qdrant(endpoint=QDRANT_ENDPOINT, api_key=QDRANT_API_KEY, **options),
+    )
+
+
+def load_query_analyzer() -> QueryAnalyzer:
+    import nltk
+
     nltk.data.path.append(str(NLTK_PATH))
+    analyzer = QueryAnalyzer()
+    analyzer.analyze("What's a movie like Heat?")  # Loads stopwords and the punkt fallback
     print("✅ NLTK resources loaded")
+    return analyzer
 
-    bm25_models, bm25_vocabs = load_bm25_files()
-    print("✅ BM25 files loaded")
 
-    return get_media_retriever(
+def setup_retriever(embed_model, vector_store, bm25_indexes, query_analyzer, facet_indexes):
+    qdrant_client, async_qdrant_client = vector_store
+    retriever = get_media_retriever(
         embed_model=embed_model,
         qdrant_client=qdrant_client,
-        bm25_models=bm25_models,
-        bm25_vocabs=bm25_vocabs,
+        bm25_indexes=bm25_indexes,
         movie_collection_name=QDRANT_MOVIE_COLLECTION_NAME,
         tv_collection_name=QDRANT_TV_COLLECTION_NAME,
+        async_qdrant_client=async_qdrant_client,
+        retrieval_mode=QDRANT_RETRIEVAL_MODE,
+        embedding_cache=caches.get("embedding"),
+        sparse_cache=caches.get("sparse"),
+        retrieval_cache=caches.get("retrieval"),
+        two_phase_retrieval=QDRANT_TWO_PHASE_RETRIEVAL,
+        payload_cache=caches.get("payload"),
+        facet_indexes=facet_indexes,
+        facet_exact_threshold=FACET_EXACT_THRESHOLD,
+        facet_exact_max_ids=FACET_EXACT_MAX_IDS,
+        query_analyzer=query_analyzer,
     )
 
+    if MICRO_BATCHING_ENABLED:
+        batchers["embed_dense"] = retriever.dense_batcher = MicroBatcher(
+            retriever.embed_dense_batch,
+            max_batch_size=BATCH_MAX_SIZE,
+            max_wait_ms=BATCH_MAX_WAIT_MS,
+            name="embed_dense",
+        )
+        print("📦 Micro-batching enabled for query embedding")
+
+    return retriever
 
-def setup_intent_classifier():
-    print(f"🔧 Loading intent classifier from {INTENT_MODEL}")
-    classifier = pipeline("text-classification", model=INTENT_MODEL)
+
+def load_intent_model():
+    if INTENT_MODE == "embedding_head":
+        # Intent is predicted from the dense query embedding; no second transformer needed
+        classifier = EmbeddingIntentClassifier.load(INTENT_HEAD_PATH)
+        print(f"🤖 Embedding intent head loaded from {INTENT_HEAD_PATH}")
+        return classifier
+
+    print(f"🔧 Loading intent classifier from {INTENT_MODEL} ({INTENT_BACKEND} backend)")
+    classifier = load_intent_pipeline(INTENT_BACKEND, INTENT_MODEL, ONNX_MODEL_DIR)
 
     print("🔥 Warming up intent classifier...")
     warmup_queries = [
@@ -67,14 +266,171 @@ def setup_intent_classifier():
         "Who directed The Godfather?",
         "Do you like action films?",
     ]
-    for q in warmup_queries:
-        _ = classifier(q)
+    _ = classifier(warmup_queries)
 
     print("🤖 Classifier ready")
     return classifier
 
 
-# Initialize once at startup
-retriever = setup_retriever()
-intent_classifier = setup_intent_classifier()
-chat_fn = build_chat_fn(retriever, intent_classifier)
+def setup_intent_classifier(intent_model):
+    classifier = intent_model
+    if MICRO_BATCHING_ENABLED and not isinstance(classifier, EmbeddingIntentClassifier):
+        # Keep the per-query interface: each result is wrapped like a single-input pipeline call
+        batchers["intent"] = MicroBatcher(
+            lambda qs: [[r] for r in classifier(qs, batch_size=len(qs))],
+            max_batch_size=BATCH_MAX_SIZE,
+            max_wait_ms=BATCH_MAX_WAIT_MS,
+            name="intent",
+        )
+        print("📦 Micro-batching enabled for intent classification")
+        return batchers["intent"]
+
+    return classifier
+
+
+def load_context_builder() -> ContextBuilder | None:
+    if PROMPT_TOKEN_BUDGET <= 0:
+        return None
+    counter = TokenCounter(OPENAI_MODEL)
+    print(f"✅ Prompt budget {PROMPT_TOKEN_BUDGET} tokens ({'tiktoken' if counter.exact else 'approximate'} counts)")
+    return ContextBuilder(
+        counter,
+        SYSTEM_PROMPT,
+        budget=PROMPT_TOKEN_BUDGET,
+        item_max_tokens=CONTEXT_ITEM_MAX_TOKENS,
+        history_budget=HISTORY_TOKEN_BUDGET,
+    )
+
+
+def start_bm25_reloader(retriever) -> BM25Reloader | None:
+    # Per process: each worker polls for new BM25 versions and swaps its own retriever's tables
+    global bm25_reloader
+    if BM25_RELOAD_INTERVAL_S <= 0:
+        return None
+
+    def on_load(tables, version):
+        # Titles published with a new version were upserted to the collection first; rebuild
+        # the bitmaps now rather than leaving exact_prefiltered plans to the facet refresher
+        facet_indexes = None
+        if FACET_INDEX_ENABLED:
+            try:
+                facet_indexes = load_facet_indexes(retriever.client, verbose=False)
+            except Exception as e:
+                # Plain payload filters until the next version: slower, but never missing titles
+                logger.warning("Facet index rebuild failed, filtering without it: %s", e)
+                facet_indexes = {}
+        retriever.swap_bm25(tables, version, facet_indexes)
+
+    bm25_reloader = BM25Reloader(
+        BM25_PATH, on_load, interval_s=BM25_RELOAD_INTERVAL_S, version=retriever.bm25_version
+    )
+    bm25_reloader.start()
+    print(f"🔁 Watching {BM25_PATH} for new BM25 versions every {BM25_RELOAD_INTERVAL_S:g}s")
+    return bm25_reloader
+
+
+def start_facet_refresher(retriever) -> FacetRefresher | None:
+    # Per process, like the BM25 reloader: points ingested after startup only reach the
+    # exact_prefiltered plans once the bitmaps are rebuilt
+    global facet_refresher
+    if not retriever.facet_indexes or FACET_REFRESH_INTERVAL_S <= 0 or VECTOR_BACKEND == "local":
+        return None  # The local snapshot doesn't change while the app runs
+
+    def on_load(facet_indexes):
+        retriever.facet_indexes = facet_indexes
+
+    facet_refresher = FacetRefresher(
+        lambda: load_facet_indexes(retriever.client, verbose=False),
+        on_load,
+        interval_s=FACET_REFRESH_INTERVAL_S,
+    )
+    facet_refresher.start()
+    print(f"🧭 Rebuilding facet indexes every {FACET_REFRESH_INTERVAL_S:g}s")
+    return facet_refresher
+
+
+def setup_chat(loaded_retriever, loaded_classifier, context_builder=None):
+    global retriever, intent_classifier, response_cache, chat_fn
+    retriever, intent_classifier = loaded_retriever, loaded_classifier
+    response_cache = (
+        SemanticResponseCache(
+            similarity_threshold=RESPONSE_CACHE_SIMILARITY,
+            max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+            ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+            cache_with_history=RESPONSE_CACHE_WITH_HISTORY,
+        )
+        if RESPONSE_CACHE_ENABLED
+        else None
+    )
+    chat_fn = build_chat_fn(
+        retriever,
+        intent_classifier,
+        response_cache,
+        speculation_mode=SPECULATION_MODE,
+        speculation_stats=speculation_stats,
+        context_builder=context_builder,
+        coalesce_min_chars=STREAM_COALESCE_MIN_CHARS,
+        coalesce_max_delay_ms=STREAM_COALESCE_MAX_DELAY_MS,
+    )
+    return chat_fn
+
+
+# Set by the "chat" startup component; None until the app is ready
+retriever = None
+intent_classifier = None
+response_cache = None
+chat_fn = None
+bm25_reloader = None
+facet_refresher = None
+
+startup = StartupOrchestrator(max_workers=STARTUP_MAX_WORKERS)
+(
+    # shared=True: model weights and read-only index arrays, loaded once before forking
+    # when preloading; clients, threads and caches are always created per process
+    startup.add("embed_model", load_sentence_model, shared=True)
+    .add("intent_model", load_intent_model, shared=True)
+    .add("bm25", load_bm25_indexes, shared=True)
+    .add("query_analyzer", load_query_analyzer, shared=True)
+    .add("context_builder", load_context_builder, shared=True)
+    .add("vector_store", connect_vector_store, shared=VECTOR_BACKEND == "local")
+    .add(
+        "facets",
+        lambda vector_store: load_facet_indexes(vector_store[0]) if FACET_INDEX_ENABLED else None,
+        depends_on=["vector_store"],
+        shared=VECTOR_BACKEND == "local",
+    )
+    .add("caches", setup_caches)
+    .add("intent", setup_intent_classifier, depends_on=["intent_model"])
+    .add(
+        "retriever",
+        lambda embed_model, vector_store, bm25, query_analyzer, facets, caches: setup_retriever(
+            embed_model, vector_store, bm25, query_analyzer, facets
+        ),
+        depends_on=["embed_model", "vector_store", "bm25", "query_analyzer", "facets", "caches"],
+    )
+    .add("bm25_reload", start_bm25_reloader, depends_on=["retriever"])
+    .add("facet_refresh", start_facet_refresher, depends_on=["retriever"])
+    .add(
+        "chat",
+        lambda retriever, intent, context_builder: setup_chat(retriever, intent, context_builder),
+        depends_on=["retriever", "intent", "context_builder"],
+    )
+)
+
+
+def preload() -> bool:
+    # Called in a pre-forking server's master (see gunicorn.conf.py): load shared weights
+    # once, then freeze them out of the GC so collections in workers don't write to
+    # (and un-share) their pages
+    ok = startup.preload()
+    gc.collect()
+    gc.freeze()
+    return ok
+
+
+def start():
+    # Called from the FastAPI lifespan; loading continues in the background
+    init_telemetry(OTEL_ENABLED, RERANK_DEBUG_SAMPLE_RATE, LOG_LEVEL)
+    init_inference_pool(INFERENCE_MAX_WORKERS)
+    startup.start()
+    return startup
@@ -0,0 +1,198 @@
+import pickle
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+_PUNCT_EDGES = re.compile(r"^[\s\W_]+|[\s\W_]+$")
+
+
+def normalize_query(text: str) -> str:
+    # Case, whitespace and leading/trailing punctuation don't change what the user asked for
+    return _PUNCT_EDGES.sub("", " ".join(text.lower().split()))
+
+
+def filters_key(media_type: str, genres=None, providers=None, year_range=None) -> tuple:
+    return (
+        media_type.lower(),
+        tuple(sorted(genres or [])),
+        tuple(sorted(providers or [])),
+        tuple(year_range) if year_range else None,
+    )
+
+
+class SqliteCacheBackend:
+    """On-disk second cache layer shared by all caches that point at the same file.
+
+    Bounded to `max_rows`: expired rows are swept every `sweep_interval_s`, and when the
+    table is still over the bound, the rows closest to expiring are evicted. Both run
+    inside `set` every `max_rows // 20` writes at the latest, so the table never grows
+    more than 5% past the bound.
+    """
+
+    def __init__(self, path: str | Path, max_rows: int = 100_000, sweep_interval_s: float = 300.0):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_rows = max_rows
+        self.sweep_interval_s = sweep_interval_s
+        self.expired = 0
+        self.evictions = 0
+        self._sweep_every = max(1, max_rows // 20)
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "namespace TEXT, key TEXT, value BLOB, expires_at REAL, "
+            "PRIMARY KEY (namespace, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+        self._conn.commit()
+        with self._lock:
+            self._sweep()  # Rows left over from previous runs
+
+    def get(self, namespace: str, key: str) -> tuple | None:
+        """(value, expires_at) of a live entry, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at < time.time():
+                self._conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key)
+                )
+                self._conn.commit()
+                self.expired += 1
+                return None
+        return pickle.loads(value), expires_at
+
+    def set(self, namespace: str, key: str, value, expires_at: float):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, blob, expires_at),
+            )
+            self._conn.commit()
+            self._writes += 1
+            if self._writes >= self._sweep_every or time.time() - self._swept_at >= self.sweep_interval_s:
+                self._sweep()
+
+    def _sweep(self):
+        # Caller holds self._lock
+        self.expired += self._conn.execute(
+            "DELETE FROM cache WHERE expires_at < ?", (time.time(),)
+        ).rowcount
+        excess = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_rows
+        if excess > 0:
+            self.evictions += self._conn.execute(
+                "DELETE FROM cache WHERE rowid IN "
+                "(SELECT rowid FROM cache ORDER BY expires_at LIMIT ?)",
+                (excess,),
+            ).rowcount
+        self._conn.commit()
+        self._writes = 0
+        self._swept_at = time.time()
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        return {
+            "rows": rows,
+            "max_rows": self.max_rows,
+            "expired": self.expired,
+            "evictions": self.evictions,
+        }
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry TTL, hit/miss counters and an optional disk layer."""
+
+    def __init__(
+        self,
+        name: str,
+        max_size: int = 1024,
+        ttl_seconds: float = 3600,
+        disk_backend: SqliteCacheBackend | None = None,
+    ):
+        self.name = name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.disk_backend = disk_backend
+
+        self._entries: OrderedDict = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_memory(self, key):
+        """Memory layer only, cheap enough for the event loop.
+
+        Counts hits but not misses: on a miss the caller continues with
+        `get(key, memory=False)`, which counts it once.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+        return None
+
+    def get(self, key, memory: bool = True):
+        if memory:
+            value = self.get_memory(key)
+            if value is not None:
+                return value
+
+        if self.disk_backend is not None:
+            entry = self.disk_backend.get(self.name, repr(key))
+            if entry is not None:
+                value, expires_at = entry
+                with self._lock:
+                    self.disk_hits += 1
+                    self._store(key, value, expires_at)  # Keeps the disk entry's expiry
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._store(key, value, expires_at)
+        if self.disk_backend is not None:
+            self.disk_backend.set(self.name, repr(key), value, expires_at)
+
+    def _store(self, key, value, expires_at: float):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
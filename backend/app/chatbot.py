@@ -1,78 +1,195 @@
-import re
+import asyncio
 import time
-from concurrent.futures import ThreadPoolExecutor
 
+from app.batcher import MicroBatcher
+from app.cache import filters_key
+from app.context_builder import ContextBuilder
+from app.inference_pool import run_in_inference_pool
+from app.intent_head import EmbeddingIntentClassifier
 from app.llm_services import call_chat_model_openai
+from app.media_retriever import to_recommendations
+from app.response_cache import replay_as_stream
+from app.speculation import SPECULATION_MODES, Speculation, SpeculationStats
+from app.stream_shaping import StreamEvent, coalesce_chunks, strip_images
+from app.telemetry import intent_label, logger, observe, span
 
 
-def sanitize_markdown(md_text: str) -> str:
-    return re.sub(r'!\[.*?\]\(.*?\)', '', md_text)
+def build_chat_fn(
+    retriever,
+    intent_classifier,
+    response_cache=None,
+    speculation_mode: str = "embed",  # off | embed | retrieve: work started before the intent is known
+    speculation_stats: SpeculationStats | None = None,
+    context_builder: ContextBuilder | None = None,  # Token-budgeted prompt; None sends everything
+    coalesce_min_chars: int = 0,  # Merge LLM deltas into chunks of at least this size; 0 disables
+    coalesce_max_delay_ms: float = 40,
+):
+    if speculation_mode not in SPECULATION_MODES:
+        raise ValueError(
+            f"Unknown speculation_mode '{speculation_mode}', expected one of {SPECULATION_MODES}"
+        )
+    uses_embedding_head = isinstance(intent_classifier, EmbeddingIntentClassifier)
 
+    async def classify_intent(q: str) -> bool:
+        if isinstance(intent_classifier, MicroBatcher):
+            result = await intent_classifier.call_async(q)
+        else:
+            result = await run_in_inference_pool(intent_classifier, q)
+        return result[0]["label"] == "recommendation"
+
+    async def timed(stage: str, coro):
+        with span(stage):
+            return await coro
+
+    async def labelled(intent: str, coro):
+        # Stage spans inside `coro` (embedding, Qdrant, fuse, rerank) record the known intent
+        with intent_label(intent):
+            return await coro
+
+    def shaped(chunks):
+        # Fewer, larger writes; the first delta still goes out at once
+        if coalesce_min_chars <= 0:
+            return chunks
+        return coalesce_chunks(chunks, coalesce_min_chars, coalesce_max_delay_ms / 1000)
+
+    async def stream_timed(chunks, t0: float, intent: str):
+        # Records time-to-first-token and total stream time from request start
+        first = True
+        async for chunk in chunks:
+            if first:
+                observe("ttft", time.perf_counter() - t0, intent)
+                first = False
+            yield chunk
+        observe("stream", time.perf_counter() - t0, intent)
 
-def build_chat_fn(retriever, intent_classifier):
-    def chat(
+    async def chat(
         question,
         history,
         media_type="movies",
         genres=None,
         providers=None,
         year_range=None,
+        admission_ticket=None,  # app.admission ticket: trades its inference slot for an LLM one
     ):
-        full_t0 = time.time()
-        
-        with ThreadPoolExecutor() as executor:
-            # Classify user intent to determine if it is a recommendation ask
-            t0 = time.time()
-            intent_future = executor.submit(
-                lambda q: intent_classifier(q)[0]["label"] == "recommendation", question
-            )
-            print(f"\n🧠 executor.submit(classify_intent) took {time.time() - t0:.3f}s")
-
-            # Embed user query as dense vector asynchronously
-            t0 = time.time()
-            query_vector_future = executor.submit(retriever.embed_dense, question)
-            print(f"🧵 executor.submit(embed_text) took {time.time() - t0:.3f}s")
-
-            # Wait for results
-            t0 = time.time()
-            is_rec_intent = intent_future.result()
-            print(f"✅ classify_intent() result received in {time.time() - t0:.3f}s")
-
-            t0 = time.time()
-            dense_vector = query_vector_future.result()
-            print(f"📈 embed_text() result received in {time.time() - t0:.3f}s")
-
-        # Embed user query as sparse vector for hybrid retrieval
-        t0 = time.time()
-        sparse_vector = retriever.embed_sparse(question, media_type)
-        print(f"📈 embed_sparse() result received in {time.time() - t0:.3f}s")
-        
-        if is_rec_intent:
-            # If Yes, proceed with the RAG pipeline for retrieval and recommendation
-            t0 = time.time()            
-            retrieved_movies = retriever.retrieve_and_rerank(
+        full_t0 = time.perf_counter()
+        speculation = Speculation(speculation_stats)
+
+        def embed_dense():
+            return timed("embed_dense", retriever.embed_dense_async(question))
+
+        def embed_sparse():
+            return timed("embed_sparse", retriever.embed_sparse_async(question, media_type))
+
+        def retrieve(dense_vector, sparse_vector):
+            return retriever.retrieve_and_rerank_async(
                 dense_vector,
                 sparse_vector,
                 media_type.lower(),
                 genres,
                 providers,
                 year_range,
+                query=question,
             )
-            print(f"\n📚 retrieve_and_rerank() took {time.time() - t0:.3f}s")
-            
-            context = retriever.format_context(retrieved_movies)
-            user_message = f"{question}\n\nContext:\nBased on the following retrieved {media_type.lower()}, suggest the best recommendations.\n\n{context}"
-            
-            print(f"✨ Total chat() prep time before streaming: {time.time() - full_t0:.3f}s")
-            for chunk in call_chat_model_openai(history, user_message):
-                yield chunk
 
-        else:
-            # If No, proceed with a general conversation
-            user_message = question
-            
-            print(f"✨ Total chat() prep time before streaming: {time.time() - full_t0:.3f}s")
-            for chunk in call_chat_model_openai(history, user_message):
-                yield sanitize_markdown(chunk)
+        dense_task = sparse_task = retrieval_task = None
+        try:
+            if uses_embedding_head:
+                # Shared encoder: intent comes from the dense embedding itself, so only the
+                # sparse vector can be computed while it is in flight
+                if speculation_mode != "off":
+                    sparse_task = speculation.start("embed_sparse", embed_sparse())
+                dense_task = asyncio.create_task(embed_dense())
+                dense_vector = await dense_task
+                with span("classify"):
+                    is_rec_intent = intent_classifier.predict(dense_vector) == "recommendation"
+            else:
+                # Embed (and optionally retrieve) while the classifier runs, via the shared
+                # micro-batchers or the bounded inference pool; kept only for recommendations
+                if speculation_mode != "off":
+                    dense_task = speculation.start("embed_dense", embed_dense())
+                    sparse_task = speculation.start("embed_sparse", embed_sparse())
+                if speculation_mode == "retrieve":
+                    # Query Qdrant as soon as both vectors are ready instead of after classification
+                    retrieval_task = speculation.start_after(
+                        "retrieve", (dense_task, sparse_task), retrieve
+                    )
+                is_rec_intent = await timed("classify", classify_intent(question))
+
+            await speculation.resolve(
+                "recommendation" if is_rec_intent else "chat", keep=is_rec_intent
+            )
+
+            if is_rec_intent:
+                # If Yes, proceed with the RAG pipeline for retrieval and recommendation.
+                # Whatever didn't start speculatively runs now, dense and sparse concurrently
+                dense_task = dense_task or asyncio.create_task(labelled("recommendation", embed_dense()))
+                sparse_task = sparse_task or asyncio.create_task(labelled("recommendation", embed_sparse()))
+                dense_vector, sparse_vector = await asyncio.gather(dense_task, sparse_task)
+                retrieved_movies = await (
+                    retrieval_task or labelled("recommendation", retrieve(dense_vector, sparse_vector))
+                )
+                # Titles and posters go out before the LLM starts (SSE clients only)
+                yield StreamEvent(
+                    "metadata",
+                    {"media_type": media_type, "recommendations": to_recommendations(retrieved_movies)},
+                )
+
+                user_message = f"{question}\n\nContext:\nBased on the following retrieved {media_type.lower()}, suggest the best recommendations.\n\n"
+                llm_history = history
+                if context_builder is not None:
+                    plan = context_builder.build(user_message, history, retrieved_movies)
+                    user_message += plan.context
+                    llm_history = plan.history
+                else:
+                    user_message += retriever.format_context(retrieved_movies)
+
+                observe("prep", time.perf_counter() - full_t0, "recommendation")
+
+                use_response_cache = response_cache is not None and response_cache.accepts(history)
+                if use_response_cache:
+                    filter_key = filters_key(media_type, genres, providers, year_range)
+                    retrieved_ids = [p.id for p in retrieved_movies]
+                    cached_answer = response_cache.lookup(dense_vector, filter_key, retrieved_ids)
+                    if cached_answer is not None:
+                        logger.debug("Replaying cached answer")
+                        async for chunk in stream_timed(
+                            shaped(replay_as_stream(cached_answer)), full_t0, "recommendation_cached"
+                        ):
+                            yield chunk
+                        return
+
+                if admission_ticket is not None:
+                    await admission_ticket.enter_llm()
+                answer_chunks = []
+                async for chunk in stream_timed(
+                    shaped(call_chat_model_openai(llm_history, user_message)), full_t0, "recommendation"
+                ):
+                    answer_chunks.append(chunk)
+                    yield chunk
+
+                # Only reached when the stream completed, so partial answers are never cached
+                if use_response_cache:
+                    response_cache.store(
+                        dense_vector, filter_key, retrieved_ids, "".join(answer_chunks)
+                    )
+
+            else:
+                # If No, proceed with a general conversation; speculative work was cancelled
+                user_message = question
+                llm_history = history
+                if context_builder is not None:
+                    llm_history = context_builder.build(question, history, intent="chat").history
+
+                observe("prep", time.perf_counter() - full_t0, "chat")
+                if admission_ticket is not None:
+                    await admission_ticket.enter_llm()
+                # Images are stripped across delta boundaries, before coalescing
+                async for chunk in stream_timed(
+                    shaped(strip_images(call_chat_model_openai(llm_history, user_message))), full_t0, "chat"
+                ):
+                    yield chunk
+        finally:
+            # Cancels speculative work still running if the client disconnects early
+            speculation.cancel()
 
     return chat
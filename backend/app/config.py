@@ -6,6 +6,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # Optional override, e.g. a local OpenAI-compatible stand-in
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 
 QDRANT_ENDPOINT = os.getenv("QDRANT_ENDPOINT")
@@ -13,14 +14,90 @@ QDRANT_MOVIE_COLLECTION_NAME = os.getenv("QDRANT_MOVIE_COLLECTION_NAME_BGE")
 QDRANT_TV_COLLECTION_NAME = os.getenv("QDRANT_TV_COLLECTION_NAME_BGE")
 
 NLTK_PATH = Path(__file__).resolve().parent.parent / "data" / "nltk_data"
-BM25_PATH = Path(__file__).resolve().parent.parent / "data" / "bm25_files"
+BM25_PATH = Path(os.getenv("BM25_PATH", Path(__file__).resolve().parent.parent / "data" / "bm25_files"))
+BM25_RELOAD_INTERVAL_S = float(os.getenv("BM25_RELOAD_INTERVAL_S", "30"))  # Poll BM25_PATH/CURRENT for newly published versions; 0 disables
 
 INTENT_MODEL = "JJTsao/intent-classifier-distilbert-moviebot"   # Fine-tuned intent classification model for query intent classifiation  
 EMBEDDING_MODEL = "JJTsao/fine-tuned_movie_retriever-bge-base-en-v1.5"  # Fine-tuned sentence transfomer model for query dense vector embedding 
 OPENAI_MODEL = "gpt-4o-mini"  # LLM for chat completions
 
+INTENT_MODE = os.getenv("INTENT_MODE", "distilbert")  # distilbert | embedding_head (classify from the BGE query embedding)
+INTENT_HEAD_PATH = Path(__file__).resolve().parent.parent / "data" / "intent_head" / "intent_head.npz"
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch")  # torch | torch_int8 (dynamic quantization) | onnx (ONNX Runtime, int8)
+INTENT_BACKEND = os.getenv("INTENT_BACKEND", "torch")  # torch | torch_int8 | onnx
+ONNX_MODEL_DIR = Path(os.getenv("ONNX_MODEL_DIR", Path(__file__).resolve().parent.parent / "data" / "onnx"))
+EMBED_MIN_COSINE = float(os.getenv("EMBED_MIN_COSINE", "0.99"))  # Min cosine of quantized vs fp32 query embeddings
 
-if not OPENAI_API_KEY or not QDRANT_API_KEY:
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "qdrant")  # qdrant | local (in-process index exported from Qdrant)
+LOCAL_INDEX_PATH = Path(os.getenv("LOCAL_INDEX_PATH", Path(__file__).resolve().parent.parent / "data" / "local_index"))
+LOCAL_INDEX_ANN = os.getenv("LOCAL_INDEX_ANN", "exact")  # exact (brute force) | hnsw (requires hnswlib)
+QDRANT_RETRIEVAL_MODE = os.getenv("QDRANT_RETRIEVAL_MODE", "batch")  # sequential | parallel | batch (single round-trip)
+QDRANT_TWO_PHASE_RETRIEVAL = os.getenv("QDRANT_TWO_PHASE_RETRIEVAL", "false").lower() == "true"  # Fetch llm_context for top-k only
+FACET_INDEX_ENABLED = os.getenv("FACET_INDEX_ENABLED", "true").lower() == "true"  # Genre/provider/year bitmaps built at startup, rebuilt every FACET_REFRESH_INTERVAL_S and on each BM25 reload
+FACET_EXACT_THRESHOLD = float(os.getenv("FACET_EXACT_THRESHOLD", "0.02"))  # Filters matching <= this fraction use exact scoring
+FACET_EXACT_MAX_IDS = int(os.getenv("FACET_EXACT_MAX_IDS", "5000"))  # Max pre-filtered ids sent per query
+FACET_REFRESH_INTERVAL_S = float(os.getenv("FACET_REFRESH_INTERVAL_S", "300"))  # Rebuild the bitmaps so exact plans see newly ingested points; 0 disables
+SPECULATION_MODE = os.getenv("SPECULATION_MODE", "embed")  # off | embed (embed while classifying) | retrieve (also query Qdrant); discarded for small-talk
+INFERENCE_MAX_WORKERS = int(os.getenv("INFERENCE_MAX_WORKERS", "2"))  # Threads for CPU-bound model inference
+STARTUP_MAX_WORKERS = int(os.getenv("STARTUP_MAX_WORKERS", "4"))  # Components (models, indexes, clients) loaded concurrently at startup
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")  # DEBUG also logs the facet filter plan per query
+OTEL_ENABLED = os.getenv("OTEL_ENABLED", "false").lower() == "true"  # Emit pipeline stages as OpenTelemetry spans
+RERANK_DEBUG_SAMPLE_RATE = float(os.getenv("RERANK_DEBUG_SAMPLE_RATE", "0.0"))  # Fraction of requests that log the reranked top-20
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "4000"))  # Max chat prompt tokens (system + history + question + context); 0 disables
+CONTEXT_ITEM_MAX_TOKENS = int(os.getenv("CONTEXT_ITEM_MAX_TOKENS", "300"))  # Longer items use llm_context_short or are shortened
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1000"))  # Most recent history messages within this many tokens
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))  # Per outbound client pool (Qdrant sync/async, OpenAI)
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))  # Idle connections kept open for reuse
+HTTP_KEEPALIVE_EXPIRY_S = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_S", "30"))  # Idle seconds before a pooled connection is closed
+HTTP_CONNECT_TIMEOUT_S = float(os.getenv("HTTP_CONNECT_TIMEOUT_S", "5"))  # TCP + TLS handshake
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"  # Point queries over gRPC (one multiplexed channel) instead of REST
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+QDRANT_HTTP2 = os.getenv("QDRANT_HTTP2", "false").lower() == "true"  # REST over HTTP/2 (needs h2: pip install httpx[http2])
+QDRANT_TIMEOUT_S = float(os.getenv("QDRANT_TIMEOUT_S", "10"))  # Rounded up to whole seconds by qdrant-client
+QDRANT_MAX_RETRIES = int(os.getenv("QDRANT_MAX_RETRIES", "2"))  # On connection errors and 429/502/503/504
+QDRANT_RETRY_BACKOFF_MS = float(os.getenv("QDRANT_RETRY_BACKOFF_MS", "100"))  # Doubled per attempt, with jitter
+OPENAI_HTTP2 = os.getenv("OPENAI_HTTP2", "true").lower() == "true"  # Falls back to HTTP/1.1 without h2
+OPENAI_TIMEOUT_S = float(os.getenv("OPENAI_TIMEOUT_S", "60"))  # Read timeout, i.e. max gap between streamed chunks
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))  # Retried by the OpenAI SDK (honors Retry-After)
+
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"  # Concurrent identical single-turn /chat requests share one upstream answer
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"  # Bounded queues and 429/503 on /chat instead of unbounded concurrency
+ADMISSION_INFERENCE_CONCURRENCY = int(os.getenv("ADMISSION_INFERENCE_CONCURRENCY", "8"))  # Requests classifying/embedding/retrieving at once
+ADMISSION_LLM_CONCURRENCY = int(os.getenv("ADMISSION_LLM_CONCURRENCY", "64"))  # OpenAI streams open at once
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))  # Waiting requests per stage before 503s
+ADMISSION_QUEUE_TIMEOUT_S = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_S", "10"))  # Max wait for a stage slot
+ADMISSION_PER_CLIENT_LIMIT = int(os.getenv("ADMISSION_PER_CLIENT_LIMIT", "4"))  # Concurrent requests per API key/IP before 429s; 0 disables
+ADMISSION_CLIENT_HEADER = os.getenv("ADMISSION_CLIENT_HEADER", "X-API-Key")  # Identifies clients for the per-client limit; empty: by IP only
+ADMISSION_TRUST_FORWARDED = os.getenv("ADMISSION_TRUST_FORWARDED", "false").lower() == "true"  # Identify clients by X-Forwarded-For (behind a proxy)
+
+RECOMMEND_BATCH_MAX_QUERIES = int(os.getenv("RECOMMEND_BATCH_MAX_QUERIES", "1000"))  # Max queries per /recommend/batch request
+RECOMMEND_BATCH_SIZE = int(os.getenv("RECOMMEND_BATCH_SIZE", "64"))  # Queries per embedding call and per Qdrant batch request
+
+STREAM_COALESCE_MIN_CHARS = int(os.getenv("STREAM_COALESCE_MIN_CHARS", "48"))  # Merge LLM deltas into chunks of at least this many chars; 0 disables
+STREAM_COALESCE_MAX_DELAY_MS = float(os.getenv("STREAM_COALESCE_MAX_DELAY_MS", "40"))  # Max time text waits to be merged
+
+MICRO_BATCHING_ENABLED = os.getenv("MICRO_BATCHING_ENABLED", "true").lower() == "true"  # Batch concurrent embed/intent calls
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "16"))  # Max queries per batched model call
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))  # Max time the first query waits for others to join
+
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"  # Cache embeddings, sparse vectors and retrieval results
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "2048"))  # Per-cache LRU bound
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "86400"))  # Embeddings only change with the model
+CACHE_RETRIEVAL_TTL_SECONDS = float(os.getenv("CACHE_RETRIEVAL_TTL_SECONDS", "600"))  # Retrieval results follow catalog updates
+CACHE_DISK_PATH = os.getenv("CACHE_DISK_PATH")  # Optional SQLite file for a persistent second cache layer
+CACHE_DISK_MAX_ROWS = int(os.getenv("CACHE_DISK_MAX_ROWS", "100000"))  # Rows closest to expiring are evicted past this
+PAYLOAD_CACHE_MAX_ENTRIES = int(os.getenv("PAYLOAD_CACHE_MAX_ENTRIES", "5000"))  # llm_context payloads for two-phase retrieval
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"  # Replay LLM answers for near-duplicate rec queries
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.95"))  # Min cosine similarity between query embeddings
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "1800"))
+RESPONSE_CACHE_WITH_HISTORY = os.getenv("RESPONSE_CACHE_WITH_HISTORY", "false").lower() == "true"  # Also cache multi-turn answers
+
+
+if not OPENAI_API_KEY or (VECTOR_BACKEND == "qdrant" and not QDRANT_API_KEY):
     raise ValueError("Missing API key(s).")
-if not QDRANT_ENDPOINT or not QDRANT_MOVIE_COLLECTION_NAME or not QDRANT_TV_COLLECTION_NAME:
+if (VECTOR_BACKEND == "qdrant" and not QDRANT_ENDPOINT) or not QDRANT_MOVIE_COLLECTION_NAME or not QDRANT_TV_COLLECTION_NAME:
     raise ValueError("Missing QDrant URL or collection name.")
@@ -0,0 +1,218 @@
+import re
+from dataclasses import dataclass
+from typing import List
+
+from app.telemetry import logger, observe_prompt
+
+try:
+    import tiktoken
+except ImportError:  # Optional: without it token counts are approximated from text length
+    tiktoken = None
+
+CONTEXT_FIELD = "llm_context"
+SHORT_CONTEXT_FIELD = "llm_context_short"  # Precomputed by scripts/build_short_contexts.py
+
+MESSAGE_OVERHEAD_TOKENS = 4  # Role and separators the chat format adds around each message
+MIN_LINE_TOKENS = 12  # Lines are never cut below this (a title, a year, a poster URL)
+MIN_ITEM_TOKENS = 60  # A lower-ranked item is dropped rather than squeezed below this
+
+_CHARS_PER_TOKEN = 4  # Approximation used when tiktoken is not installed
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+class TokenCounter:
+    """Counts tokens with the chat model's tokenizer (tiktoken), or approximates them."""
+
+    def __init__(self, model: str):
+        self.encoding = None
+        if tiktoken is None:
+            return
+        # The BPE file is downloaded on first use, so either lookup can fail offline
+        try:
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except KeyError:  # Model name tiktoken doesn't know yet
+                self.encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            logger.warning("tiktoken unavailable (%s), approximating token counts", e)
+
+    @property
+    def exact(self) -> bool:
+        return self.encoding is not None
+
+    def count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        # OpenAI's rule of thumb for English text: about 4 characters per token
+        return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Longest prefix of `text` within `max_tokens`, cut back to a word boundary."""
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text, disallowed_special=())
+            if len(tokens) <= max_tokens:
+                return text
+            prefix = self.encoding.decode(tokens[:max_tokens])
+        else:
+            if len(text) <= max_tokens * _CHARS_PER_TOKEN:
+                return text
+            prefix = text[: max(max_tokens, 0) * _CHARS_PER_TOKEN]
+        if text[len(prefix) : len(prefix) + 1] == " ":
+            return prefix  # Already ends on a word boundary
+        cut = prefix.rfind(" ")
+        return prefix[:cut] if cut > 0 else prefix
+
+
+def _truncate_line(line: str, max_tokens: int, counter: TokenCounter) -> str:
+    # Whole sentences first, then whole words, with an ellipsis marking the cut. Pieces are
+    # counted separately and summed, which is close enough to the joined count for a budget
+    budget = max_tokens - counter.count(" …")
+    sentences = _SENTENCE_END.split(line)
+    kept, used = [], 0
+    for sentence in sentences:
+        size = counter.count(sentence)
+        if used + size > budget:
+            break
+        kept.append(sentence)
+        used += size
+    if kept:
+        return " ".join(kept) + (" …" if len(kept) < len(sentences) else "")
+    return counter.truncate(line, budget) + " …"
+
+
+def shorten_context(text: str, max_tokens: int, counter: TokenCounter) -> str:
+    """Shrink an llm_context towards `max_tokens` by cutting its longest lines first.
+
+    Short lines (title, year, genres, providers, poster) stay whole, so in practice only the
+    overview is shortened. The result can stay above `max_tokens` if only short lines are left.
+    """
+    lines = text.split("\n")
+    sizes = [counter.count(line) for line in lines]
+    excess = sum(sizes) - max_tokens
+    while excess > 0:
+        i = max(range(len(lines)), key=sizes.__getitem__)
+        if sizes[i] <= MIN_LINE_TOKENS:
+            break
+        lines[i] = _truncate_line(lines[i], max(sizes[i] - excess, MIN_LINE_TOKENS), counter)
+        size = counter.count(lines[i])
+        if size >= sizes[i]:
+            break
+        excess -= sizes[i] - size
+        sizes[i] = size
+    return "\n".join(lines)
+
+
+@dataclass
+class PromptPlan:
+    context: str  # Formatted context for the kept items, best first
+    history: List  # Chat history messages kept, oldest first
+    tokens: int  # Estimated prompt tokens (system + history + user message)
+    tokens_saved: int  # Versus the untrimmed prompt
+    items_kept: int
+    items_shortened: int
+    items_dropped: int
+    history_dropped: int
+
+    def describe(self) -> str:
+        return (
+            f"{self.tokens} prompt tokens, {self.tokens_saved} saved "
+            f"({self.items_kept} items kept, {self.items_shortened} shortened, "
+            f"{self.items_dropped} dropped; {self.history_dropped} history messages dropped)"
+        )
+
+
+class ContextBuilder:
+    """Assembles the chat prompt within a token budget.
+
+    - The system prompt and the question are always sent.
+    - History is kept newest-first, up to `history_budget` tokens.
+    - Context items are added in rank order. Each item is capped at `item_max_tokens`, using
+      the precomputed short form when the full context is longer.
+    - Once an item no longer fits, it and every lower-ranked item are dropped.
+    """
+
+    def __init__(
+        self,
+        counter: TokenCounter,
+        system_prompt: str,
+        budget: int,  # Max prompt tokens: system + history + user message with context
+        item_max_tokens: int = 300,
+        history_budget: int = 1000,
+        max_history_messages: int = 10,  # Same window call_chat_model_openai sends
+    ):
+        self.counter = counter
+        self.budget = budget
+        self.item_max_tokens = item_max_tokens
+        self.history_budget = history_budget
+        self.max_history_messages = max_history_messages
+        self.system_tokens = counter.count(system_prompt) + MESSAGE_OVERHEAD_TOKENS
+        self._separator_tokens = counter.count("\n\n  ")
+
+    def _message_tokens(self, text: str) -> int:
+        return self.counter.count(text) + MESSAGE_OVERHEAD_TOKENS
+
+    def trim_history(self, history, budget: int) -> tuple[List, int, int]:
+        """Newest messages within `budget` tokens: (kept, their tokens, whole-window tokens)."""
+        window = list(history or [])[-self.max_history_messages:]
+        sizes = [self._message_tokens(m.content) for m in window]
+        kept_tokens, start = 0, len(window)
+        while start > 0 and kept_tokens + sizes[start - 1] <= budget:
+            start -= 1
+            kept_tokens += sizes[start]
+        return window[start:], kept_tokens, sum(sizes)
+
+    def _item_text(self, payload: dict, full_size: int, max_tokens: int) -> tuple[str, int, bool]:
+        full = payload.get(CONTEXT_FIELD, "")
+        if full_size <= max_tokens:
+            return full, full_size, False
+        short = payload.get(SHORT_CONTEXT_FIELD)
+        if short and self.counter.count(short) <= max_tokens:
+            text = short
+        else:
+            text = shorten_context(short or full, max_tokens, self.counter)
+        return text, self.counter.count(text), True
+
+    def build(self, user_message: str, history, points=(), intent: str = "recommendation") -> PromptPlan:
+        """Plan the prompt for `user_message` (without context) and ranked retrieval `points`."""
+        message_tokens = self._message_tokens(user_message)
+        kept_history, history_tokens, full_history_tokens = self.trim_history(
+            history, min(self.history_budget, self.budget - self.system_tokens - message_tokens)
+        )
+        remaining = self.budget - self.system_tokens - history_tokens - message_tokens
+
+        parts, shortened, dropped, full_context_tokens = [], 0, 0, 0
+        for point in points:
+            payload = point.payload or {}
+            full_size = self.counter.count(payload.get(CONTEXT_FIELD, ""))
+            full_context_tokens += full_size + self._separator_tokens
+            if dropped:
+                dropped += 1
+                continue
+
+            room = remaining - self._separator_tokens
+            text, size, cut = self._item_text(payload, full_size, self.item_max_tokens)
+            if size > room and (room >= MIN_ITEM_TOKENS or not parts):
+                # Squeeze into what's left; the top item is always sent, at worst shortened
+                text, size, cut = self._item_text(payload, full_size, max(room, MIN_ITEM_TOKENS))
+            if size > room and parts:
+                dropped = 1
+                continue
+            parts.append(text)
+            shortened += cut
+            remaining -= size + self._separator_tokens
+
+        tokens = self.budget - remaining
+        untrimmed = self.system_tokens + full_history_tokens + message_tokens + full_context_tokens
+        plan = PromptPlan(
+            context="\n\n".join(f"  {text}" for text in parts),
+            history=kept_history,
+            tokens=tokens,
+            tokens_saved=max(untrimmed - tokens, 0),
+            items_kept=len(parts),
+            items_shortened=shortened,
+            items_dropped=dropped,
+            history_dropped=min(len(list(history or [])), self.max_history_messages) - len(kept_history),
+        )
+        observe_prompt(intent, plan.tokens, plan.tokens_saved)
+        (logger.info if plan.tokens_saved else logger.debug)(f"Prompt for {intent}: {plan.describe()}")
+        return plan
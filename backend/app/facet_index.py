@@ -0,0 +1,212 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+from qdrant_client.http import models
+
+from app.telemetry import logger
+
+FACET_PAYLOAD_FIELDS = ["genres", "watch_providers", "release_year"]
+NO_YEAR = -1  # Sentinel in the per-point year array for payloads without release_year
+
+# "empty" still runs the plain payload filter: the bitmaps may not know recently added points
+FILTER_PLANS = ("unfiltered", "filtered_ann", "exact_prefiltered", "empty")
+
+
+@dataclass
+class FilterPlan:
+    """How one filtered query is executed, chosen from the facet selectivity estimate."""
+
+    strategy: str  # One of FILTER_PLANS
+    matched: int  # Points passing the facet filter
+    total: int  # Points in the collection
+    ids: List = field(default_factory=list, repr=False)  # Pre-filtered ids (exact_prefiltered only)
+
+    @property
+    def selectivity(self) -> float:
+        return self.matched / self.total if self.total else 0.0
+
+    def describe(self) -> str:
+        return f"{self.strategy} ({self.matched}/{self.total} points, {self.selectivity:.2%})"
+
+
+class FacetIndex:
+    """Per-collection bitmaps for the genre, watch-provider and release-year facets.
+
+    Each genre/provider maps to a NumPy bool array over point positions; years are a
+    dense int array. `mask()` mirrors MediaRetriever._build_filter: genres OR-ed,
+    providers OR-ed, year range inclusive, and the three AND-ed together.
+    """
+
+    def __init__(
+        self,
+        ids: Sequence,
+        genres: Dict[str, np.ndarray],
+        providers: Dict[str, np.ndarray],
+        years: np.ndarray,
+    ):
+        self.ids = np.asarray(ids, dtype=object)
+        self.genres = genres
+        self.providers = providers
+        self.years = years
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_payloads(cls, ids: Sequence, payloads: Sequence[Dict]) -> "FacetIndex":
+        n = len(ids)
+        genres: Dict[str, np.ndarray] = {}
+        providers: Dict[str, np.ndarray] = {}
+        years = np.full(n, NO_YEAR, dtype=np.int32)
+
+        for i, payload in enumerate(payloads):
+            for genre in payload.get("genres") or []:
+                genres.setdefault(genre, np.zeros(n, dtype=bool))[i] = True
+            for provider in payload.get("watch_providers") or []:
+                providers.setdefault(provider, np.zeros(n, dtype=bool))[i] = True
+            year = payload.get("release_year")
+            if isinstance(year, (int, float)):
+                years[i] = int(year)
+        return cls(ids, genres, providers, years)
+
+    @classmethod
+    def from_qdrant(cls, client, collection_name: str, batch_size: int = 2000) -> "FacetIndex":
+        ids, payloads = [], []
+        offset = None
+        while True:
+            records, offset = client.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=FACET_PAYLOAD_FIELDS,
+                with_vectors=False,
+            )
+            for r in records:
+                ids.append(r.id)
+                payloads.append(r.payload or {})
+            if offset is None:
+                break
+        return cls.from_payloads(ids, payloads)
+
+    def _any_of(self, bitmaps: Dict[str, np.ndarray], values) -> np.ndarray:
+        mask = np.zeros(len(self), dtype=bool)
+        for value in values:
+            bitmap = bitmaps.get(value)
+            if bitmap is not None:
+                mask |= bitmap
+        return mask
+
+    def mask(self, genres=None, providers=None, year_range=None) -> np.ndarray | None:
+        if not genres and not providers and not year_range:
+            return None
+        mask = np.ones(len(self), dtype=bool)
+        if genres:
+            mask &= self._any_of(self.genres, genres)
+        if providers:
+            mask &= self._any_of(self.providers, providers)
+        if year_range:
+            # NO_YEAR never satisfies a range, matching Qdrant on a missing field
+            mask &= (self.years != NO_YEAR) & (self.years >= year_range[0]) & (self.years <= year_range[1])
+        return mask
+
+    def plan(
+        self,
+        genres=None,
+        providers=None,
+        year_range=None,
+        exact_threshold: float = 0.02,  # Max selectivity for exact scoring over the pre-filtered ids
+        exact_max_ids: int = 5000,  # Cap on ids sent in one HasIdCondition
+    ) -> FilterPlan:
+        mask = self.mask(genres, providers, year_range)
+        if mask is None:
+            return FilterPlan("unfiltered", len(self), len(self))
+
+        matched = int(mask.sum())
+        if matched == 0:
+            return FilterPlan("empty", 0, len(self))
+        if matched <= exact_max_ids and matched / len(self) <= exact_threshold:
+            return FilterPlan(
+                "exact_prefiltered", matched, len(self), ids=self.ids[mask].tolist()
+            )
+        return FilterPlan("filtered_ann", matched, len(self))
+
+
+def apply_plan(plan: FilterPlan, qdrant_filter: models.Filter | None):
+    """Turn a plan into the (filter, dense search params) pair sent to the vector store.
+
+    The pre-filtered id set is added in front of the original payload conditions rather
+    than replacing them, so an index that lags behind the collection never returns points
+    that no longer match. Points added since the last rebuild are missed by the
+    exact_prefiltered plan until FacetRefresher picks them up. "empty" only means the
+    bitmaps know no match: it still sends the plain payload filter, so new points are found.
+    """
+    if plan.strategy != "exact_prefiltered":
+        return qdrant_filter, None
+    must = [models.HasIdCondition(has_id=plan.ids)]
+    if qdrant_filter is not None:
+        must += list(qdrant_filter.must or [])
+    return models.Filter(must=must), models.SearchParams(exact=True)
+
+
+class FacetRefresher:
+    """Rebuilds the facet indexes every `interval_s` and hands them to `on_load`.
+
+    The bitmaps are a snapshot of the collection, so titles ingested after a build are
+    missed by exact_prefiltered plans until the next one. Like BM25Reloader, each worker
+    process runs its own; a failed rebuild is logged and the current indexes are kept.
+    """
+
+    def __init__(
+        self,
+        load: Callable[[], Dict[str, FacetIndex]],
+        on_load: Callable[[Dict[str, FacetIndex]], None],
+        interval_s: float = 300.0,
+    ):
+        self.load = load
+        self.on_load = on_load
+        self.interval_s = interval_s
+        self.refreshes = 0
+        self.failures = 0
+        self.last_error: str | None = None
+        self.refreshed_at = time.time()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def refresh(self) -> bool:
+        try:
+            facet_indexes = self.load()
+        except Exception as e:
+            if self.last_error != str(e):
+                logger.error("Failed to rebuild the facet indexes: %s", e)
+            self.failures += 1
+            self.last_error = str(e)
+            return False
+        self.on_load(facet_indexes)
+        self.last_error = None
+        self.refreshes += 1
+        self.refreshed_at = time.time()
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            self.refresh()
+
+    def start(self) -> threading.Thread:
+        self._thread = threading.Thread(target=self._run, name="facet-refresh", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> dict:
+        return {
+            "interval_s": self.interval_s,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "refreshed_at": self.refreshed_at,
+        }
@@ -0,0 +1,147 @@
+import json
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+INFERENCE_BACKENDS = ("torch", "torch_int8", "onnx")
+
+# ONNX export layout (see scripts/export_onnx_models.py):
+#   <onnx_dir>/embedding/  sentence-transformers model + onnx/model_qint8_<arch>.onnx + fidelity.json
+#   <onnx_dir>/intent/     optimum export + model_quantized.onnx + fidelity.json
+EMBEDDING_ONNX_FILE = "onnx/model_qint8_avx2.onnx"
+INTENT_ONNX_FILE = "model_quantized.onnx"
+FIDELITY_FILE = "fidelity.json"
+
+# Sentences used to compare quantized embeddings against fp32 ones (also the warmup batch)
+FIDELITY_SENTENCES = [
+    "A suspenseful thriller with deep character development and moral ambiguity.",
+    "Coming-of-age story with emotional storytelling and strong ensemble performances.",
+    "Mind-bending sci-fi with philosophical undertones and high concept ideas.",
+    "Recommend me some comedies.",
+    "Cozy mysteries set in small English villages.",
+    "Who directed The Godfather?",
+    "Heist films with a twist ending",
+    "Anime series with great world-building and no fillers",
+]
+
+
+def _check_backend(backend: str):
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {INFERENCE_BACKENDS}")
+
+
+def embedding_cosines(reference: np.ndarray, candidate: np.ndarray) -> np.ndarray:
+    # Row-wise cosine similarity between two embedding matrices
+    reference = np.asarray(reference, dtype=np.float32)
+    candidate = np.asarray(candidate, dtype=np.float32)
+    return np.sum(reference * candidate, axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1) + 1e-12
+    )
+
+
+def check_embedding_fidelity(reference, candidate, min_cosine: float) -> float:
+    """Return the minimum cosine similarity; raise ValueError if it is below `min_cosine`."""
+    worst = float(embedding_cosines(reference, candidate).min())
+    if worst < min_cosine:
+        raise ValueError(
+            f"Quantized embeddings drift from fp32 (min cosine {worst:.4f} < {min_cosine})"
+        )
+    return worst
+
+
+def read_fidelity(model_dir: Path) -> dict:
+    path = Path(model_dir) / FIDELITY_FILE
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def write_fidelity(model_dir: Path, **report):
+    (Path(model_dir) / FIDELITY_FILE).write_text(json.dumps(report, indent=2))
+
+
+def _device():
+    import torch
+
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def _quantize_dynamic(model):
+    import torch
+
+    # int8 weights for every Linear layer; activations are quantized on the fly
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_embedding_model(
+    backend: str,
+    model_name: str,
+    onnx_dir: Path,
+    min_cosine: float = 0.99,
+):
+    """Load the query encoder for `backend`; every variant exposes SentenceTransformer.encode.
+
+    torch_int8 is checked against the fp32 model it was quantized from and falls back to it
+    when the cosine check fails. The ONNX model is checked once at export time; its
+    recorded minimum cosine must still clear `min_cosine`.
+    """
+    _check_backend(backend)
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "onnx":
+        model_dir = Path(onnx_dir) / "embedding"
+        fidelity = read_fidelity(model_dir)
+        if fidelity.get("min_cosine", 0.0) < min_cosine:
+            raise ValueError(
+                f"ONNX embedding model at {model_dir} has min cosine "
+                f"{fidelity.get('min_cosine')} < {min_cosine}; re-export or lower EMBED_MIN_COSINE"
+            )
+        return SentenceTransformer(
+            str(model_dir),
+            backend="onnx",
+            device="cpu",
+            model_kwargs={"file_name": fidelity.get("file_name", EMBEDDING_ONNX_FILE)},
+        )
+
+    model = SentenceTransformer(model_name, device="cpu" if backend == "torch_int8" else _device())
+    if backend == "torch":
+        return model
+
+    reference = model.encode(FIDELITY_SENTENCES, show_progress_bar=False)
+    quantized = _quantize_dynamic(model)
+    try:
+        worst = check_embedding_fidelity(
+            reference, quantized.encode(FIDELITY_SENTENCES, show_progress_bar=False), min_cosine
+        )
+    except ValueError as e:
+        print(f"⚠️ {e}; falling back to fp32 torch")
+        return model
+    print(f"🗜️ int8 embedding model ready (min cosine vs fp32: {worst:.4f})")
+    return quantized
+
+
+def load_intent_pipeline(backend: str, model_name: str, onnx_dir: Path):
+    _check_backend(backend)
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+
+    if backend == "torch":
+        return pipeline("text-classification", model=model_name)
+
+    if backend == "onnx":
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+
+        model_dir = Path(onnx_dir) / "intent"
+        model = ORTModelForSequenceClassification.from_pretrained(
+            str(model_dir), file_name=INTENT_ONNX_FILE
+        )
+        tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+        return pipeline("text-classification", model=model, tokenizer=tokenizer)
+
+    model = _quantize_dynamic(AutoModelForSequenceClassification.from_pretrained(model_name))
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    return pipeline("text-classification", model=model, tokenizer=tokenizer, device="cpu")
+
+
+def label_agreement(reference: List[dict], candidate: List[dict]) -> float:
+    # Fraction of queries where two intent pipelines predict the same label
+    same = sum(r["label"] == c["label"] for r, c in zip(reference, candidate))
+    return same / max(len(reference), 1)
@@ -0,0 +1,24 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# Shared, bounded pool for CPU-bound model inference (embedding, intent classification).
+# Keeping it small avoids oversubscribing torch's own intra-op threads.
+_executor: ThreadPoolExecutor | None = None
+DEFAULT_MAX_WORKERS = 2
+
+
+def init_inference_pool(max_workers: int = DEFAULT_MAX_WORKERS) -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="inference"
+        )
+    return _executor
+
+
+async def run_in_inference_pool(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        init_inference_pool(), partial(fn, *args, **kwargs)
+    )
@@ -0,0 +1,45 @@
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+
+class EmbeddingIntentClassifier:
+    """Linear (logistic regression) intent head on top of the query's dense embedding.
+
+    Reuses the vector from `MediaRetriever.embed_dense`, so intent detection costs a
+    matrix-vector product instead of a second transformer forward pass.
+    """
+
+    def __init__(self, coef: np.ndarray, intercept: np.ndarray, labels: List[str]):
+        self.coef = np.asarray(coef, dtype=np.float32)  # (n_classes, dim)
+        self.intercept = np.asarray(intercept, dtype=np.float32)  # (n_classes,)
+        self.labels = list(labels)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "EmbeddingIntentClassifier":
+        with np.load(path) as data:
+            return cls(data["coef"], data["intercept"], data["labels"].tolist())
+
+    def save(self, path: str | Path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            path,
+            coef=self.coef,
+            intercept=self.intercept,
+            labels=np.array(self.labels),
+        )
+
+    def predict_proba(self, embeddings) -> np.ndarray:
+        logits = np.atleast_2d(np.asarray(embeddings, dtype=np.float32)) @ self.coef.T
+        logits += self.intercept
+        if logits.shape[1] == 1:
+            # Binary sklearn heads store a single row of weights for the positive class
+            positive = 1.0 / (1.0 + np.exp(-logits[:, 0]))
+            return np.stack([1.0 - positive, positive], axis=1)
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        return probs / probs.sum(axis=1, keepdims=True)
+
+    def predict(self, embedding) -> str:
+        return self.labels[int(self.predict_proba(embedding)[0].argmax())]
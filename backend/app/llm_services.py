@@ -1,15 +1,45 @@
-import time
-
-import torch
-from openai import OpenAI
-from sentence_transformers import SentenceTransformer
-from app.config import EMBEDDING_MODEL, OPENAI_MODEL, OPENAI_API_KEY
+from openai import AsyncOpenAI
+from app.config import (
+    EMBED_BACKEND,
+    EMBED_MIN_COSINE,
+    EMBEDDING_MODEL,
+    HTTP_CONNECT_TIMEOUT_S,
+    HTTP_KEEPALIVE_EXPIRY_S,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE,
+    ONNX_MODEL_DIR,
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    OPENAI_HTTP2,
+    OPENAI_MAX_RETRIES,
+    OPENAI_MODEL,
+    OPENAI_TIMEOUT_S,
+)
+from app.inference_backends import load_embedding_model
+from app.transport import HttpSettings, build_async_http_client
 
 # === LLM Config ===
 _sentence_model = None  # Not loaded at import time
 
 # === Clients ===
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+# One pooled, keep-alive (HTTP/2 when h2 is installed) connection pool per process. Nothing
+# connects until the first request, so the gunicorn master can import this before forking
+_openai_http = HttpSettings(
+    max_connections=HTTP_MAX_CONNECTIONS,
+    max_keepalive=HTTP_MAX_KEEPALIVE,
+    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_S,
+    http2=OPENAI_HTTP2,
+    connect_timeout=HTTP_CONNECT_TIMEOUT_S,
+    timeout=OPENAI_TIMEOUT_S,
+    max_retries=0,  # The SDK retries itself (max_retries below), with backoff and Retry-After
+)
+openai_client = AsyncOpenAI(
+    api_key=OPENAI_API_KEY,
+    base_url=OPENAI_BASE_URL,
+    timeout=_openai_http.timeouts(),
+    max_retries=OPENAI_MAX_RETRIES,
+    http_client=build_async_http_client("openai", _openai_http),
+)
 
 # === System Prompt ===
 SYSTEM_PROMPT = """
@@ -27,14 +57,15 @@ Provide a brief explanation of why the user might enjoy each movie or tv series.
 def load_sentence_model():
     global _sentence_model
     if _sentence_model is None:
-        print("⏳ Loading embedding model...")
-        _sentence_model = SentenceTransformer(
-            EMBEDDING_MODEL, device="cuda" if torch.cuda.is_available() else "cpu"
+        print(f"⏳ Loading embedding model ({EMBED_BACKEND} backend)...")
+        # Heavy imports (torch, onnxruntime) happen inside the backend loader
+        _sentence_model = load_embedding_model(
+            EMBED_BACKEND, EMBEDDING_MODEL, ONNX_MODEL_DIR, min_cosine=EMBED_MIN_COSINE
         )
 
-        print(f"🔥 Model '{EMBEDDING_MODEL}' loaded. Performing GPU warmup...")
+        print(f"🔥 Model '{EMBEDDING_MODEL}' loaded. Warming up...")
 
-        # Realistic multi-sentence warmup to trigger full CUDA graph
+        # One realistic multi-sentence batch initializes kernels / allocator pools
         warmup_sentences = [
             "A suspenseful thriller with deep character development and moral ambiguity.",
             "Coming-of-age story with emotional storytelling and strong ensemble performances.",
@@ -42,8 +73,6 @@ def load_sentence_model():
             "Recommend me some comedies.",
         ]
         _ = _sentence_model.encode(warmup_sentences, show_progress_bar=False)
-        time.sleep(0.5)
-        _ = _sentence_model.encode(warmup_sentences, show_progress_bar=False)
         print("🚀 Embedding model fully warmed up.")
 
     return _sentence_model
@@ -62,16 +91,16 @@ def build_chat_history(history: list, max_turns: int = 5) -> list:
 
 
 
-def call_chat_model_openai(history, user_message: str):
+async def call_chat_model_openai(history, user_message: str):
     messages = [{"role": "system", "content": SYSTEM_PROMPT}]
     messages += build_chat_history(history or [])
     messages.append({"role": "user", "content": user_message})
 
-    response = openai_client.chat.completions.create(
+    response = await openai_client.chat.completions.create(
         model=OPENAI_MODEL, messages=messages, temperature=0.7, stream=True
     )
 
-    for chunk in response:
+    async for chunk in response:
         delta = chunk.choices[0].delta.content
         if delta:
             yield delta
@@ -0,0 +1,346 @@
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import numpy as np
+from qdrant_client.http import models
+
+try:
+    import hnswlib
+except ImportError:  # Optional: brute-force search is used without it
+    hnswlib = None
+
+DENSE_SEARCH_CHUNK = 65536  # Rows scored per matmul when the matrix is stored as float16
+
+
+def _payload_matches(value, condition: models.FieldCondition) -> bool:
+    values = value if isinstance(value, list) else [value]
+    if condition.match is not None:
+        match = condition.match
+        if isinstance(match, models.MatchValue):
+            return match.value in values
+        if isinstance(match, models.MatchAny):
+            return any(v in match.any for v in values)
+        if isinstance(match, models.MatchExcept):
+            return not any(v in match.except_ for v in values)
+        raise NotImplementedError(f"Unsupported match type: {type(match).__name__}")
+    if condition.range is not None:
+        r = condition.range
+        return any(
+            isinstance(v, (int, float))
+            and (r.gte is None or v >= r.gte)
+            and (r.gt is None or v > r.gt)
+            and (r.lte is None or v <= r.lte)
+            and (r.lt is None or v < r.lt)
+            for v in values
+        )
+    raise NotImplementedError(f"Unsupported field condition on '{condition.key}'")
+
+
+def write_local_snapshot(
+    path: str | Path,
+    ids: List,
+    dense: np.ndarray,
+    sparse: List[Dict],
+    payloads: List[Dict],
+    dense_vector_name: str = "dense_vector",
+    sparse_vector_name: str = "sparse_vector",
+    dense_dtype: str = "float32",
+):
+    """Write a collection snapshot in the layout LocalCollection loads.
+
+    `sparse` holds one {"indices": [...], "values": [...]} dict per point.
+    """
+    path = Path(path)
+    if not ids:
+        # The dense dimension comes from the vectors, and searches need at least one row
+        raise ValueError(f"Cannot write an empty local snapshot to {path}: the collection has no points")
+    path.mkdir(parents=True, exist_ok=True)
+
+    dense = np.asarray(dense, dtype=np.float32)
+    norms = np.linalg.norm(dense, axis=1, keepdims=True)
+    np.save(path / "dense.npy", (dense / np.where(norms == 0, 1.0, norms)).astype(dense_dtype))
+
+    lengths = [len(s["indices"]) for s in sparse]
+    np.save(path / "sparse_indptr.npy", np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64))
+    np.save(path / "sparse_indices.npy", np.array([i for s in sparse for i in s["indices"]], dtype=np.int64))
+    np.save(path / "sparse_values.npy", np.array([v for s in sparse for v in s["values"]], dtype=np.float32))
+
+    (path / "ids.json").write_text(json.dumps(ids))
+    with (path / "payloads.jsonl").open("w") as f:
+        for payload in payloads:
+            f.write(json.dumps(payload) + "\n")
+    (path / "meta.json").write_text(
+        json.dumps(
+            {
+                "points": len(ids),
+                "dim": int(dense.shape[1]),
+                "dense_dtype": dense_dtype,
+                "dense_vector_name": dense_vector_name,
+                "sparse_vector_name": sparse_vector_name,
+            }
+        )
+    )
+
+
+class LocalCollection:
+    """One exported collection: dense matrix, sparse inverted index, ids and payloads.
+
+    Snapshot layout (see scripts/export_qdrant_snapshot.py):
+        meta.json, ids.json, payloads.jsonl, dense.npy (L2-normalized rows),
+        sparse_indptr.npy / sparse_indices.npy / sparse_values.npy (CSR by point)
+    """
+
+    def __init__(self, path: str | Path, ann: str = "exact"):
+        path = Path(path)
+        self.meta = json.loads((path / "meta.json").read_text())
+        self.dense_name = self.meta["dense_vector_name"]
+        self.sparse_name = self.meta["sparse_vector_name"]
+
+        self.ids = json.loads((path / "ids.json").read_text())
+        self.position = {id_: i for i, id_ in enumerate(self.ids)}
+        with (path / "payloads.jsonl").open() as f:
+            self.payloads = [json.loads(line) for line in f]
+
+        self.dense = np.load(path / "dense.npy", mmap_mode="r")
+        self._build_sparse_index(
+            np.load(path / "sparse_indptr.npy"),
+            np.load(path / "sparse_indices.npy"),
+            np.load(path / "sparse_values.npy"),
+        )
+
+        self.hnsw = None
+        if ann == "hnsw":
+            self.hnsw = self._build_hnsw(path)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _build_sparse_index(self, indptr, indices, values):
+        # CSR (point -> terms) to inverted postings (term -> points, weights)
+        point_of_entry = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        order = np.argsort(indices, kind="stable")
+        terms, starts = np.unique(indices[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        self.postings = {
+            int(t): (point_of_entry[order[s:e]], values[order[s:e]].astype(np.float32))
+            for t, s, e in zip(terms, starts, ends)
+        }
+
+    def _build_hnsw(self, path: Path):
+        if hnswlib is None:
+            raise ImportError("LOCAL_INDEX_ANN=hnsw requires the 'hnswlib' package")
+        index = hnswlib.Index(space="ip", dim=self.dense.shape[1])
+        index_path = path / "dense_hnsw.bin"
+        if index_path.exists():
+            index.load_index(str(index_path), max_elements=len(self))
+        else:
+            index.init_index(max_elements=len(self), ef_construction=200, M=16)
+            index.add_items(np.asarray(self.dense, dtype=np.float32), np.arange(len(self)))
+            index.save_index(str(index_path))
+        index.set_ef(256)
+        return index
+
+    def filter_mask(self, query_filter) -> np.ndarray | None:
+        if query_filter is None:
+            return None
+        id_sets: Dict[int, set] = {}  # Per call, so concurrent searches don't share state
+        if isinstance(query_filter, dict):
+            query_filter = models.Filter(**query_filter)
+
+        # Top-level has_id (facet pre-filtering): only evaluate the rest on those points
+        id_conditions = [c for c in query_filter.must or [] if isinstance(c, models.HasIdCondition)]
+        if id_conditions:
+            candidates = None
+            for condition in id_conditions:
+                positions = {self.position[i] for i in condition.has_id if i in self.position}
+                candidates = positions if candidates is None else candidates & positions
+            rest = query_filter.model_copy(
+                update={"must": [c for c in query_filter.must if not isinstance(c, models.HasIdCondition)]}
+            )
+            mask = np.zeros(len(self), dtype=bool)
+            for i in candidates:
+                mask[i] = self._matches(self.payloads[i], i, rest, id_sets)
+            return mask
+
+        return np.fromiter(
+            (self._matches(payload, i, query_filter, id_sets) for i, payload in enumerate(self.payloads)),
+            dtype=bool,
+            count=len(self),
+        )
+
+    def _matches(self, payload: Dict, position: int, condition, id_sets: Dict[int, set]) -> bool:
+        if isinstance(condition, dict):
+            condition = models.Filter(**condition)
+        if isinstance(condition, models.Filter):
+            if condition.must and not all(self._matches(payload, position, c, id_sets) for c in condition.must):
+                return False
+            if condition.should and not any(self._matches(payload, position, c, id_sets) for c in condition.should):
+                return False
+            if condition.must_not and any(self._matches(payload, position, c, id_sets) for c in condition.must_not):
+                return False
+            return True
+        if isinstance(condition, models.HasIdCondition):
+            key = id(condition)
+            if key not in id_sets:
+                id_sets[key] = set(condition.has_id)
+            return self.ids[position] in id_sets[key]
+        if isinstance(condition, models.FieldCondition):
+            value = payload.get(condition.key)
+            return value is not None and _payload_matches(value, condition)
+        raise NotImplementedError(f"Unsupported condition type: {type(condition).__name__}")
+
+    def search_dense(self, vector, limit: int, mask: np.ndarray | None, exact: bool = False):
+        query = np.asarray(vector, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+
+        if self.hnsw is not None and not exact:
+            allowed = None if mask is None else (lambda label: bool(mask[label]))
+            k = min(limit, len(self) if mask is None else int(mask.sum()))
+            if k == 0:
+                return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+            labels, distances = self.hnsw.knn_query(query, k=k, filter=allowed)
+            return labels[0].astype(np.int64), 1.0 - distances[0]
+
+        if mask is not None and mask.sum() < len(self) // 8:
+            # Selective filter: score only the allowed rows
+            candidates = np.flatnonzero(mask)
+            scores = np.asarray(self.dense[candidates], dtype=np.float32) @ query
+            return self._top(candidates, scores, limit)
+
+        scores = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), DENSE_SEARCH_CHUNK):
+            block = np.asarray(self.dense[start : start + DENSE_SEARCH_CHUNK], dtype=np.float32)
+            scores[start : start + len(block)] = block @ query
+        candidates = np.arange(len(self)) if mask is None else np.flatnonzero(mask)
+        return self._top(candidates, scores[candidates], limit)
+
+    def search_sparse(self, vector: models.SparseVector, limit: int, mask: np.ndarray | None):
+        scores = np.zeros(len(self), dtype=np.float32)
+        touched = np.zeros(len(self), dtype=bool)
+        for term, weight in zip(vector.indices, vector.values):
+            postings = self.postings.get(int(term))
+            if postings is not None:
+                points, values = postings
+                scores[points] += weight * values
+                touched[points] = True
+        if mask is not None:
+            touched &= mask
+        candidates = np.flatnonzero(touched)
+        return self._top(candidates, scores[candidates], limit)
+
+    @staticmethod
+    def _top(candidates: np.ndarray, scores: np.ndarray, limit: int):
+        if len(candidates) > limit:
+            keep = np.argpartition(-scores, limit - 1)[:limit]
+            candidates, scores = candidates[keep], scores[keep]
+        order = np.argsort(-scores, kind="stable")
+        return candidates[order], scores[order]
+
+    def select_payload(self, position: int, with_payload) -> Dict | None:
+        if not with_payload:
+            return None
+        payload = self.payloads[position]
+        if with_payload is True:
+            return dict(payload)
+        if isinstance(with_payload, models.PayloadSelectorInclude):
+            with_payload = with_payload.include
+        return {k: payload[k] for k in with_payload if k in payload}
+
+
+class LocalVectorStore:
+    """In-process stand-in for the subset of QdrantClient that MediaRetriever uses.
+
+    Collections are snapshot directories under `root`, named after the Qdrant collection.
+    """
+
+    def __init__(self, root: str | Path, ann: str = "exact"):
+        self.root = Path(root)
+        self.ann = ann
+        self._collections: Dict[str, LocalCollection] = {}
+        self._lock = threading.Lock()
+
+    def collection(self, collection_name: str) -> LocalCollection:
+        if collection_name not in self._collections:
+            with self._lock:
+                if collection_name not in self._collections:
+                    self._collections[collection_name] = LocalCollection(
+                        self.root / collection_name, ann=self.ann
+                    )
+        return self._collections[collection_name]
+
+    def query_points(
+        self,
+        collection_name: str,
+        query,
+        using: str | None = None,
+        query_filter: models.Filter | None = None,
+        limit: int = 10,
+        with_payload=True,
+        with_vectors=False,
+        search_params: models.SearchParams | None = None,
+        **kwargs,
+    ) -> models.QueryResponse:
+        collection = self.collection(collection_name)
+        mask = collection.filter_mask(query_filter)
+
+        if isinstance(query, models.NearestQuery):
+            query = query.nearest
+        if isinstance(query, models.SparseVector):
+            if using not in (None, collection.sparse_name):
+                raise ValueError(f"Unknown sparse vector name '{using}'")
+            positions, scores = collection.search_sparse(query, limit, mask)
+        else:
+            if using not in (None, collection.dense_name):
+                raise ValueError(f"Unknown dense vector name '{using}'")
+            exact = bool(search_params is not None and search_params.exact)
+            positions, scores = collection.search_dense(query, limit, mask, exact=exact)
+
+        return models.QueryResponse(
+            points=[
+                models.ScoredPoint(
+                    id=collection.ids[pos],
+                    version=0,
+                    score=float(score),
+                    payload=collection.select_payload(pos, with_payload),
+                    vector=None,
+                )
+                for pos, score in zip(positions.tolist(), scores.tolist())
+            ]
+        )
+
+    def query_batch_points(
+        self, collection_name: str, requests: Sequence[models.QueryRequest], **kwargs
+    ) -> List[models.QueryResponse]:
+        return [
+            self.query_points(
+                collection_name=collection_name,
+                query=r.query,
+                using=r.using,
+                query_filter=r.filter,
+                limit=r.limit or 10,
+                with_payload=r.with_payload if r.with_payload is not None else False,
+                search_params=r.params,
+            )
+            for r in requests
+        ]
+
+    def retrieve(
+        self,
+        collection_name: str,
+        ids: Sequence,
+        with_payload=True,
+        with_vectors=False,
+        **kwargs,
+    ) -> List[models.Record]:
+        collection = self.collection(collection_name)
+        return [
+            models.Record(
+                id=id_,
+                payload=collection.select_payload(collection.position[id_], with_payload),
+                vector=None,
+            )
+            for id_ in ids
+            if id_ in collection.position
+        ]
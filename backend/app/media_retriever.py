@@ -1,21 +1,51 @@
+import asyncio
 from collections import Counter
-from typing import Dict, List
-
-from nltk.corpus import stopwords
-from nltk.stem import PorterStemmer
-from nltk.tokenize import word_tokenize
-from qdrant_client import QdrantClient
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List
+
+import numpy as np
+
+from app.batcher import MicroBatcher
+from app.bm25_index import CompactBM25
+from app.cache import TTLCache, filters_key, normalize_query
+from app.facet_index import FacetIndex, FilterPlan, apply_plan
+from app.inference_pool import run_in_inference_pool
+from app.query_analyzer import QueryAnalyzer
+from app.reranker import fuse, rerank
+from app.telemetry import intent_label, logger, rerank_debug_sampled, span
+from app.vectorstore import VectorStoreBackend
+from qdrant_client import AsyncQdrantClient
 from qdrant_client.models import FieldCondition, Filter, MatchValue, Range, models
-from sentence_transformers import SentenceTransformer
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+
+RETRIEVAL_MODES = ("sequential", "parallel", "batch")
+RERANK_PAYLOAD_FIELDS = ["title", "popularity", "vote_average"]
+CONTEXT_PAYLOAD_FIELDS = ["llm_context", "llm_context_short"]  # Short form is optional (scripts/build_short_contexts.py)
+
+
+def to_recommendations(points: List, include_context: bool = False) -> List[Dict]:
+    # JSON-ready ranked results, as returned by /recommend/batch and scripts/recommend_batch.py
+    return [
+        {
+            "rank": rank,
+            "id": p.id,
+            "payload": {
+                k: v for k, v in (p.payload or {}).items() if include_context or k not in CONTEXT_PAYLOAD_FIELDS
+            },
+        }
+        for rank, p in enumerate(points, start=1)
+    ]
 
 
 class MediaRetriever:
     def __init__(
         self,
-        embed_model: SentenceTransformer,
-        qdrant_client: QdrantClient,
-        bm25_models: Dict,
-        bm25_vocabs: Dict,
+        embed_model: "SentenceTransformer",
+        qdrant_client: VectorStoreBackend,  # QdrantClient or LocalVectorStore
+        bm25_indexes: Dict[str, CompactBM25],  # "movie" / "tv" -> query-side BM25 tables
         movie_collection_name: str,
         tv_collection_name: str,
         dense_weight: float = 0.4,  # Weight of semantic match score for reranking
@@ -25,13 +55,46 @@ class MediaRetriever:
         semantic_retrieval_limit: int = 300,  # Number of movies to retrieve for reranking
         bm25_retrieval_limit: int = 20,
         top_k: int = 20,  # Number of post-reranking movies to send to LLM
+        async_qdrant_client: AsyncQdrantClient | None = None,
+        retrieval_mode: str = "batch",  # How dense + sparse queries hit Qdrant: sequential, parallel or batch
+        dense_batcher: MicroBatcher | None = None,  # Shared micro-batcher for query embedding
+        embedding_cache: TTLCache | None = None,  # Dense vectors keyed by normalized query
+        sparse_cache: TTLCache | None = None,  # BM25 sparse vectors keyed by media type + normalized query + BM25 version
+        retrieval_cache: TTLCache | None = None,  # Reranked results keyed by query + filters
+        two_phase_retrieval: bool = False,  # Fetch llm_context only for the final top-k
+        payload_cache: TTLCache | None = None,  # llm_context payloads keyed by (collection, point id)
+        facet_indexes: Dict[str, FacetIndex] | None = None,  # Collection name -> genre/provider/year bitmaps
+        facet_exact_threshold: float = 0.02,  # Filters matching at most this fraction use exact scoring
+        facet_exact_max_ids: int = 5000,
+        query_analyzer: QueryAnalyzer | None = None,  # Shared analyzer (loaded during startup)
     ):
+        if retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(
+                f"Unknown retrieval_mode '{retrieval_mode}', expected one of {RETRIEVAL_MODES}"
+            )
         self.client = qdrant_client
+        self.async_client = async_qdrant_client
+        self.retrieval_mode = retrieval_mode
+        self.dense_batcher = dense_batcher
+        self.embedding_cache = embedding_cache
+        self.sparse_cache = sparse_cache
+        self.retrieval_cache = retrieval_cache
+        self.two_phase_retrieval = two_phase_retrieval
+        self.payload_cache = payload_cache
+        self.facet_indexes = facet_indexes or {}
+        self.facet_exact_threshold = facet_exact_threshold
+        self.facet_exact_max_ids = facet_exact_max_ids
+        self.query_analyzer = query_analyzer or QueryAnalyzer()
+        self._query_pool = (
+            ThreadPoolExecutor(max_workers=8, thread_name_prefix="qdrant-query")
+            if retrieval_mode == "parallel"
+            else None
+        )
         self.movie_collection_name = movie_collection_name
         self.tv_collection_name = tv_collection_name
         self.embed_model = embed_model
-        self.bm25_models = bm25_models
-        self.bm25_vocabs = bm25_vocabs
+        self.bm25_indexes = bm25_indexes
+        self.bm25_version = next(iter(bm25_indexes.values())).version if bm25_indexes else None
         self.dense_weight = dense_weight
         self.sparse_weight = sparse_weight
         self.rating_weight = rating_weight
@@ -40,30 +103,99 @@ class MediaRetriever:
         self.bm25_retrieval_limit = bm25_retrieval_limit
         self.top_k = top_k
 
-    def embed_dense(self, query: str) -> List[float]:
-        return self.embed_model.encode(query).tolist()
+    @staticmethod
+    def _cache_get(cache: TTLCache | None, key):
+        return cache.get(key) if cache is not None else None
 
     @staticmethod
-    def tokenize_and_preprocess(text: str) -> List[str]:
-        stop_words = set(stopwords.words("english"))
-        stemmer = PorterStemmer()
+    def _cache_set(cache: TTLCache | None, key, value):
+        if cache is not None:
+            cache.set(key, value)
+        return value
 
-        tokens = word_tokenize(text.lower())
-        filtered_tokens = [w for w in tokens if w not in stop_words and w.isalnum()]
-        processed_tokens = [stemmer.stem(w) for w in filtered_tokens]
+    @staticmethod
+    async def _cache_get_async(cache: TTLCache | None, key):
+        # One lookup per layer: memory on the event loop, SQLite (if configured) in a
+        # thread; not the inference pool, whose few threads are reserved for the models
+        if cache is None:
+            return None
+        value = cache.get_memory(key)
+        if value is None:
+            if cache.disk_backend is None:
+                value = cache.get(key, memory=False)
+            else:
+                value = await asyncio.to_thread(cache.get, key, False)
+        return value
+
+    @classmethod
+    async def _cache_set_async(cls, cache: TTLCache | None, key, value):
+        if cache is not None and cache.disk_backend is not None:
+            return await asyncio.to_thread(cls._cache_set, cache, key, value)
+        return cls._cache_set(cache, key, value)
+
+    def _embed_dense_uncached(self, query: str) -> List[float]:
+        if self.dense_batcher is not None:
+            return self.dense_batcher(query)
+        return self.embed_model.encode(query).tolist()
 
-        return processed_tokens
+    def embed_dense(self, query: str) -> List[float]:
+        key = normalize_query(query)
+        cached = self._cache_get(self.embedding_cache, key)
+        if cached is not None:
+            return cached
+        return self._cache_set(self.embedding_cache, key, self._embed_dense_uncached(query))
+
+    def embed_dense_batch(self, queries: List[str]) -> List[List[float]]:
+        return self.embed_model.encode(
+            queries, batch_size=len(queries), show_progress_bar=False
+        ).tolist()
+
+    async def embed_dense_async(self, query: str) -> List[float]:
+        key = normalize_query(query)
+        cached = await self._cache_get_async(self.embedding_cache, key)
+        if cached is not None:
+            return cached
+
+        if self.dense_batcher is not None:
+            vector = await self.dense_batcher.call_async(query)
+        else:
+            vector = await run_in_inference_pool(self._embed_dense_uncached, query)
+        return await self._cache_set_async(self.embedding_cache, key, vector)
+
+    def swap_bm25(
+        self,
+        bm25_indexes: Dict[str, CompactBM25],
+        version: str | None,
+        facet_indexes: Dict[str, FacetIndex] | None = None,  # Rebuilt bitmaps covering the new titles
+    ):
+        """Switch to newly published BM25 tables; queries already running finish on the old ones."""
+        # Sparse cache keys carry the version and are built before the tables are read, so
+        # a query racing the swap can only cache new-table vectors under the old version.
+        # Facets go first for the same reason: retrieval results cached under the new
+        # version are never planned with bitmaps that miss its titles
+        if facet_indexes is not None:
+            self.facet_indexes = facet_indexes
+        self.bm25_indexes = bm25_indexes
+        self.bm25_version = version
+
+    def tokenize_and_preprocess(self, text: str) -> List[str]:
+        return self.query_analyzer.analyze(text)
+
+    def _sparse_cache_key(self, query: str, media_type: str) -> tuple:
+        return media_type.lower(), normalize_query(query), self.bm25_version
 
     def embed_sparse(self, query: str, media_type: str) -> Dict:
-        bm25_model = (
-            self.bm25_models["movie"]
-            if media_type.lower() == "movies"
-            else self.bm25_models["tv"]
-        )
-        bm25_vocab = (
-            self.bm25_vocabs["movie"]
+        key = self._sparse_cache_key(query, media_type)
+        cached = self._cache_get(self.sparse_cache, key)
+        if cached is not None:
+            return cached
+        return self._cache_set(self.sparse_cache, key, self._embed_sparse_uncached(query, media_type))
+
+    def _embed_sparse_uncached(self, query: str, media_type: str) -> Dict:
+        bm25_index = (
+            self.bm25_indexes["movie"]
             if media_type.lower() == "movies"
-            else self.bm25_vocabs["tv"]
+            else self.bm25_indexes["tv"]
         )
 
         tokens = self.tokenize_and_preprocess(query)
@@ -71,21 +203,89 @@ class MediaRetriever:
         term_counts = Counter(tokens)
         indices, values = [], []
 
-        avg_doc_length = bm25_model.avgdl
-        k1, b = bm25_model.k1, bm25_model.b
+        avg_doc_length = bm25_index.avgdl
+        k1, b = bm25_index.k1, bm25_index.b
 
         for term, tf in term_counts.items():
-            if term in bm25_vocab:
-                idx = bm25_vocab[term]
-                idf = bm25_model.idf.get(term, 0)
+            idx = bm25_index.term_id(term)
+            if idx is not None:
+                idf = float(bm25_index.idf[idx])
                 numerator = idf * tf * (k1 + 1)
                 denominator = tf + k1 * (1 - b + b * len(tokens) / avg_doc_length)
                 if denominator != 0:
                     weight = numerator / denominator
                     indices.append(idx)
                     values.append(float(weight))
-        sparse_vector = {"indices": indices, "values": values}
-        return sparse_vector
+        return {"indices": indices, "values": values}
+
+    async def embed_sparse_async(self, query: str, media_type: str) -> Dict:
+        # The key (and its BM25 version) is taken before the tables are read, as in embed_sparse
+        key = self._sparse_cache_key(query, media_type)
+        cached = await self._cache_get_async(self.sparse_cache, key)
+        if cached is not None:
+            return cached
+        vector = await run_in_inference_pool(self._embed_sparse_uncached, query, media_type)
+        return await self._cache_set_async(self.sparse_cache, key, vector)
+
+    def embed_dense_many(self, queries: List[str], batch_size: int = 64) -> List[List[float]]:
+        # Bulk counterpart of embed_dense: uncached distinct queries, batch_size per encode call
+        keys = [normalize_query(q) for q in queries]
+        vectors, missing = {}, {}
+        for query, key in zip(queries, keys):
+            if key in vectors or key in missing:
+                continue
+            cached = self._cache_get(self.embedding_cache, key)
+            if cached is not None:
+                vectors[key] = cached
+            else:
+                missing[key] = query
+
+        pending = list(missing.items())
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start : start + batch_size]
+            encoded = self.embed_model.encode(
+                [query for _, query in chunk], batch_size=batch_size, show_progress_bar=False
+            ).tolist()
+            for (key, _), vector in zip(chunk, encoded):
+                vectors[key] = self._cache_set(self.embedding_cache, key, vector)
+        return [vectors[key] for key in keys]
+
+    def embed_sparse_many(self, queries: List[str], media_type: str) -> List[Dict]:
+        # Bulk counterpart of embed_sparse: one vocab lookup for every distinct term of the
+        # uncached queries, then NumPy weighting per query. Same vectors as embed_sparse.
+        media_type = media_type.lower()
+        keys = [self._sparse_cache_key(q, media_type) for q in queries]
+        vectors, missing = {}, {}
+        for query, key in zip(queries, keys):
+            if key in vectors or key in missing:
+                continue
+            cached = self._cache_get(self.sparse_cache, key)
+            if cached is not None:
+                vectors[key] = cached
+            else:
+                missing[key] = query
+
+        bm25_index = self.bm25_indexes["movie" if media_type == "movies" else "tv"]
+        analyzed = {key: self.tokenize_and_preprocess(query) for key, query in missing.items()}
+        vocab = sorted({term for terms in analyzed.values() for term in terms})
+        term_ids = dict(zip(vocab, bm25_index.term_ids_for(vocab).tolist()))
+        k1, b = bm25_index.k1, bm25_index.b
+
+        for key, terms in analyzed.items():
+            term_counts = Counter(term for term in terms if term_ids[term] >= 0)
+            indices = np.fromiter((term_ids[t] for t in term_counts), dtype=np.int64, count=len(term_counts))
+            tf = np.fromiter(term_counts.values(), dtype=np.float64, count=len(term_counts))
+            weights = (bm25_index.idf[indices] * tf * (k1 + 1)) / (
+                tf + k1 * (1 - b + b * len(terms) / bm25_index.avgdl)
+            )
+            vector = {"indices": indices.tolist(), "values": weights.tolist()}
+            vectors[key] = self._cache_set(self.sparse_cache, key, vector)
+        return [vectors[key] for key in keys]
+
+    def _retrieval_cache_key(self, query, media_type, genres, providers, year_range):
+        return (normalize_query(query), self.bm25_version) + filters_key(
+            media_type, genres, providers, year_range
+        )
 
     def retrieve_and_rerank(
         self,
@@ -95,45 +295,232 @@ class MediaRetriever:
         genres=None,
         providers=None,
         year_range=None,
+        query: str | None = None,  # Original question; enables the retrieval cache when given
     ) -> List[dict]:
+        cache_key = None
+        if query is not None and self.retrieval_cache is not None:
+            cache_key = self._retrieval_cache_key(
+                query, media_type, genres, providers, year_range
+            )
+            cached = self.retrieval_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         # Construct Qdrant filter based on user input
-        qdrant_filter = self._build_filter(genres, providers, year_range)
+        qdrant_filter, search_params, _ = self._plan_query(
+            media_type, genres, providers, year_range
+        )
 
-        # Query Qdrant for semantic search with dense vector
-        dense_results = self._query_dense(
-            vector=dense_vector,
-            media_type=media_type,
-            qdrant_filter=qdrant_filter,
+        # Query Qdrant for semantic (dense) and BM25 (sparse) search
+        dense_results, sparse_results = self._query_hybrid(
+            dense_vector, sparse_vector, media_type, qdrant_filter, search_params
+        )
+
+        results = self._fuse_and_rerank(dense_results, sparse_results)
+        if self.two_phase_retrieval:
+            self._attach_context(results, media_type)
+        if cache_key is not None:
+            self.retrieval_cache.set(cache_key, results)
+        return results
+
+    async def retrieve_and_rerank_async(
+        self,
+        dense_vector: List[float],
+        sparse_vector: Dict,
+        media_type: str = "movies",
+        genres=None,
+        providers=None,
+        year_range=None,
+        query: str | None = None,
+    ) -> List[dict]:
+        cache_key = None
+        if query is not None and self.retrieval_cache is not None:
+            cache_key = self._retrieval_cache_key(
+                query, media_type, genres, providers, year_range
+            )
+            cached = await self._cache_get_async(self.retrieval_cache, cache_key)
+            if cached is not None:
+                return cached
+
+        qdrant_filter, search_params, _ = self._plan_query(
+            media_type, genres, providers, year_range
         )
 
-        # Query Qdrant for BM25 search with sparse vector
-        sparse_results = self._query_sparse(
-            vector=sparse_vector,
-            media_type=media_type,
-            qdrant_filter=qdrant_filter,
+        dense_results, sparse_results = await self._query_hybrid_async(
+            dense_vector, sparse_vector, media_type, qdrant_filter, search_params
         )
 
+        results = self._fuse_and_rerank(dense_results, sparse_results)
+        if self.two_phase_retrieval:
+            await self._attach_context_async(results, media_type)
+        if cache_key is not None:
+            await self._cache_set_async(self.retrieval_cache, cache_key, results)
+        return results
+
+    def recommend_batch(
+        self, queries: List[Dict], batch_size: int = 64, with_context: bool = False
+    ) -> List[List]:
+        """Reranked points for many queries at once, with no intent classification or LLM.
+
+        Each query is a dict with a `question` and optional `media_type`, `genres`,
+        `providers` and `year_range`. Questions are embedded `batch_size` at a time, BM25
+        vectors are built in bulk per media type, and the dense + sparse searches of up to
+        `batch_size` queries go to Qdrant in one query_batch_points request. Fusion and
+        reranking then run per query, exactly as for /chat.
+
+        In two-phase mode candidates carry no llm_context. `with_context` fetches it for the
+        winners, in one retrieve per collection.
+        """
+        with intent_label("batch"):
+            return self._recommend_batch(queries, batch_size, with_context)
+
+    def _recommend_batch(self, queries: List[Dict], batch_size: int, with_context: bool) -> List[List]:
+        results: List[List | None] = [None] * len(queries)
+        pending = []  # (position, query, retrieval cache key, filter, search params)
+        for i, query in enumerate(queries):
+            query = {"media_type": "movies", **query}
+            cache_key = None
+            if self.retrieval_cache is not None:
+                cache_key = self._retrieval_cache_key(
+                    query["question"],
+                    query["media_type"],
+                    query.get("genres"),
+                    query.get("providers"),
+                    query.get("year_range"),
+                )
+                results[i] = self.retrieval_cache.get(cache_key)
+                if results[i] is not None:
+                    continue
+            qdrant_filter, search_params, _ = self._plan_query(
+                query["media_type"], query.get("genres"), query.get("providers"), query.get("year_range")
+            )
+            pending.append((i, query, cache_key, qdrant_filter, search_params))
+
+        with span("embed_dense"):
+            dense_vectors = self.embed_dense_many([q["question"] for _, q, *_ in pending], batch_size)
+        sparse_vectors = [None] * len(pending)
+        by_media_type: Dict[str, List[int]] = {}
+        for j, (_, query, *_) in enumerate(pending):
+            by_media_type.setdefault(query["media_type"], []).append(j)
+        with span("embed_sparse"):
+            for media_type, members in by_media_type.items():
+                vectors = self.embed_sparse_many([pending[j][1]["question"] for j in members], media_type)
+                for j, vector in zip(members, vectors):
+                    sparse_vectors[j] = vector
+
+        for media_type, members in by_media_type.items():
+            for start in range(0, len(members), batch_size):
+                chunk = members[start : start + batch_size]
+                requests = [
+                    request
+                    for j in chunk
+                    for request in self._batch_requests(
+                        dense_vectors[j], sparse_vectors[j], media_type, pending[j][3], pending[j][4]
+                    )
+                ]
+                with span("qdrant_batch"):
+                    responses = self.client.query_batch_points(
+                        collection_name=self._collection_for(media_type), requests=requests
+                    )
+                for j, dense_results, sparse_results in zip(chunk, responses[::2], responses[1::2]):
+                    results[pending[j][0]] = self._fuse_and_rerank(dense_results, sparse_results)
+
+            if self.two_phase_retrieval and with_context:
+                self._attach_context(
+                    [p for j in members for p in results[pending[j][0]]], media_type
+                )
+
+        # Only complete results are cached: /chat reads llm_context from cached entries
+        if not self.two_phase_retrieval or with_context:
+            for i, _, cache_key, *_ in pending:
+                if cache_key is not None:
+                    self.retrieval_cache.set(cache_key, results[i])
+        return results
+
+    def _candidate_payload_fields(self) -> List[str]:
+        # Two-phase mode only transfers what reranking needs for the candidate set
+        if self.two_phase_retrieval:
+            return RERANK_PAYLOAD_FIELDS
+        return CONTEXT_PAYLOAD_FIELDS + RERANK_PAYLOAD_FIELDS
+
+    def _missing_context_ids(self, points: List, collection: str) -> List:
+        missing = []
+        for p in points:
+            cached = self._cache_get(self.payload_cache, (collection, p.id))
+            if cached is not None:
+                p.payload.update(cached)
+            else:
+                missing.append(p.id)
+        return list(dict.fromkeys(missing))  # Batched results can share points
+
+    def _merge_context(self, points: List, records: List, collection: str):
+        payloads = {r.id: r.payload or {} for r in records}
+        for p in points:
+            if p.id in payloads:
+                p.payload.update(payloads[p.id])
+                self._cache_set(self.payload_cache, (collection, p.id), payloads[p.id])
+
+    def _attach_context(self, points: List, media_type: str):
+        # Second phase: one batched retrieve of llm_context for the reranked winners
+        collection = self._collection_for(media_type)
+        missing = self._missing_context_ids(points, collection)
+        if missing:
+            with span("fetch_context"):
+                records = self.client.retrieve(
+                    collection_name=collection,
+                    ids=missing,
+                    with_payload=CONTEXT_PAYLOAD_FIELDS,
+                    with_vectors=False,
+                )
+            self._merge_context(points, records, collection)
+
+    async def _attach_context_async(self, points: List, media_type: str):
+        if self.async_client is None:
+            return await asyncio.to_thread(self._attach_context, points, media_type)
+
+        collection = self._collection_for(media_type)
+        missing = self._missing_context_ids(points, collection)
+        if missing:
+            with span("fetch_context"):
+                records = await self.async_client.retrieve(
+                    collection_name=collection,
+                    ids=missing,
+                    with_payload=CONTEXT_PAYLOAD_FIELDS,
+                    with_vectors=False,
+                )
+            self._merge_context(points, records, collection)
+
+    def _fuse_and_rerank(self, dense_results, sparse_results) -> List[dict]:
         if not dense_results:
             return []
 
-        # Fuse dense and sparse results and rerank
-        fused = self.fuse_dense_sparse(dense_results, sparse_results)
-        reranked = self.rerank_fused_results(fused)
-
-        reranked_ids = [p.id for p in reranked[:20]]
-        print ("\nReranked Top-30:")
-        for i, id_ in enumerate(reranked_ids):
-            f = fused[id_]
-            p = f["point"]
-            print(
-                f"#{i + 1} {p.payload.get('title', '')} | Score: {p.score} Dense: {f['dense_score']:.3f}, Sparse: {f['sparse_score']:.3f}, Pop: {p.payload.get('popularity', 0)}, Rating: {p.payload.get('vote_average', 0)}"
+        # Fuse dense and sparse results and rerank in one vectorized pass
+        with span("fuse"):
+            fused = fuse(dense_results.points, sparse_results.points)
+        with span("rerank"):
+            reranked = rerank(
+                fused,
+                dense_weight=self.dense_weight,
+                sparse_weight=self.sparse_weight,
+                rating_weight=self.rating_weight,
+                popularity_weight=self.popularity_weight,
+                top_k=self.top_k,
             )
 
-        return reranked[: self.top_k]
+        # Debug dump for a sampled fraction of requests (RERANK_DEBUG_SAMPLE_RATE)
+        if rerank_debug_sampled():
+            lines = [
+                f"#{i + 1} {p.payload.get('title', '')} | Score: {p.score} Dense: {dense_score:.3f}, Sparse: {sparse_score:.3f}, Pop: {p.payload.get('popularity', 0)}, Rating: {p.payload.get('vote_average', 0)}"
+                for i, (p, dense_score, sparse_score) in enumerate(
+                    zip(reranked.points[:20], reranked.dense_scores, reranked.sparse_scores)
+                )
+            ]
+            logger.info("Reranked Top-20:\n%s", "\n".join(lines))
+
+        return reranked.points
 
-    def _build_filter(
-        self, genres=None, providers=None, year_range=None
-    ) -> Filter | None:
+    @staticmethod
+    def _build_filter(genres=None, providers=None, year_range=None) -> Filter | None:
         must_clauses = []
 
         if genres:
@@ -160,38 +547,181 @@ class MediaRetriever:
 
         return Filter(must=must_clauses) if must_clauses else None
 
-    def _query_dense(self, vector, media_type, qdrant_filter):
-        collection = (
+    def _plan_query(self, media_type, genres=None, providers=None, year_range=None):
+        # Returns (filter, dense search params, plan); plan is None without a facet index
+        qdrant_filter = self._build_filter(genres, providers, year_range)
+        facet_index = self.facet_indexes.get(self._collection_for(media_type))
+        if facet_index is None or qdrant_filter is None:
+            return qdrant_filter, None, None
+
+        plan: FilterPlan = facet_index.plan(
+            genres,
+            providers,
+            year_range,
+            exact_threshold=self.facet_exact_threshold,
+            exact_max_ids=self.facet_exact_max_ids,
+        )
+        logger.debug("Filter plan: %s", plan.describe())
+        qdrant_filter, search_params = apply_plan(plan, qdrant_filter)
+        return qdrant_filter, search_params, plan
+
+    def _collection_for(self, media_type: str) -> str:
+        return (
             self.movie_collection_name
             if media_type == "movies"
             else self.tv_collection_name
         )
-        return self.client.query_points(
-            collection_name=collection,
+
+    def _dense_query_kwargs(self, vector, media_type, qdrant_filter, search_params=None) -> Dict:
+        return dict(
+            collection_name=self._collection_for(media_type),
             query=vector,
             using="dense_vector",
             query_filter=qdrant_filter,
+            search_params=search_params,
             limit=self.semantic_retrieval_limit,
-            with_payload=["llm_context", "title", "popularity", "vote_average"],
+            with_payload=self._candidate_payload_fields(),
             with_vectors=False,
         )
 
-    def _query_sparse(self, vector, media_type, qdrant_filter):
-        collection = (
-            self.movie_collection_name
-            if media_type == "movies"
-            else self.tv_collection_name
-        )
-        return self.client.query_points(
-            collection_name=collection,
+    def _sparse_query_kwargs(self, vector, media_type, qdrant_filter) -> Dict:
+        return dict(
+            collection_name=self._collection_for(media_type),
             query=models.SparseVector(**vector),
             using="sparse_vector",
             query_filter=qdrant_filter,
             limit=self.bm25_retrieval_limit,
-            with_payload=["llm_context", "title", "popularity", "vote_average"],
+            with_payload=self._candidate_payload_fields(),
             with_vectors=False,
         )
 
+    @staticmethod
+    def _to_query_request(query_kwargs: Dict) -> models.QueryRequest:
+        return models.QueryRequest(
+            query=query_kwargs["query"],
+            using=query_kwargs["using"],
+            filter=query_kwargs["query_filter"],
+            params=query_kwargs.get("search_params"),
+            limit=query_kwargs["limit"],
+            with_payload=query_kwargs["with_payload"],
+            with_vector=query_kwargs["with_vectors"],
+        )
+
+    def _batch_requests(
+        self, dense_vector, sparse_vector, media_type, qdrant_filter, search_params=None
+    ):
+        return [
+            self._to_query_request(
+                self._dense_query_kwargs(
+                    dense_vector, media_type, qdrant_filter, search_params
+                )
+            ),
+            self._to_query_request(
+                self._sparse_query_kwargs(sparse_vector, media_type, qdrant_filter)
+            ),
+        ]
+
+    def _query_hybrid(
+        self, dense_vector, sparse_vector, media_type, qdrant_filter, search_params=None
+    ):
+        if self.retrieval_mode == "batch":
+            # One round-trip: both searches in a single query_batch_points request
+            with span("qdrant_batch"):
+                dense_results, sparse_results = self.client.query_batch_points(
+                    collection_name=self._collection_for(media_type),
+                    requests=self._batch_requests(
+                        dense_vector, sparse_vector, media_type, qdrant_filter, search_params
+                    ),
+                )
+            return dense_results, sparse_results
+
+        if self.retrieval_mode == "parallel":
+            dense_future = self._query_pool.submit(
+                self._query_dense, dense_vector, media_type, qdrant_filter, search_params
+            )
+            sparse_future = self._query_pool.submit(
+                self._query_sparse, sparse_vector, media_type, qdrant_filter
+            )
+            return dense_future.result(), sparse_future.result()
+
+        dense_results = self._query_dense(
+            dense_vector, media_type, qdrant_filter, search_params
+        )
+        sparse_results = self._query_sparse(sparse_vector, media_type, qdrant_filter)
+        return dense_results, sparse_results
+
+    async def _query_hybrid_async(
+        self, dense_vector, sparse_vector, media_type, qdrant_filter, search_params=None
+    ):
+        if self.async_client is None:
+            return await asyncio.to_thread(
+                self._query_hybrid,
+                dense_vector,
+                sparse_vector,
+                media_type,
+                qdrant_filter,
+                search_params,
+            )
+
+        if self.retrieval_mode == "batch":
+            with span("qdrant_batch"):
+                dense_results, sparse_results = await self.async_client.query_batch_points(
+                    collection_name=self._collection_for(media_type),
+                    requests=self._batch_requests(
+                        dense_vector, sparse_vector, media_type, qdrant_filter, search_params
+                    ),
+                )
+            return dense_results, sparse_results
+
+        if self.retrieval_mode == "parallel":
+            return await asyncio.gather(
+                self._query_dense_async(
+                    dense_vector, media_type, qdrant_filter, search_params
+                ),
+                self._query_sparse_async(sparse_vector, media_type, qdrant_filter),
+            )
+
+        dense_results = await self._query_dense_async(
+            dense_vector, media_type, qdrant_filter, search_params
+        )
+        sparse_results = await self._query_sparse_async(
+            sparse_vector, media_type, qdrant_filter
+        )
+        return dense_results, sparse_results
+
+    def _query_dense(self, vector, media_type, qdrant_filter, search_params=None):
+        with span("qdrant_dense"):
+            return self.client.query_points(
+                **self._dense_query_kwargs(vector, media_type, qdrant_filter, search_params)
+            )
+
+    def _query_sparse(self, vector, media_type, qdrant_filter):
+        with span("qdrant_sparse"):
+            return self.client.query_points(
+                **self._sparse_query_kwargs(vector, media_type, qdrant_filter)
+            )
+
+    async def _query_dense_async(self, vector, media_type, qdrant_filter, search_params=None):
+        if self.async_client is None:
+            return await asyncio.to_thread(
+                self._query_dense, vector, media_type, qdrant_filter, search_params
+            )
+        with span("qdrant_dense"):
+            return await self.async_client.query_points(
+                **self._dense_query_kwargs(vector, media_type, qdrant_filter, search_params)
+            )
+
+    async def _query_sparse_async(self, vector, media_type, qdrant_filter):
+        if self.async_client is None:
+            return await asyncio.to_thread(
+                self._query_sparse, vector, media_type, qdrant_filter
+            )
+        with span("qdrant_sparse"):
+            return await self.async_client.query_points(
+                **self._sparse_query_kwargs(vector, media_type, qdrant_filter)
+            )
+
+    # Scalar reference implementation of fuse_and_rerank (see benchmarks/bench_rerank.py)
     def fuse_dense_sparse(
         self,
         dense_results: List,
@@ -0,0 +1,75 @@
+import re
+from functools import lru_cache
+from typing import List
+
+# Characters whose handling by NLTK's word_tokenize depends on context (sentence-final
+# periods, clitics, quote direction, runs of `,`/`:`). Queries containing any of them
+# take the NLTK path.
+_CONTEXT_SENSITIVE = re.compile(r"[.'\"`]|[,:]{2}|[^\x00-\x7f](?<!\w)")
+# A single sentence-final period is always split off by the Treebank tokenizer
+_FINAL_PERIOD = re.compile(r"(?<=[^.])\.\s*$")
+# Words the Treebank tokenizer splits even though they are purely alphanumeric
+_SPLIT_WORDS = re.compile(r"\b(?:cannot|gimme|gonna|gotta|lemme|wanna)\b")
+# Treebank pads these with spaces everywhere; `,`/`:` only when not followed by a digit
+_SEPARATORS = re.compile(r"[\s;@#$%&?!*()\[\]{}<>]+|--|[,:](?!\d)")
+
+
+def nltk_tokenize_and_preprocess(text: str) -> List[str]:
+    # Reference implementation: the original per-call NLTK pipeline
+    from nltk.corpus import stopwords
+    from nltk.stem import PorterStemmer
+    from nltk.tokenize import word_tokenize
+
+    stop_words = set(stopwords.words("english"))
+    stemmer = PorterStemmer()
+
+    tokens = word_tokenize(text.lower())
+    filtered_tokens = [w for w in tokens if w not in stop_words and w.isalnum()]
+    processed_tokens = [stemmer.stem(w) for w in filtered_tokens]
+
+    return processed_tokens
+
+
+class QueryAnalyzer:
+    """BM25 query analysis with NLTK-identical output and no per-call setup.
+
+    Plain queries are split with a regex that reproduces word_tokenize's treatment of the
+    characters it pads unconditionally; anything context-dependent falls back to NLTK.
+    Stopword filtering and stemming are memoized per surface form.
+    """
+
+    def __init__(self, stem_cache_size: int = 65536):
+        # NLTK is imported here rather than at module level to keep app import fast
+        from nltk.corpus import stopwords
+        from nltk.stem import PorterStemmer
+        from nltk.tokenize import word_tokenize
+
+        self._word_tokenize = word_tokenize
+        self.stop_words = frozenset(stopwords.words("english"))
+        self._stemmer = PorterStemmer()
+        self.analyze_token = lru_cache(maxsize=stem_cache_size)(self._analyze_token)
+        self.fast_path_hits = 0
+        self.fallbacks = 0
+
+    def _analyze_token(self, token: str) -> str | None:
+        # Surface form -> stemmed term, or None for stopwords and non-alphanumeric tokens
+        if token in self.stop_words or not token.isalnum():
+            return None
+        return self._stemmer.stem(token)
+
+    def tokenize(self, text: str) -> List[str]:
+        text = text.lower()
+        plain = _FINAL_PERIOD.sub("", text)
+        if _CONTEXT_SENSITIVE.search(plain) or _SPLIT_WORDS.search(plain):
+            self.fallbacks += 1
+            return self._word_tokenize(text)
+        self.fast_path_hits += 1
+        return [t for t in _SEPARATORS.split(plain) if t]
+
+    def analyze(self, text: str) -> List[str]:
+        terms = []
+        for token in self.tokenize(text):
+            term = self.analyze_token(token)
+            if term is not None:
+                terms.append(term)
+        return terms
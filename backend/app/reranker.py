@@ -0,0 +1,106 @@
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+
+@dataclass
+class RerankedCandidates:
+    points: List  # Top-k points, best first
+    scores: np.ndarray  # Final weighted score of each returned point
+    dense_scores: np.ndarray
+    sparse_scores: np.ndarray
+
+
+@dataclass
+class FusedCandidates:
+    points: List  # Dense hits in order, then sparse-only hits
+    dense_scores: np.ndarray
+    sparse_scores: np.ndarray  # Normalized by the max sparse score and capped
+
+
+def fuse(dense_points: List, sparse_points: List, max_sparse_ratio: float = 0.8) -> FusedCandidates:
+    # Fuse: dense hits keep their order, sparse-only hits are appended after them
+    points = list(dense_points)
+    position = {p.id: i for i, p in enumerate(points)}
+    sparse_positions, sparse_raw = [], []
+    for p in sparse_points:
+        idx = position.get(p.id)
+        if idx is None:
+            idx = position[p.id] = len(points)
+            points.append(p)
+        sparse_positions.append(idx)
+        sparse_raw.append(p.score)
+
+    n = len(points)
+    dense = np.zeros(n)
+    dense[: len(dense_points)] = [p.score or 0.0 for p in dense_points]
+
+    sparse = np.zeros(n)
+    if sparse_positions:
+        sparse_raw = np.asarray(sparse_raw, dtype=np.float64)
+        sparse[sparse_positions] = np.minimum(
+            sparse_raw / (sparse_raw.max() or 1e-6), max_sparse_ratio
+        )
+    return FusedCandidates(points, dense, sparse)
+
+
+def rerank(
+    fused: FusedCandidates,
+    dense_weight: float,
+    sparse_weight: float,
+    rating_weight: float,
+    popularity_weight: float,
+    top_k: int,
+) -> RerankedCandidates:
+    points, dense, sparse = fused.points, fused.dense_scores, fused.sparse_scores
+    n = len(points)
+
+    payloads = [p.payload for p in points]
+    popularity = np.array([pl.get("popularity", 0) for pl in payloads], dtype=np.float64)
+    vote_average = np.array([pl.get("vote_average", 0) for pl in payloads], dtype=np.float64)
+    max_popularity = (popularity.max() if n else 1.0) or 1.0
+
+    # Same operation order as the scalar formula, so scores are bit-identical
+    scores = (
+        dense_weight * dense
+        + sparse_weight * sparse
+        + rating_weight * (vote_average / 10.0)
+        + popularity_weight * (popularity / max_popularity)
+    )
+
+    # Top-k without a full sort: keep everything tied with the k-th score, then order by
+    # (score desc, fused position asc), which is what a stable descending sort yields
+    if top_k < n:
+        kth_score = np.partition(scores, n - top_k)[n - top_k]
+        candidates = np.flatnonzero(scores >= kth_score)
+    else:
+        candidates = np.arange(n)
+    order = candidates[np.lexsort((candidates, -scores[candidates]))][:top_k]
+
+    return RerankedCandidates(
+        points=[points[i] for i in order],
+        scores=scores[order],
+        dense_scores=dense[order],
+        sparse_scores=sparse[order],
+    )
+
+
+def fuse_and_rerank(
+    dense_points: List,
+    sparse_points: List,
+    dense_weight: float,
+    sparse_weight: float,
+    rating_weight: float,
+    popularity_weight: float,
+    top_k: int,
+    max_sparse_ratio: float = 0.8,
+) -> RerankedCandidates:
+    return rerank(
+        fuse(dense_points, sparse_points, max_sparse_ratio),
+        dense_weight=dense_weight,
+        sparse_weight=sparse_weight,
+        rating_weight=rating_weight,
+        popularity_weight=popularity_weight,
+        top_k=top_k,
+    )
@@ -0,0 +1,142 @@
+import asyncio
+import itertools
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+# Roughly the granularity of OpenAI stream deltas: a word plus its leading whitespace
+_DELTA_PATTERN = re.compile(r"\s*\S+|\s+")
+
+
+@dataclass
+class _Entry:
+    bucket: tuple
+    embedding: np.ndarray
+    answer: str
+    expires_at: float
+
+
+class SemanticResponseCache:
+    """Caches full LLM answers for recommendation queries.
+
+    A request hits when it has the same filters and the same retrieved ID set as a cached
+    answer and its query embedding is within `similarity_threshold` (cosine) of it.
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.95,
+        max_entries: int = 512,
+        ttl_seconds: float = 1800,
+        cache_with_history: bool = False,
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.cache_with_history = cache_with_history
+
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+        self._buckets: dict[tuple, set[int]] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def accepts(self, history) -> bool:
+        return not history or self.cache_with_history
+
+    @staticmethod
+    def _bucket(filter_key: tuple, retrieved_ids: List) -> tuple:
+        return filter_key, frozenset(retrieved_ids)
+
+    @staticmethod
+    def _unit(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding, filter_key: tuple, retrieved_ids: List) -> str | None:
+        query = self._unit(embedding)
+        bucket = self._bucket(filter_key, retrieved_ids)
+        now = time.time()
+
+        with self._lock:
+            best_id, best_score = None, self.similarity_threshold
+            for entry_id in list(self._buckets.get(bucket, ())):
+                entry = self._entries[entry_id]
+                if entry.expires_at < now:
+                    self._remove(entry_id)
+                    self.expirations += 1
+                    continue
+                score = float(entry.embedding @ query)
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            return self._entries[best_id].answer
+
+    def store(
+        self,
+        embedding,
+        filter_key: tuple,
+        retrieved_ids: List,
+        answer: str,
+        ttl_seconds: float | None = None,
+    ):
+        bucket = self._bucket(filter_key, retrieved_ids)
+        entry = _Entry(
+            bucket=bucket,
+            embedding=self._unit(embedding),
+            answer=answer,
+            expires_at=time.time() + (ttl_seconds or self.ttl_seconds),
+        )
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = entry
+            self._buckets.setdefault(bucket, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        ids = self._buckets[entry.bucket]
+        ids.discard(entry_id)
+        if not ids:
+            del self._buckets[entry.bucket]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": "response",
+                "size": len(self._entries),
+                "max_size": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "similarity_threshold": self.similarity_threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+async def replay_as_stream(answer: str, words_per_chunk: int = 3, chunk_delay: float = 0.01):
+    # Re-emit a cached answer in delta-sized pieces so clients render it like a live stream
+    deltas = _DELTA_PATTERN.findall(answer)
+    for i in range(0, len(deltas), words_per_chunk):
+        yield "".join(deltas[i : i + words_per_chunk])
+        if chunk_delay:
+            await asyncio.sleep(chunk_delay)
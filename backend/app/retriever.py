@@ -3,16 +3,38 @@ from app.media_retriever import MediaRetriever
 def get_media_retriever(
     embed_model,
     qdrant_client,
-    bm25_models,
-    bm25_vocabs,
+    bm25_indexes,
     movie_collection_name,
     tv_collection_name,
+    async_qdrant_client=None,
+    retrieval_mode="batch",
+    dense_batcher=None,
+    embedding_cache=None,
+    sparse_cache=None,
+    retrieval_cache=None,
+    two_phase_retrieval=False,
+    payload_cache=None,
+    facet_indexes=None,
+    facet_exact_threshold=0.02,
+    facet_exact_max_ids=5000,
+    query_analyzer=None,
 ):
     return MediaRetriever(
         embed_model=embed_model,
         qdrant_client=qdrant_client,
-        bm25_models=bm25_models,
-        bm25_vocabs=bm25_vocabs,
+        bm25_indexes=bm25_indexes,
         movie_collection_name=movie_collection_name,
         tv_collection_name=tv_collection_name,
+        async_qdrant_client=async_qdrant_client,
+        retrieval_mode=retrieval_mode,
+        dense_batcher=dense_batcher,
+        embedding_cache=embedding_cache,
+        sparse_cache=sparse_cache,
+        retrieval_cache=retrieval_cache,
+        two_phase_retrieval=two_phase_retrieval,
+        payload_cache=payload_cache,
+        facet_indexes=facet_indexes,
+        facet_exact_threshold=facet_exact_threshold,
+        facet_exact_max_ids=facet_exact_max_ids,
+        query_analyzer=query_analyzer,
     )
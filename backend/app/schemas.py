@@ -1,7 +1,7 @@
 from enum import Enum
 from typing import List
 
-from pydantic import BaseModel, field_validator, model_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 
 class ChatMessage(BaseModel):
@@ -14,9 +14,8 @@ class MediaType(str, Enum):
     TV = "tvs"
 
 
-class ChatRequest(BaseModel):
+class RecommendQuery(BaseModel):
     question: str
-    history: List[ChatMessage] = []
     media_type: MediaType = MediaType.MOVIE
     genres: List[str] = []
     providers: List[str] = []
@@ -29,7 +28,16 @@ class ChatRequest(BaseModel):
         return v
 
     @model_validator(mode="after")
-    def validate_year_range(self) -> "ChatRequest":
+    def validate_year_range(self) -> "RecommendQuery":
         if len(self.year_range) != 2:
             raise ValueError("year_range must be a list of exactly two integers: [start, end]")
         return self
+
+
+class ChatRequest(RecommendQuery):
+    history: List[ChatMessage] = []
+
+
+class RecommendBatchRequest(BaseModel):
+    queries: List[RecommendQuery] = Field(min_length=1)
+    include_context: bool = False  # Return llm_context with each result
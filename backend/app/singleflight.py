@@ -0,0 +1,122 @@
+import asyncio
+from collections import Counter
+from typing import AsyncIterator, Awaitable, Callable, Hashable
+
+from app.cache import filters_key, normalize_query
+from app.telemetry import observe_single_flight
+
+
+class _Flight:
+    # One upstream computation and the chunks it has streamed so far
+
+    def __init__(self, key: Hashable):
+        self.key = key
+        self.chunks: list[str] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.subscribers = 0
+        self.task: asyncio.Task | None = None
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        # Wake everyone waiting on the current event; later waits use a fresh one
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def publish(self, chunk: str):
+        self.chunks.append(chunk)
+        self._notify()
+
+    def finish(self, error: BaseException | None = None):
+        self.done, self.error = True, error
+        self._notify()
+
+    async def wait(self, seen: int):
+        if len(self.chunks) <= seen and not self.done:
+            await self._changed.wait()
+
+
+class SingleFlight:
+    """Shares one upstream chat computation between concurrent identical requests.
+
+    The first request for a key starts the upstream: admission, classification,
+    retrieval and the LLM stream. It runs in its own task. Identical requests that arrive
+    while it is running subscribe to it instead of starting their own. Every subscriber
+    gets the chunks streamed so far, then each new chunk as it arrives.
+
+    A subscriber that disconnects just stops reading. The upstream keeps going for the
+    others and is only cancelled once every subscriber has left. Upstream errors, including
+    admission rejections, are raised in every subscriber.
+    """
+
+    def __init__(self):
+        self._flights: dict[Hashable, _Flight] = {}
+        self.requests: Counter = Counter()  # leader | follower | abandoned
+
+    @staticmethod
+    def key(question: str, history, media_type="movies", genres=None, providers=None, year_range=None):
+        """Coalescing key, or None for requests that must not be shared (multi-turn chats)."""
+        if history:
+            return None  # The answer depends on the conversation so far
+        return normalize_query(question), filters_key(media_type, genres, providers, year_range)
+
+    async def _run(self, flight: _Flight, start: Callable[[], Awaitable[AsyncIterator[str]]]):
+        try:
+            upstream = await start()
+            try:
+                async for chunk in upstream:
+                    flight.publish(chunk)
+            finally:
+                await upstream.aclose()
+        except asyncio.CancelledError:
+            flight.finish(asyncio.CancelledError())
+            raise
+        except Exception as e:
+            flight.finish(e)
+        else:
+            flight.finish()
+        finally:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+
+    async def subscribe(self, key: Hashable, start: Callable[[], Awaitable[AsyncIterator[str]]]):
+        """Stream the answer for `key`, calling `start()` for the upstream only if none is running."""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight(key)
+            flight.task = asyncio.create_task(self._run(flight, start))
+            role = "leader"
+        else:
+            role = "follower"
+        self.requests[role] += 1
+        observe_single_flight(role)
+
+        flight.subscribers += 1
+        seen = 0
+        try:
+            while True:
+                if seen < len(flight.chunks):
+                    seen += 1
+                    yield flight.chunks[seen - 1]
+                elif flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                else:
+                    await flight.wait(seen)
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # Nobody is listening any more: stop the upstream (and its speculative work)
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+                self.requests["abandoned"] += 1
+                observe_single_flight("abandoned")
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._flights),
+            "subscribers": sum(f.subscribers for f in self._flights.values()),
+            **{role: self.requests[role] for role in ("leader", "follower", "abandoned")},
+        }
@@ -0,0 +1,105 @@
+import asyncio
+import time
+from collections import Counter, defaultdict
+from typing import Dict
+
+from app.telemetry import observe_speculation
+
+SPECULATION_MODES = ("off", "embed", "retrieve")
+
+
+class SpeculationStats:
+    """Per-intent totals of speculative work that was kept (latency saved) or discarded (wasted)."""
+
+    def __init__(self):
+        self._requests: Counter = Counter()
+        self._stages = defaultdict(
+            lambda: {"kept": 0, "discarded": 0, "saved_s": 0.0, "wasted_s": 0.0}
+        )
+
+    def record_request(self, intent: str):
+        self._requests[intent] += 1
+
+    def record(self, stage: str, intent: str, kept: bool, seconds: float):
+        totals = self._stages[(intent, stage)]
+        if kept:
+            totals["kept"] += 1
+            totals["saved_s"] += seconds
+        else:
+            totals["discarded"] += 1
+            totals["wasted_s"] += seconds
+        observe_speculation(stage, intent, kept, seconds)
+
+    def stats(self) -> dict:
+        summary = {}
+        for intent, requests in self._requests.items():
+            stages = {s: dict(t) for (i, s), t in self._stages.items() if i == intent}
+            summary[intent] = {
+                "requests": requests,
+                "avg_saved_ms": 1000 * sum(t["saved_s"] for t in stages.values()) / requests,
+                "avg_wasted_ms": 1000 * sum(t["wasted_s"] for t in stages.values()) / requests,
+                "stages": stages,
+            }
+        return summary
+
+
+class Speculation:
+    """Tasks started while the intent classifier is in flight, for one request.
+
+    Once the intent is known, `resolve` keeps them or cancels them:
+    - Kept tasks record how long they ran before the intent was known. That time is taken
+      off the critical path.
+    - Discarded tasks record how long they ran. That time is wasted work.
+
+    Cancelling a micro-batcher or inference pool call that is still queued drops it before it
+    runs. A call already running in a thread finishes, and its result is thrown away.
+    """
+
+    def __init__(self, stats: SpeculationStats | None = None):
+        self.stats = stats
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._started: Dict[str, float] = {}
+        self._finished: Dict[str, float] = {}
+
+    async def _run(self, stage: str, coro):
+        try:
+            return await coro
+        finally:
+            self._finished[stage] = time.perf_counter()
+
+    async def _run_after(self, stage: str, dependencies, fn):
+        # The clock starts once the inputs are ready: waiting on them is neither saved nor wasted
+        inputs = [await d for d in dependencies]
+        self._started[stage] = time.perf_counter()
+        return await self._run(stage, fn(*inputs))
+
+    def start(self, stage: str, coro) -> asyncio.Task:
+        self._started[stage] = time.perf_counter()
+        self._tasks[stage] = asyncio.create_task(self._run(stage, coro))
+        return self._tasks[stage]
+
+    def start_after(self, stage: str, dependencies, fn) -> asyncio.Task:
+        """Speculatively run `fn(*results)` as soon as every task in `dependencies` is done."""
+        self._tasks[stage] = asyncio.create_task(self._run_after(stage, dependencies, fn))
+        return self._tasks[stage]
+
+    async def resolve(self, intent: str, keep: bool):
+        decided = time.perf_counter()
+        if not keep:
+            self.cancel()
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+        for stage in self._started:  # Tasks cancelled while waiting on inputs never started
+            finished = self._finished.get(stage, decided)
+            # Kept: only the part that overlapped classification shortened the request
+            seconds = (min(finished, decided) if keep else finished) - self._started[stage]
+            if self.stats is not None:
+                self.stats.record(stage, intent, keep, max(seconds, 0.0))
+        if self.stats is not None:
+            self.stats.record_request(intent)
+
+    def cancel(self):
+        # Also called when the response is closed early (client disconnect)
+        for task in self._tasks.values():
+            if not task.done():
+                task.cancel()
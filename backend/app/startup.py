@@ -0,0 +1,143 @@
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable
+
+
+class StartupComponent:
+    def __init__(self, name: str, loader: Callable, depends_on: Iterable[str] = (), shared: bool = False):
+        self.name = name
+        self.loader = loader
+        self.depends_on = tuple(depends_on)
+        self.shared = shared  # Read-only after loading; safe to load before forking workers
+        self.status = "pending"  # pending | loading | ready | failed | skipped
+        self.result = None
+        self.error: str | None = None
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.preloaded = False
+
+    def report(self, t0: float) -> Dict:
+        report = {"status": self.status}
+        if self.preloaded:
+            report["preloaded"] = True
+        elif self.started_at is not None:
+            report["started_s"] = round(self.started_at - t0, 3)
+        if self.finished_at is not None:
+            report["load_s"] = round(self.finished_at - self.started_at, 3)
+        if self.error:
+            report["error"] = self.error
+        return report
+
+
+class StartupOrchestrator:
+    """Runs startup loaders concurrently, each as soon as its dependencies are ready.
+
+    Loaders receive the results of their dependencies as keyword arguments. A failed
+    component marks everything downstream as skipped and the orchestrator as failed;
+    `ready` only flips once every component has loaded.
+
+    `preload()` loads only the shared components (model weights, index arrays) in the
+    current process. Under a pre-forking server the master calls it, and each worker's
+    `run()` then builds just the per-process components (clients, threads, caches) on
+    top of the inherited, copy-on-write shared ones.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.components: Dict[str, StartupComponent] = {}
+        self.max_workers = max_workers
+        self.ready = threading.Event()
+        self.failed = False
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self._thread: threading.Thread | None = None
+
+    def add(self, name: str, loader: Callable, depends_on: Iterable[str] = (), shared: bool = False):
+        self.components[name] = StartupComponent(name, loader, depends_on, shared)
+        return self
+
+    def preload(self) -> bool:
+        self.run(only_shared=True)
+        shared = [c for c in self.components.values() if c.shared]
+        for c in shared:
+            c.preloaded = c.status == "ready"
+        return all(c.preloaded for c in shared)
+
+    def start(self) -> threading.Thread:
+        # Non-blocking: the server can answer liveness probes while components load
+        self._thread = threading.Thread(target=self.run, name="startup", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def wait(self, timeout: float | None = None) -> bool:
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.ready.is_set()
+
+    def _load(self, component: StartupComponent):
+        component.status = "loading"
+        component.started_at = time.perf_counter()
+        try:
+            deps = {d: self.components[d].result for d in component.depends_on}
+            component.result = component.loader(**deps)
+            component.status = "ready"
+        except Exception as e:
+            component.status = "failed"
+            component.error = f"{type(e).__name__}: {e}"
+            traceback.print_exc()
+        component.finished_at = time.perf_counter()
+        return component
+
+    def run(self, only_shared: bool = False):
+        self.started_at = time.perf_counter()
+        pending = {
+            name: c
+            for name, c in self.components.items()
+            if c.status != "ready" and (c.shared or not only_shared)
+        }
+        for component in pending.values():
+            component.status, component.error = "pending", None  # Retry anything that failed in preload
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="startup") as pool:
+            while pending or running:
+                for name, component in list(pending.items()):
+                    statuses = [self.components[d].status for d in component.depends_on]
+                    if any(s in ("failed", "skipped") for s in statuses):
+                        component.status = "skipped"
+                        del pending[name]
+                    elif all(s == "ready" for s in statuses):
+                        running[name] = pool.submit(self._load, component)
+                        del pending[name]
+
+                if not running:
+                    break  # Remaining components wait on dependencies that never resolve
+                done, _ = wait(running.values(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    component = future.result()
+                    print(
+                        f"{'✅' if component.status == 'ready' else '❌'} Startup: {component.name} "
+                        f"{component.status} in {component.finished_at - component.started_at:.2f}s"
+                    )
+                    del running[component.name]
+
+        self.finished_at = time.perf_counter()
+        if only_shared:
+            print(f"📦 Preloaded shared components in {self.finished_at - self.started_at:.2f}s")
+            return
+        self.failed = any(c.status != "ready" for c in self.components.values())
+        if not self.failed:
+            self.ready.set()
+        print(f"{'🚀' if not self.failed else '❌'} Startup {'complete' if not self.failed else 'failed'} "
+              f"in {self.finished_at - self.started_at:.2f}s")
+
+    def report(self) -> Dict:
+        t0 = self.started_at or time.perf_counter()
+        return {
+            "ready": self.ready.is_set(),
+            "failed": self.failed,
+            "elapsed_s": round((self.finished_at or time.perf_counter()) - t0, 3)
+            if self.started_at is not None
+            else None,
+            "components": {name: c.report(t0) for name, c in self.components.items()},
+        }
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import re
+from contextlib import suppress
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+from app.admission import AdmissionRejected
+from app.telemetry import observe_stream_chunks
+
+IMAGE_MARKDOWN = re.compile(r"!\[.*?\]\(.*?\)")  # Can't span lines: `.` doesn't match "\n"
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}  # No proxy buffering
+
+
+@dataclass
+class StreamEvent:
+    """A structured event in a chat stream, next to the answer text (plain `str` chunks).
+
+    SSE clients get it as its own event; plain-text clients never see it.
+    """
+
+    event: str
+    data: dict
+
+
+def sanitize_markdown(md_text: str) -> str:
+    return IMAGE_MARKDOWN.sub("", md_text)
+
+
+class MarkdownImageStripper:
+    """Removes image markdown from streamed text, including images split across chunks.
+
+    Text that could still turn out to be the start of an image (a `!` at the end, or a
+    `![` with no line break after it) is held back until it either completes or can no
+    longer match, so the output is the same as `sanitize_markdown` on the whole answer.
+    `max_pending` bounds the hold: past it, the held text is treated as plain text.
+    """
+
+    def __init__(self, max_pending: int = 1024):
+        self.max_pending = max_pending
+        self._pending = ""
+
+    def _hold_from(self, text: str) -> int:
+        # Complete images are final once matched: a longer stream can't change the match
+        pos = text.rfind("\n") + 1
+        while (i := text.find("!", pos)) >= 0:
+            match = IMAGE_MARKDOWN.match(text, i)
+            if match:
+                pos = match.end()
+            elif i == len(text) - 1 or text[i + 1] == "[":
+                return i
+            else:
+                pos = i + 1
+        return len(text)
+
+    def feed(self, chunk: str) -> str:
+        text = self._pending + chunk
+        hold = self._hold_from(text)
+        if len(text) - hold > self.max_pending:
+            hold = len(text)
+        self._pending = text[hold:]
+        return sanitize_markdown(text[:hold])
+
+    def flush(self) -> str:
+        text, self._pending = self._pending, ""
+        return sanitize_markdown(text)
+
+
+async def strip_images(chunks: AsyncIterator[str], max_pending: int = 1024):
+    stripper = MarkdownImageStripper(max_pending)
+    try:
+        async for chunk in chunks:
+            text = stripper.feed(chunk)
+            if text:
+                yield text
+        text = stripper.flush()
+        if text:
+            yield text
+    finally:
+        await chunks.aclose()
+
+
+_END = object()
+
+
+class _Failed:
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+async def coalesce_chunks(chunks: AsyncIterator, min_chars: int = 48, max_delay_s: float = 0.04):
+    """Merge small text deltas into fewer, larger chunks (fewer HTTP writes and SSE events).
+
+    The first delta goes out at once, so time to first token is unchanged. After that, text
+    is sent when `min_chars` have accumulated or `max_delay_s` after the oldest unsent
+    delta arrived, whichever comes first, so a slow stream is never held back longer than
+    that. `StreamEvent`s pass through in order, flushing the text before them.
+
+    The upstream is read by one producer task, so a stalled upstream can't delay a flush.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=64)
+
+    async def produce():
+        try:
+            async for chunk in chunks:
+                await queue.put(chunk)
+        except Exception as e:
+            await queue.put(_Failed(e))
+        else:
+            await queue.put(_END)
+        finally:
+            await chunks.aclose()
+
+    producer = asyncio.create_task(produce())
+    buffer, size, deadline = [], 0, None
+    received = sent = 0
+    try:
+        while True:
+            if not queue.empty():
+                item = queue.get_nowait()
+            else:
+                try:
+                    timeout = None if deadline is None else max(deadline - loop.time(), 0)
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    sent += 1
+                    yield "".join(buffer)
+                    buffer, size, deadline = [], 0, None
+                    continue
+
+            if isinstance(item, str):
+                received += 1
+                buffer.append(item)
+                size += len(item)
+                if received == 1 or size >= min_chars:
+                    sent += 1
+                    yield "".join(buffer)
+                    buffer, size, deadline = [], 0, None
+                elif deadline is None:
+                    deadline = loop.time() + max_delay_s
+                continue
+
+            if buffer:
+                sent += 1
+                yield "".join(buffer)
+                buffer, size, deadline = [], 0, None
+            if item is _END:
+                return
+            if isinstance(item, _Failed):
+                raise item.error
+            yield item
+    finally:
+        producer.cancel()
+        with suppress(asyncio.CancelledError):
+            await producer
+        observe_stream_chunks(received, sent)
+
+
+async def text_only(chunks: AsyncIterator):
+    # Plain-text responses: the answer text without structured events
+    try:
+        async for chunk in chunks:
+            if isinstance(chunk, str):
+                yield chunk
+    finally:
+        await chunks.aclose()
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def to_sse(chunks: AsyncIterator):
+    """Frame a chat stream as server-sent events.
+
+    Answer text goes out as `delta` events ({"text": ...}), `StreamEvent`s under their own
+    name, and a `done` event marks a complete answer. A request turned away at the LLM stage
+    after the metadata event was sent gets an `error` event with the status it would have
+    had ({"status": 503, "retry_after": ...}).
+    """
+    try:
+        async for chunk in chunks:
+            if isinstance(chunk, str):
+                yield sse_event("delta", {"text": chunk})
+            else:
+                yield sse_event(chunk.event, chunk.data)
+        yield sse_event("done", {})
+    except AdmissionRejected as e:
+        yield sse_event("error", {"status": e.status_code, "reason": e.reason, "retry_after": e.retry_after})
+    finally:
+        await chunks.aclose()
@@ -0,0 +1,344 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+except ImportError:  # Optional: spans still go to OpenTelemetry / debug logs without it
+    Counter = Gauge = Histogram = None
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+    generate_latest = None
+
+logger = logging.getLogger("app.telemetry")
+
+# Request pipeline stages, in order. qdrant_batch covers dense + sparse in one round-trip.
+STAGES = (
+    "classify",
+    "embed_dense",
+    "embed_sparse",
+    "qdrant_dense",
+    "qdrant_sparse",
+    "qdrant_batch",
+    "fuse",
+    "rerank",
+    "fetch_context",
+    "prep",  # Request start to LLM call (everything before streaming)
+    "ttft",  # Request start to first streamed chunk
+    "stream",  # Request start to last streamed chunk
+)
+
+_LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+STAGE_SECONDS = (
+    Histogram(
+        "rag_stage_seconds",
+        "Latency of each chat pipeline stage",
+        ["stage", "intent"],
+        buckets=_LATENCY_BUCKETS,
+    )
+    if Histogram is not None
+    else None
+)
+
+# Work started before the intent was known (see app.speculation): "saved" is latency taken
+# off the critical path by kept tasks, "wasted" is time spent on discarded ones
+SPECULATION_SECONDS = (
+    Counter(
+        "rag_speculation_seconds",
+        "Speculative execution time saved or wasted, per stage and intent",
+        ["stage", "intent", "outcome"],
+    )
+    if Counter is not None
+    else None
+)
+SPECULATION_TASKS = (
+    Counter(
+        "rag_speculation_tasks",
+        "Speculative tasks kept or discarded, per stage and intent",
+        ["stage", "intent", "outcome"],
+    )
+    if Counter is not None
+    else None
+)
+
+PROMPT_TOKENS = (
+    Histogram(
+        "rag_prompt_tokens",
+        "Estimated chat prompt tokens after context budgeting",
+        ["intent"],
+        buckets=(250, 500, 1000, 1500, 2000, 3000, 4000, 6000, 8000, 12000, 16000),
+    )
+    if Histogram is not None
+    else None
+)
+PROMPT_TOKENS_SAVED = (
+    Counter(
+        "rag_prompt_tokens_saved",
+        "Prompt tokens removed by context budgeting (dropped or shortened items and history)",
+        ["intent"],
+    )
+    if Counter is not None
+    else None
+)
+
+# Outbound HTTP pools (see app.transport), per client: qdrant, qdrant_async, openai.
+# Gauges are summed over live gunicorn workers in multiprocess mode
+HTTP_IN_FLIGHT = (
+    Gauge(
+        "rag_http_requests_in_flight",
+        "Outbound HTTP requests in flight (queued for or holding a pooled connection)",
+        ["client"],
+        multiprocess_mode="livesum",
+    )
+    if Gauge is not None
+    else None
+)
+HTTP_POOL_CONNECTIONS = (
+    Gauge(
+        "rag_http_pool_connections",
+        "Open connections in the client's pool, active and idle",
+        ["client"],
+        multiprocess_mode="livesum",
+    )
+    if Gauge is not None
+    else None
+)
+HTTP_POOL_SATURATED = (
+    Counter(
+        "rag_http_pool_saturated",
+        "Requests sent with more requests in flight than the pool has connections",
+        ["client"],
+    )
+    if Counter is not None
+    else None
+)
+HTTP_CONNECTION_SECONDS = (
+    Histogram(
+        "rag_http_connection_seconds",
+        "Time queued for a pooled connection (pool_wait) and opening new ones (connect: TCP + TLS)",
+        ["client", "phase"],
+        buckets=_LATENCY_BUCKETS,
+    )
+    if Histogram is not None
+    else None
+)
+HTTP_RETRIES = (
+    Counter(
+        "rag_http_retries",
+        "Outbound HTTP requests retried, by reason (status code or connection error)",
+        ["client", "reason"],
+    )
+    if Counter is not None
+    else None
+)
+
+# /chat admission control (see app.admission), per stage: inference, llm
+ADMISSION_ACTIVE = (
+    Gauge(
+        "rag_admission_active",
+        "Requests holding a slot in each admission stage",
+        ["stage"],
+        multiprocess_mode="livesum",
+    )
+    if Gauge is not None
+    else None
+)
+ADMISSION_QUEUE_DEPTH = (
+    Gauge(
+        "rag_admission_queue_depth",
+        "Requests waiting for a slot in each admission stage",
+        ["stage"],
+        multiprocess_mode="livesum",
+    )
+    if Gauge is not None
+    else None
+)
+ADMISSION_WAIT_SECONDS = (
+    Histogram(
+        "rag_admission_wait_seconds",
+        "Time admitted requests waited for a stage slot",
+        ["stage"],
+        buckets=_LATENCY_BUCKETS,
+    )
+    if Histogram is not None
+    else None
+)
+ADMISSION_REJECTED = (
+    Counter(
+        "rag_admission_rejected",
+        "Requests rejected with 429/503, by stage and reason",
+        ["stage", "reason"],
+    )
+    if Counter is not None
+    else None
+)
+
+SINGLE_FLIGHT_REQUESTS = (
+    Counter(
+        "rag_single_flight_requests",
+        "/chat requests that started an upstream computation (leader), shared one (follower), "
+        "or left it with no subscribers (abandoned)",
+        ["role"],
+    )
+    if Counter is not None
+    else None
+)
+
+STREAM_CHUNKS = (
+    Counter(
+        "rag_stream_chunks",
+        "LLM answer chunks received from upstream and sent after coalescing",
+        ["side"],
+    )
+    if Counter is not None
+    else None
+)
+
+_tracer = None
+_rerank_debug_sample_rate = 0.0
+_intent: ContextVar[str] = ContextVar("rag_intent", default="any")  # Label for spans with no explicit intent
+
+
+def init_telemetry(
+    otel_enabled: bool = False, rerank_debug_sample_rate: float = 0.0, log_level: str = "INFO"
+):
+    """Configure app logging, optional OpenTelemetry and the rerank debug sampling rate."""
+    global _tracer, _rerank_debug_sample_rate
+    _rerank_debug_sample_rate = rerank_debug_sample_rate
+
+    app_logger = logging.getLogger("app")
+    app_logger.setLevel(log_level.upper())
+    if not app_logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        app_logger.addHandler(handler)
+    if otel_enabled:
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            logger.warning("OTEL_ENABLED is set but opentelemetry-api is not installed")
+        else:
+            # Exporter/provider setup is left to opentelemetry-instrument / OTEL_* env vars
+            _tracer = trace.get_tracer("rag-movie-recommender")
+
+
+def observe(stage: str, seconds: float, intent: str = "any"):
+    if STAGE_SECONDS is not None:
+        STAGE_SECONDS.labels(stage=stage, intent=intent).observe(seconds)
+
+
+def observe_speculation(stage: str, intent: str, kept: bool, seconds: float):
+    if SPECULATION_SECONDS is not None:
+        SPECULATION_SECONDS.labels(stage, intent, "saved" if kept else "wasted").inc(seconds)
+        SPECULATION_TASKS.labels(stage, intent, "kept" if kept else "discarded").inc()
+
+
+def observe_prompt(intent: str, tokens: int, saved: int):
+    if PROMPT_TOKENS is not None:
+        PROMPT_TOKENS.labels(intent).observe(tokens)
+        PROMPT_TOKENS_SAVED.labels(intent).inc(saved)
+
+
+def observe_http_pool(
+    client: str, in_flight: int, connections: int | None = None, saturated: bool = False
+):
+    if HTTP_IN_FLIGHT is not None:
+        HTTP_IN_FLIGHT.labels(client).set(in_flight)
+        if connections is not None:
+            HTTP_POOL_CONNECTIONS.labels(client).set(connections)
+        if saturated:
+            HTTP_POOL_SATURATED.labels(client).inc()
+
+
+def observe_http_connect(client: str, phase: str, seconds: float):
+    if HTTP_CONNECTION_SECONDS is not None:
+        HTTP_CONNECTION_SECONDS.labels(client, phase).observe(seconds)
+
+
+def observe_http_retry(client: str, reason: str):
+    if HTTP_RETRIES is not None:
+        HTTP_RETRIES.labels(client, reason).inc()
+
+
+def observe_admission(stage: str, active: int, queued: int):
+    if ADMISSION_ACTIVE is not None:
+        ADMISSION_ACTIVE.labels(stage).set(active)
+        ADMISSION_QUEUE_DEPTH.labels(stage).set(queued)
+
+
+def observe_admission_wait(stage: str, seconds: float):
+    if ADMISSION_WAIT_SECONDS is not None:
+        ADMISSION_WAIT_SECONDS.labels(stage).observe(seconds)
+
+
+def observe_admission_rejected(stage: str, reason: str):
+    if ADMISSION_REJECTED is not None:
+        ADMISSION_REJECTED.labels(stage, reason).inc()
+
+
+def observe_single_flight(role: str):
+    if SINGLE_FLIGHT_REQUESTS is not None:
+        SINGLE_FLIGHT_REQUESTS.labels(role).inc()
+
+
+def observe_stream_chunks(received: int, sent: int):
+    if STREAM_CHUNKS is not None:
+        STREAM_CHUNKS.labels("upstream").inc(received)
+        STREAM_CHUNKS.labels("sent").inc(sent)
+
+
+@contextmanager
+def intent_label(intent: str):
+    """Label the spans recorded in this block, and in tasks or to_thread calls it starts, with `intent`."""
+    token = _intent.set(intent)
+    try:
+        yield
+    finally:
+        _intent.reset(token)
+
+
+@contextmanager
+def span(stage: str, intent: str | None = None, **attributes):
+    """Time a pipeline stage into the stage histogram (and an OTel span when enabled).
+
+    Without an explicit `intent`, the stage is labelled with the enclosing `intent_label`,
+    or "any" when the intent isn't known yet (classification, speculative work).
+
+    Cancelled stages (discarded speculative work, client disconnects) are not recorded, so
+    partial durations don't skew the latency histograms.
+    """
+    intent = intent or _intent.get()
+    t0 = time.perf_counter()
+    tracing = _tracer.start_as_current_span(stage, attributes=attributes) if _tracer else nullcontext()
+    with tracing:
+        try:
+            yield
+        except asyncio.CancelledError:
+            raise
+        except BaseException:
+            observe(stage, time.perf_counter() - t0, intent)
+            raise
+        observe(stage, time.perf_counter() - t0, intent)
+
+
+def rerank_debug_sampled() -> bool:
+    return _rerank_debug_sample_rate > 0 and random.random() < _rerank_debug_sample_rate
+
+
+def metrics_payload() -> tuple[bytes, str]:
+    if generate_latest is None:
+        return b"# prometheus_client is not installed\n", CONTENT_TYPE_LATEST
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # gunicorn workers: aggregate every worker's samples, not just this one's
+        from prometheus_client import CollectorRegistry, multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
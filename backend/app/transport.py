@@ -0,0 +1,340 @@
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass
+
+import httpx
+
+from app.telemetry import logger, observe_http_connect, observe_http_pool, observe_http_retry
+
+try:
+    import h2  # noqa: F401  (httpx's HTTP/2 support)
+except ImportError:  # Optional: clients fall back to HTTP/1.1 without it (pip install httpx[http2])
+    h2 = None
+
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+# The request never reached the server, or went out on a pooled keep-alive connection the
+# server had already closed, so sending it again is safe
+RETRY_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+MAX_BACKOFF_S = 2.0
+
+# Pool monitors by client name, for GET /stats/http
+pools: dict[str, "PoolMonitor"] = {}
+
+
+@dataclass(frozen=True)
+class HttpSettings:
+    """Connection pool, timeout and retry settings for one outbound client."""
+
+    max_connections: int = 100
+    max_keepalive: int = 20  # Idle connections kept open for reuse
+    keepalive_expiry: float = 30.0  # Seconds an idle connection stays in the pool
+    http2: bool = False  # Multiplex requests over one connection; needs the h2 package
+    connect_timeout: float = 5.0  # TCP + TLS handshake
+    timeout: float = 30.0  # Read, write and pool acquisition
+    max_retries: int = 2
+    backoff_ms: float = 100.0  # First retry delay, doubled per attempt, with jitter
+
+    @property
+    def use_http2(self) -> bool:
+        return self.http2 and h2 is not None
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def timeouts(self) -> httpx.Timeout:
+        return httpx.Timeout(self.timeout, connect=self.connect_timeout)
+
+    def retry_delay(self, attempt: int, response: httpx.Response | None = None) -> float:
+        retry_after = response.headers.get("Retry-After", "") if response is not None else ""
+        if retry_after.isdigit():
+            return min(float(retry_after), MAX_BACKOFF_S)
+        delay = min(self.backoff_ms / 1000 * 2**attempt, MAX_BACKOFF_S)
+        return delay / 2 + random.uniform(0, delay / 2)  # Jitter spreads out retry bursts
+
+
+class PoolMonitor:
+    """In-flight requests, pool waits, new connections and retries for one client's transport."""
+
+    def __init__(self, name: str, settings: HttpSettings):
+        self.name = name
+        self.max_connections = settings.max_connections
+        self.http2 = settings.use_http2
+        self._lock = threading.Lock()  # The sync Qdrant client is also called from worker threads
+        self.in_flight = self.peak_in_flight = 0
+        self.requests = self.saturated = self.connections_opened = self.retries = 0
+        self.pool_wait_s = self.connect_s = 0.0
+        pools[name] = self
+
+    def acquire(self):
+        with self._lock:
+            self.in_flight += 1
+            self.requests += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            # More requests in flight than the pool has connections: this one queues for one
+            saturated = self.in_flight > self.max_connections
+            self.saturated += saturated
+            in_flight = self.in_flight
+        observe_http_pool(self.name, in_flight, saturated=saturated)
+
+    def release(self, connections: int | None = None):
+        with self._lock:
+            self.in_flight -= 1
+            in_flight = self.in_flight
+        observe_http_pool(self.name, in_flight, connections=connections)
+
+    def record_pool_wait(self, seconds: float):
+        with self._lock:
+            self.pool_wait_s += seconds
+        observe_http_connect(self.name, "pool_wait", seconds)
+
+    def record_connect(self, seconds: float):
+        with self._lock:
+            self.connections_opened += 1
+            self.connect_s += seconds
+        observe_http_connect(self.name, "connect", seconds)
+
+    def record_retry(self, reason: str, delay: float):
+        with self._lock:
+            self.retries += 1
+        observe_http_retry(self.name, reason)
+        logger.debug("Retrying %s request in %.0f ms (%s)", self.name, delay * 1000, reason)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_connections": self.max_connections,
+                "http2": self.http2,
+                "requests": self.requests,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "saturated": self.saturated,
+                "avg_pool_wait_ms": 1000 * self.pool_wait_s / max(self.requests, 1),
+                "connections_opened": self.connections_opened,
+                "avg_connect_ms": 1000 * self.connect_s / max(self.connections_opened, 1),
+                "retries": self.retries,
+            }
+
+
+class _RequestTrace:
+    # httpcore "trace" extension callback for one attempt: the time until the request got a
+    # connection (pool wait, which also includes event loop delay on a busy worker), and the
+    # TCP/TLS handshake time when a new one was opened
+
+    def __init__(self, monitor: PoolMonitor):
+        self.monitor = monitor
+        self.t0 = time.perf_counter()
+        self.dequeued = False
+        self.connect_t0 = None
+
+    def __call__(self, event: str, info: dict):
+        if event == "connection.connect_tcp.started":
+            self._dequeue()
+            self.connect_t0 = time.perf_counter()
+        elif event.endswith(".send_request_headers.started"):
+            self._dequeue()
+            if self.connect_t0 is not None:
+                self.monitor.record_connect(time.perf_counter() - self.connect_t0)
+                self.connect_t0 = None
+
+    async def atrace(self, event: str, info: dict):
+        self(event, info)
+
+    def _dequeue(self):
+        if not self.dequeued:
+            self.dequeued = True
+            self.monitor.record_pool_wait(time.perf_counter() - self.t0)
+
+
+def _pool_connections(transport) -> int | None:
+    pool = getattr(transport, "_pool", None)  # httpcore pool behind httpx's default transport
+    return len(pool.connections) if pool is not None else None
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    # Counts the request as in flight until its body is read or closed (covers streaming)
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            if self._release is not None:
+                self._release, release = None, self._release
+                release()
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._release is not None:
+                self._release, release = None, self._release
+                release()
+
+
+class InstrumentedTransport(httpx.BaseTransport):
+    """httpx transport with a sized keep-alive pool, retries with backoff and pool metrics.
+
+    Retries cover connection failures and 429/502/503/504 responses, which suits Qdrant's
+    search and retrieve calls. Request bodies must be bytes (httpx's json=/content=) so they
+    can be sent again.
+    """
+
+    def __init__(self, name: str, settings: HttpSettings):
+        self.settings = settings
+        self.monitor = PoolMonitor(name, settings)
+        self._transport = httpx.HTTPTransport(limits=settings.limits(), http2=settings.use_http2)
+
+    def __deepcopy__(self, memo):
+        return self  # qdrant-client deep-copies its init kwargs; the pool is shared, not copied
+
+    def _release(self):
+        self.monitor.release(_pool_connections(self._transport))
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        traced = "trace" not in request.extensions  # Leave a caller's own trace hook alone
+        attempt = 0
+        while True:
+            if traced:
+                request.extensions["trace"] = _RequestTrace(self.monitor)
+            self.monitor.acquire()
+            try:
+                response = self._transport.handle_request(request)
+            except RETRY_EXCEPTIONS as e:
+                self._release()
+                if attempt >= self.settings.max_retries:
+                    raise
+                reason, delay = type(e).__name__, self.settings.retry_delay(attempt)
+            except BaseException:
+                self._release()
+                raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.settings.max_retries:
+                    return httpx.Response(
+                        status_code=response.status_code,
+                        headers=response.headers,
+                        stream=_ReleasingStream(response.stream, self._release),
+                        extensions=response.extensions,
+                    )
+                response.read()  # Drained, the connection goes back to the pool for the retry
+                response.close()
+                self._release()
+                reason, delay = str(response.status_code), self.settings.retry_delay(attempt, response)
+            self.monitor.record_retry(reason, delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def close(self):
+        self._transport.close()
+
+
+class AsyncInstrumentedTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of InstrumentedTransport, for AsyncQdrantClient and AsyncOpenAI."""
+
+    def __init__(self, name: str, settings: HttpSettings):
+        self.settings = settings
+        self.monitor = PoolMonitor(name, settings)
+        self._transport = httpx.AsyncHTTPTransport(limits=settings.limits(), http2=settings.use_http2)
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def _release(self):
+        self.monitor.release(_pool_connections(self._transport))
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        traced = "trace" not in request.extensions  # Leave a caller's own trace hook alone
+        attempt = 0
+        while True:
+            if traced:
+                request.extensions["trace"] = _RequestTrace(self.monitor).atrace
+            self.monitor.acquire()
+            try:
+                response = await self._transport.handle_async_request(request)
+            except RETRY_EXCEPTIONS as e:
+                self._release()
+                if attempt >= self.settings.max_retries:
+                    raise
+                reason, delay = type(e).__name__, self.settings.retry_delay(attempt)
+            except BaseException:  # Includes cancellation while queued for a connection
+                self._release()
+                raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.settings.max_retries:
+                    return httpx.Response(
+                        status_code=response.status_code,
+                        headers=response.headers,
+                        stream=_AsyncReleasingStream(response.stream, self._release),
+                        extensions=response.extensions,
+                    )
+                await response.aread()
+                await response.aclose()
+                self._release()
+                reason, delay = str(response.status_code), self.settings.retry_delay(attempt, response)
+            self.monitor.record_retry(reason, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def build_async_http_client(name: str, settings: HttpSettings, **kwargs) -> httpx.AsyncClient:
+    """A shared httpx.AsyncClient on an instrumented pool (e.g. AsyncOpenAI's http_client)."""
+    return httpx.AsyncClient(
+        transport=AsyncInstrumentedTransport(name, settings), timeout=settings.timeouts(), **kwargs
+    )
+
+
+def grpc_retry_options(settings: HttpSettings) -> dict:
+    # gRPC retries UNAVAILABLE itself when given a retry policy in the channel's service config
+    if settings.max_retries <= 0:
+        return {}
+    policy = {
+        "maxAttempts": min(settings.max_retries + 1, 5),  # gRPC caps attempts at 5
+        "initialBackoff": f"{settings.backoff_ms / 1000:.3f}s",
+        "maxBackoff": f"{MAX_BACKOFF_S}s",
+        "backoffMultiplier": 2,
+        "retryableStatusCodes": ["UNAVAILABLE"],
+    }
+    return {
+        "grpc.enable_retries": 1,
+        "grpc.service_config": json.dumps({"methodConfig": [{"name": [{}], "retryPolicy": policy}]}),
+    }
+
+
+def qdrant_client_options(name: str, settings: HttpSettings, asynchronous: bool = False) -> dict:
+    """QdrantClient/AsyncQdrantClient kwargs: REST goes through an instrumented pool.
+
+    qdrant-client passes unknown kwargs on to its httpx client, so the transport replaces
+    its default pool (which disables keep-alive for localhost). Its timeout is whole seconds.
+    """
+    transport_class = AsyncInstrumentedTransport if asynchronous else InstrumentedTransport
+    return {
+        "timeout": math.ceil(settings.timeout),
+        "transport": transport_class(name, settings),
+        "grpc_options": grpc_retry_options(settings),
+    }
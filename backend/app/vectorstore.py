@@ -1,14 +1,76 @@
-from qdrant_client import QdrantClient
-
-
-def connect_qdrant(endpoint: str, api_key: str) -> QdrantClient:
-    try:
-        client = QdrantClient(
-            url=endpoint,
-            api_key=api_key
-        )
-        print ("✅ Connected to Qdrant.")
-        return client
-    except Exception as e:
-        print(f"❌ Error connecting to Qdrant: {e}")
-        raise
+from typing import List, Protocol, Sequence
+
+from app.local_vectorstore import LocalVectorStore
+from app.transport import HttpSettings, qdrant_client_options
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http import models
+
+
+class VectorStoreBackend(Protocol):
+    # The QdrantClient surface MediaRetriever relies on; LocalVectorStore implements it in-process
+
+    def query_points(self, collection_name: str, query, using: str | None = None, query_filter=None, limit: int = 10, with_payload=True, with_vectors=False, **kwargs) -> models.QueryResponse: ...
+
+    def query_batch_points(self, collection_name: str, requests: Sequence[models.QueryRequest], **kwargs) -> List[models.QueryResponse]: ...
+
+    def retrieve(self, collection_name: str, ids: Sequence, with_payload=True, with_vectors=False, **kwargs) -> List[models.Record]: ...
+
+
+def connect_qdrant(
+    endpoint: str,
+    api_key: str,
+    http_settings: HttpSettings | None = None,  # None keeps qdrant-client's own pool defaults
+    prefer_grpc: bool = False,
+    grpc_port: int = 6334,
+) -> QdrantClient:
+    try:
+        options = (
+            qdrant_client_options("qdrant", http_settings)
+            if http_settings is not None
+            else {}
+        )
+        client = QdrantClient(
+            url=endpoint,
+            api_key=api_key,
+            prefer_grpc=prefer_grpc,
+            grpc_port=grpc_port,
+            **options,
+        )
+        print(f"✅ Connected to Qdrant over {'gRPC' if prefer_grpc else 'REST'}.")
+        return client
+    except Exception as e:
+        print(f"❌ Error connecting to Qdrant: {e}")
+        raise
+
+
+def connect_async_qdrant(
+    endpoint: str,
+    api_key: str,
+    http_settings: HttpSettings | None = None,  # None keeps qdrant-client's own pool defaults
+    prefer_grpc: bool = False,
+    grpc_port: int = 6334,
+) -> AsyncQdrantClient:
+    try:
+        options = (
+            qdrant_client_options("qdrant_async", http_settings, asynchronous=True)
+            if http_settings is not None
+            else {}
+        )
+        client = AsyncQdrantClient(
+            url=endpoint,
+            api_key=api_key,
+            prefer_grpc=prefer_grpc,
+            grpc_port=grpc_port,
+            **options,
+        )
+        print(f"✅ Connected to Qdrant (async) over {'gRPC' if prefer_grpc else 'REST'}.")
+        return client
+    except Exception as e:
+        print(f"❌ Error connecting to Qdrant (async): {e}")
+        raise
+
+
+def connect_local_vectorstore(path, ann: str = "exact") -> LocalVectorStore:
+    store = LocalVectorStore(path, ann=ann)
+    print(f"✅ Using local vector index at {path} ({ann} search).")
+    return store
@@ -0,0 +1,136 @@
+"""Compare inference backends for the embedding and intent models: latency, throughput, RSS.
+
+Usage (from backend/):
+    python -m benchmarks.bench_inference_backends [--models embedding intent] [--backends torch torch_int8 onnx]
+
+Each (model, backend) pair runs in its own subprocess, so peak RSS (ru_maxrss) reflects that
+backend alone. Single-query latency uses batch size 1, as the /chat path does without
+micro-batching; throughput encodes --batch-size queries per call. Embedding fidelity is the
+min cosine similarity to the torch fp32 embeddings; intent fidelity is label agreement with
+the torch pipeline. The onnx backend needs scripts/export_onnx_models.py to have run first.
+"""
+
+import argparse
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from app.config import EMBED_MIN_COSINE, EMBEDDING_MODEL, INTENT_MODEL, ONNX_MODEL_DIR
+from app.inference_backends import (
+    FIDELITY_SENTENCES,
+    INFERENCE_BACKENDS,
+    embedding_cosines,
+    load_embedding_model,
+    load_intent_pipeline,
+)
+
+QUERIES = FIDELITY_SENTENCES * 8
+
+
+def run_worker(model: str, backend: str, rounds: int, batch_size: int, output: Path):
+    t0 = time.perf_counter()
+    if model == "embedding":
+        # min_cosine=-1: measure the raw backend, fidelity is compared by the parent
+        encoder = load_embedding_model(backend, EMBEDDING_MODEL, ONNX_MODEL_DIR, min_cosine=-1.0)
+
+        def predict(texts):
+            return encoder.encode(texts, batch_size=len(texts), show_progress_bar=False)
+    else:
+        classifier = load_intent_pipeline(backend, INTENT_MODEL, ONNX_MODEL_DIR)
+
+        def predict(texts):
+            return classifier(texts, batch_size=len(texts))
+    load_s = time.perf_counter() - t0
+
+    predict(QUERIES[:4])  # warmup
+    latencies = []
+    for i in range(rounds):
+        t = time.perf_counter()
+        predict([QUERIES[i % len(QUERIES)]])
+        latencies.append(1000 * (time.perf_counter() - t))
+
+    batch = (QUERIES * (batch_size // len(QUERIES) + 1))[:batch_size]
+    t = time.perf_counter()
+    for _ in range(max(1, rounds // 10)):
+        predict(batch)
+    throughput = batch_size * max(1, rounds // 10) / (time.perf_counter() - t)
+
+    outputs = predict(FIDELITY_SENTENCES)
+    if model == "embedding":
+        np.save(output.with_suffix(".npy"), np.asarray(outputs))
+    else:
+        output.with_suffix(".labels.json").write_text(json.dumps([o["label"] for o in outputs]))
+
+    output.write_text(
+        json.dumps(
+            {
+                "load_s": load_s,
+                "p50_ms": statistics.median(latencies),
+                "p95_ms": statistics.quantiles(latencies, n=20)[-1],
+                "throughput_qps": throughput,
+                "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            }
+        )
+    )
+
+
+def fidelity(model: str, output: Path, reference: Path) -> str:
+    if not reference.exists():
+        return "n/a"
+    if model == "embedding":
+        cosines = embedding_cosines(np.load(reference.with_suffix(".npy")), np.load(output.with_suffix(".npy")))
+        flag = "" if cosines.min() >= EMBED_MIN_COSINE else " ❌"
+        return f"min cos {cosines.min():.4f}{flag}"
+    ref = json.loads(reference.with_suffix(".labels.json").read_text())
+    got = json.loads(output.with_suffix(".labels.json").read_text())
+    return f"labels {sum(a == b for a, b in zip(ref, got))}/{len(ref)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", choices=["embedding", "intent"], default=["embedding", "intent"])
+    parser.add_argument("--backends", nargs="+", choices=INFERENCE_BACKENDS, default=list(INFERENCE_BACKENDS))
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--worker", nargs=2, metavar=("MODEL", "BACKEND"), help=argparse.SUPPRESS)
+    parser.add_argument("--output", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker, args.rounds, args.batch_size, args.output)
+        return
+
+    # torch first: it is the fidelity reference for the other backends
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+    workdir = Path(tempfile.mkdtemp(prefix="bench-inference-"))
+    print("| Model | Backend | Load (s) | p50 (ms) | p95 (ms) | Throughput (q/s) | Peak RSS (MB) | Fidelity |")
+    print("|---|---|:---:|:---:|:---:|:---:|:---:|:---:|")
+    for model in args.models:
+        for backend in backends:
+            output = workdir / f"{model}-{backend}.json"
+            result = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_inference_backends", "--worker", model, backend,
+                 "--rounds", str(args.rounds), "--batch-size", str(args.batch_size), "--output", str(output)],
+                capture_output=True,
+                text=True,
+            )
+            if result.returncode != 0:
+                error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"
+                print(f"| {model} | {backend} | ❌ {error} | | | | | |")
+                continue
+            r = json.loads(output.read_text())
+            print(
+                f"| {model} | {backend} | {r['load_s']:.1f} | {r['p50_ms']:.1f} | {r['p95_ms']:.1f} | "
+                f"{r['throughput_qps']:.0f} | {r['max_rss_mb']:.0f} | "
+                f"{fidelity(model, output, workdir / f'{model}-torch.json')} |"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Microbenchmark: QueryAnalyzer vs the original NLTK query pipeline.
+
+Usage (from backend/):
+    python -m benchmarks.bench_query_analyzer [--rounds 200]
+
+Output equivalence is covered by tests/test_query_analyzer.py.
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import nltk
+
+nltk.data.path.append(str(Path(__file__).resolve().parent.parent / "data" / "nltk_data"))
+
+from app.query_analyzer import QueryAnalyzer, nltk_tokenize_and_preprocess  # noqa: E402
+
+SAMPLE_QUERIES = [
+    "Can you recommend a feel-good movie?",
+    "Dark comedies with moral ambiguity and character-driven narrative",
+    "Mind-bending sci-fi like Inception or Interstellar!",
+    "Cozy mysteries set in small English villages.",
+    "90s action movies: explosions, car chases & one-liners",
+    "Something like Nolan's films but less confusing",
+    "I wanna watch a slow-burn thriller (nothing too gory)",
+    "Best TV shows about found family, 2010-2020",
+    "Heist films with a twist ending -- the smarter the better",
+    "romcoms for a rainy day",
+    "Who directed The Godfather?",
+    "Underrated horror gems from the 1980s #spooky",
+    "Anime series with great world-building; no fillers",
+    "shows like \"Breaking Bad\" and \"Better Call Saul\"",
+    "Movies that will make me cry... in a good way",
+    "Documentaries on space exploration / astronomy",
+]
+
+
+def bench(fn, queries: list[str], rounds: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for q in queries:
+            fn(q)
+    return 1e6 * (time.perf_counter() - t0) / (rounds * len(queries))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    analyzer = QueryAnalyzer()
+    legacy_us = bench(nltk_tokenize_and_preprocess, SAMPLE_QUERIES, args.rounds)
+    fast_us = bench(analyzer.analyze, SAMPLE_QUERIES, args.rounds)
+    coverage = analyzer.fast_path_hits / (analyzer.fast_path_hits + analyzer.fallbacks)
+    print("\n| Pipeline | µs / query |")
+    print("|---|:---:|")
+    print(f"| NLTK per-call setup (original) | {legacy_us:.1f} |")
+    print(f"| QueryAnalyzer | {fast_us:.1f} |")
+    print(f"\nSpeedup: {legacy_us / fast_us:.1f}x (fast path on {coverage:.1%} of sample queries)")
+
+
+if __name__ == "__main__":
+    main()
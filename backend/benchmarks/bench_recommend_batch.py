@@ -0,0 +1,161 @@
+"""Throughput of POST /recommend/batch by queries per request, against local stand-ins.
+
+Usage (from backend/):
+    python -m benchmarks.bench_recommend_batch [--queries 1024] [--batch-sizes 1 8 32 128 512]
+                                               [--concurrency 1] [--qdrant-latency-ms 2]
+
+Boots benchmarks.fake_qdrant on a synthetic dataset and the real app (uvicorn, real
+embedding model), as benchmarks.load_test does. Then it sends --queries distinct prompts as
+/recommend/batch requests of each batch size, --concurrency requests at a time. Batch size 1
+is the per-query baseline: one encode call, one BM25 vectorization and one Qdrant round-trip
+per prompt.
+
+For each batch size it reports queries/s, the speedup over batch size 1 and request latency.
+It also reports the time per query spent embedding, building BM25 vectors and in Qdrant,
+from the app's rag_stage_seconds histograms. The server's RECOMMEND_BATCH_SIZE (default 64)
+caps the queries per encode call and per Qdrant batch request, so gains flatten above it
+(override with --app-env RECOMMEND_BATCH_SIZE=...).
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+import signal
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+from benchmarks.bench_workers import free_port
+from benchmarks.load_test import (
+    COLLECTIONS,
+    REC_QUERIES,
+    analyzed_terms,
+    app_environment,
+    stage_histograms,
+    start_process,
+    wait_for,
+)
+from benchmarks.synthetic_data import GENRES, PROVIDERS, build_synthetic_dataset
+
+PROMPT_IDS = itertools.count()  # Unique across batch sizes, so no prompt hits a cache
+BATCH_STAGES = ("embed_dense", "embed_sparse", "qdrant_batch", "fuse", "rerank")
+
+
+def random_query(rng: random.Random) -> dict:
+    filtered = rng.random() < 0.5
+    start = rng.choice([1950, 1970, 1990, 2000, 2010])
+    return {
+        "question": f"{rng.choice(REC_QUERIES)} #{next(PROMPT_IDS)}",
+        "media_type": "movies" if rng.random() < 0.7 else "tvs",
+        "genres": rng.sample(GENRES, rng.randint(1, 2)) if filtered else [],
+        "providers": rng.sample(PROVIDERS, rng.randint(1, 3)) if filtered and rng.random() < 0.5 else [],
+        "year_range": [start, rng.randint(start + 5, 2025)] if filtered else [1920, 2025],
+    }
+
+
+async def drive(base_url: str, queries: int, batch_size: int, concurrency: int, rng: random.Random) -> dict:
+    batches = [
+        [random_query(rng) for _ in range(min(batch_size, queries - start))]
+        for start in range(0, queries, batch_size)
+    ]
+    pending = iter(batches)
+    latencies, failed = [], 0
+
+    async def client(http: httpx.AsyncClient):
+        nonlocal failed
+        for batch in pending:
+            t0 = time.perf_counter()
+            r = await http.post("/recommend/batch", json={"queries": batch})
+            if r.status_code != 200 or len(r.json()["results"]) != len(batch):
+                failed += len(batch)
+                continue
+            latencies.append(time.perf_counter() - t0)
+
+    headers = {"X-API-Key": "bench-recommend-batch"}
+    async with httpx.AsyncClient(base_url=base_url, timeout=600, headers=headers) as http:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+    return {"elapsed": elapsed, "latencies": latencies, "failed": failed}
+
+
+def stage_ms_per_query(before: dict, after: dict, queries: int) -> list[float]:
+    return [
+        1000 * (after.get(stage, {"sum": 0.0})["sum"] - before.get(stage, {"sum": 0.0})["sum"]) / queries
+        for stage in BATCH_STAGES
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=1024, help="Prompts per batch size")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 128, 512])
+    parser.add_argument("--concurrency", type=int, default=1, help="Requests in flight")
+    parser.add_argument("--points", type=int, default=20000, help="Synthetic points per collection")
+    parser.add_argument("--dim", type=int, default=768, help="Must match the embedding model")
+    parser.add_argument("--data-dir", default=str(Path(tempfile.gettempdir()) / "rag_load_test"))
+    parser.add_argument("--qdrant-latency-ms", type=float, default=2.0)
+    parser.add_argument("--app-env", nargs="*", default=[], metavar="KEY=VALUE")
+    parser.add_argument("--ready-timeout", type=float, default=600.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.set_defaults(repeat_queries=False)  # For load_test.app_environment
+    args = parser.parse_args()
+
+    data_dir = build_synthetic_dataset(
+        args.data_dir,
+        COLLECTIONS,
+        points=args.points,
+        dim=args.dim,
+        query_terms=analyzed_terms(REC_QUERIES),
+        seed=args.seed,
+    )
+    qdrant_port, app_port = free_port(), free_port()
+    processes = [
+        start_process(
+            "benchmarks.fake_qdrant",
+            ["--index", data_dir / "index", "--port", qdrant_port, "--latency-ms", args.qdrant_latency_ms],
+        ),
+    ]
+    try:
+        wait_for(f"http://127.0.0.1:{qdrant_port}/", 60, processes[0])
+        # The LLM is never called, so OPENAI_BASE_URL points nowhere
+        env = app_environment(args, qdrant_port, free_port(), data_dir)
+        env.update(ADMISSION_PER_CLIENT_LIMIT="0")
+        processes.append(
+            start_process("uvicorn", ["main:app", "--port", app_port, "--log-level", "warning"], env=env)
+        )
+        base_url = f"http://127.0.0.1:{app_port}"
+        wait_for(f"{base_url}/health/ready", args.ready_timeout, processes[-1])
+        rng = random.Random(args.seed)
+        asyncio.run(drive(base_url, 64, 16, 1, rng))  # Warm up
+
+        print(f"{args.queries} prompts per batch size, concurrency {args.concurrency}\n")
+        print(
+            "| Batch size | Queries/s | Speedup | Failed | Request p50 ms | Request p99 ms "
+            "| Embed ms/query | BM25 ms/query | Qdrant ms/query | Fuse+rerank ms/query |"
+        )
+        print("|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|")
+        baseline = None
+        for batch_size in args.batch_sizes:
+            before = stage_histograms(base_url)
+            result = asyncio.run(drive(base_url, args.queries, batch_size, args.concurrency, rng))
+            embed, bm25, qdrant, fuse, rerank = stage_ms_per_query(before, stage_histograms(base_url), args.queries)
+            throughput = (args.queries - result["failed"]) / result["elapsed"]
+            baseline = baseline or throughput
+            p50, p99 = np.percentile(np.array(result["latencies"] or [0.0]) * 1000, [50, 99])
+            print(
+                f"| {batch_size} | {throughput:.1f} | {throughput / baseline:.1f}x | {result['failed']} | "
+                f"{p50:.0f} | {p99:.0f} | {embed:.2f} | {bm25:.2f} | {qdrant:.2f} | {fuse + rerank:.2f} |"
+            )
+    finally:
+        for process in reversed(processes):
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark: vectorized fuse_and_rerank vs the scalar MediaRetriever path.
+
+Usage (from backend/):
+    python -m benchmarks.bench_rerank [--sizes 300 1000 3000 10000]
+
+Candidate sets are synthetic: N dense hits plus N/15 sparse hits (about a third of them
+sparse-only), with payload popularity/vote_average, optionally with rounded scores to force
+ties. Ordering and score parity are covered by tests/test_reranker.py.
+"""
+
+import argparse
+import random
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import nltk
+
+nltk.data.path.append(str(Path(__file__).resolve().parent.parent / "data" / "nltk_data"))
+
+from app.media_retriever import MediaRetriever  # noqa: E402
+from app.reranker import fuse_and_rerank  # noqa: E402
+
+
+def synthetic_candidates(n: int, rng: random.Random, ties: bool = False):
+    value = (lambda x: round(x, 1) + 0.1) if ties else (lambda x: x + 1e-3)
+
+    def point(id_, score):
+        return SimpleNamespace(
+            id=id_,
+            score=score,
+            payload={
+                "title": f"Title {id_}",
+                "popularity": value(rng.random() * 100),
+                "vote_average": value(rng.random() * 10),
+            },
+        )
+
+    dense = [point(i, value(rng.random())) for i in range(n)]
+    sparse = [
+        point(rng.randrange(int(n * 1.5)), value(rng.random() * 20))
+        for _ in range(max(1, n // 15))
+    ]
+    return SimpleNamespace(points=dense), SimpleNamespace(points=sparse)
+
+
+def scalar_rerank(retriever: MediaRetriever, dense, sparse):
+    fused = retriever.fuse_dense_sparse(dense, sparse)
+    return retriever.rerank_fused_results(fused)[: retriever.top_k]
+
+
+def vectorized_rerank(retriever: MediaRetriever, dense, sparse):
+    return fuse_and_rerank(
+        dense.points,
+        sparse.points,
+        dense_weight=retriever.dense_weight,
+        sparse_weight=retriever.sparse_weight,
+        rating_weight=retriever.rating_weight,
+        popularity_weight=retriever.popularity_weight,
+        top_k=retriever.top_k,
+    ).points
+
+
+def time_per_call(fn, rounds: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return 1000 * (time.perf_counter() - t0) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[300, 1000, 3000, 10000])
+    parser.add_argument("--rounds", type=int, default=30)
+    args = parser.parse_args()
+
+    retriever = MediaRetriever(
+        embed_model=None,
+        qdrant_client=None,
+        bm25_indexes={},
+        movie_collection_name="movies",
+        tv_collection_name="tvs",
+    )
+    rng = random.Random(0)
+
+    print("| Candidates | Scalar (ms) | Vectorized (ms) | Speedup |")
+    print("|---:|:---:|:---:|:---:|")
+    for n in args.sizes:
+        dense, sparse = synthetic_candidates(n, rng)
+        scalar_ms = time_per_call(lambda: scalar_rerank(retriever, dense, sparse), args.rounds)
+        vector_ms = time_per_call(lambda: vectorized_rerank(retriever, dense, sparse), args.rounds)
+        print(f"| {n} | {scalar_ms:.3f} | {vector_ms:.3f} | {scalar_ms / vector_ms:.1f}x |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Chunks written per answer and added delay with stream shaping, on simulated LLM streams.
+
+Usage (from backend/):
+    python -m benchmarks.bench_stream_shaping [--answers 20] [--token-rate 60] [--min-chars 16 48 128]
+                                              [--max-delay-ms 40]
+
+Streams --answers answers as OpenAI-sized deltas (a word or part of one) at --token-rate
+deltas per second, through app.stream_shaping.coalesce_chunks at each --min-chars setting.
+Each chunk out is one HTTP write (one SSE event). For each setting it reports chunks per
+answer, the mean and max delay text spent waiting to be merged, and time to first chunk.
+
+It also checks MarkdownImageStripper against sanitize_markdown on whole answers, with
+image markdown split across deltas at random points (which the old per-chunk regex missed),
+and reports the stripper's CPU time per delta. Exits non-zero on a mismatch.
+"""
+
+import argparse
+import asyncio
+import random
+import re
+import sys
+import time
+
+import numpy as np
+
+from app.stream_shaping import MarkdownImageStripper, coalesce_chunks, sanitize_markdown
+
+WORDS = (
+    "Here are a few picks you might enjoy: **Heat** (1995) is a tense crime thriller with a "
+    "legendary heist sequence and a slow-burn rivalry between cop and thief. IMDB 8.3, "
+    "Rotten Tomatoes 88%."
+).split()
+POSTER = "![{title} poster](https://image.tmdb.org/t/p/w500/{id}.jpg)"
+
+
+def random_answer(rng: random.Random, words: int = 250) -> str:
+    parts = []
+    for i in range(words):
+        parts.append(rng.choice(WORDS))
+        if rng.random() < 0.02:
+            parts.append(POSTER.format(title=rng.choice(WORDS), id=rng.randrange(10**6)))
+        if rng.random() < 0.05:
+            parts.append("\n\n")
+    return " ".join(parts)
+
+
+def deltas(answer: str, rng: random.Random) -> list[str]:
+    # OpenAI tokens: roughly a word with its leading space, long words in pieces
+    out = []
+    for piece in re.findall(r"\s*\S+|\s+", answer):
+        while len(piece) > 6:
+            cut = rng.randint(2, 6)
+            out.append(piece[:cut])
+            piece = piece[cut:]
+        out.append(piece)
+    return out
+
+
+async def timed_stream(pieces: list[str], interval_s: float, sent_at: list):
+    for piece in pieces:
+        await asyncio.sleep(interval_s)
+        sent_at.append(time.perf_counter())
+        yield piece
+
+
+async def shape_one(pieces: list[str], interval_s: float, min_chars: int, max_delay_s: float) -> dict:
+    sent_at, waits, chunks = [], [], 0
+    t0 = time.perf_counter()
+    first = None
+    stream = timed_stream(pieces, interval_s, sent_at)
+    if min_chars > 0:
+        stream = coalesce_chunks(stream, min_chars, max_delay_s)
+    emitted = 0
+    async for chunk in stream:
+        now = time.perf_counter()
+        first = first if first is not None else now - t0
+        chunks += 1
+        # Every delta merged into this chunk waited from its arrival until now
+        covered = len(chunk)
+        while covered > 0 and emitted < len(sent_at):
+            waits.append(now - sent_at[emitted])
+            covered -= len(pieces[emitted])
+            emitted += 1
+    return {"chunks": chunks, "waits": waits, "first": first}
+
+
+def check_stripper(rng: random.Random, answers: int) -> tuple[int, float]:
+    mismatches, deltas_fed, cpu = 0, 0, 0.0
+    for _ in range(answers):
+        answer = random_answer(rng)
+        pieces = deltas(answer, rng)
+        stripper = MarkdownImageStripper()
+        t0 = time.perf_counter()
+        out = "".join(stripper.feed(p) for p in pieces) + stripper.flush()
+        cpu += time.perf_counter() - t0
+        deltas_fed += len(pieces)
+        mismatches += out != sanitize_markdown(answer)
+    return mismatches, 1e6 * cpu / deltas_fed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--answers", type=int, default=20)
+    parser.add_argument("--token-rate", type=float, default=60.0, help="Deltas per second")
+    parser.add_argument("--min-chars", type=int, nargs="+", default=[16, 48, 128])
+    parser.add_argument("--max-delay-ms", type=float, default=40.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    mismatches, us_per_delta = check_stripper(rng, 200)
+    print(f"Image stripping: {mismatches} mismatches over 200 answers, {us_per_delta:.1f} µs per delta\n")
+
+    streams = [deltas(random_answer(rng), rng) for _ in range(args.answers)]
+    print(f"{args.answers} answers, {np.mean([len(s) for s in streams]):.0f} deltas each at {args.token_rate:g}/s\n")
+    print("| min_chars | Chunks/answer | Writes saved | Mean wait ms | Max wait ms | First chunk ms |")
+    print("|:---:|:---:|:---:|:---:|:---:|:---:|")
+    baseline = None
+    for min_chars in [0] + args.min_chars:
+        results = [
+            asyncio.run(shape_one(s, 1 / args.token_rate, min_chars, args.max_delay_ms / 1000)) for s in streams
+        ]
+        chunks = np.mean([r["chunks"] for r in results])
+        waits = np.concatenate([r["waits"] for r in results]) * 1000
+        baseline = baseline or chunks
+        print(
+            f"| {min_chars or 'off'} | {chunks:.0f} | {1 - chunks / baseline:.0%} | {waits.mean():.1f} | "
+            f"{waits.max():.1f} | {1000 * np.mean([r['first'] for r in results]):.1f} |"
+        )
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
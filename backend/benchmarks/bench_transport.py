@@ -0,0 +1,178 @@
+"""Outbound connection pool settings (app.transport) against the local Qdrant and OpenAI stand-ins.
+
+Usage (from backend/):
+    python -m benchmarks.bench_transport [--requests 2000] [--concurrency 32] [--qdrant-latency-ms 2]
+                                         [--error-rate 0.05]
+
+Boots benchmarks.fake_qdrant twice (healthy, and answering --error-rate of requests with 503)
+plus benchmarks.fake_openai. Each is then driven through app.transport's instrumented httpx
+client with --concurrency concurrent requests, under these pool configurations:
+- no keep-alive: a new connection per request, qdrant-client's default for localhost
+- pooled: the HTTP_MAX_CONNECTIONS / HTTP_MAX_KEEPALIVE defaults (100 / 20)
+- pooled, keep-alive >= concurrency: no connection is closed between bursts
+- small pool: fewer connections than concurrent requests, so requests queue (saturation)
+Retries are compared on the failing server with QDRANT_MAX_RETRIES 0 and 2.
+
+For each configuration it reports:
+- throughput, p50/p99 latency and failures
+- connections opened and average handshake time
+- saturated requests and average pool wait
+- retries
+These are the same figures GET /stats/http and the rag_http_* metrics expose. Loopback
+handshakes are cheap. Against a hosted cluster, every connection avoided also saves a TLS
+handshake of tens of milliseconds.
+
+Qdrant queries are sent as pre-serialized point queries on small (--dim) vectors. Going
+through qdrant-client costs about 10 ms of client CPU per query, which would saturate the
+benchmark's event loop long before the pool.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import signal
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from app.transport import HttpSettings, build_async_http_client, pools
+from benchmarks.bench_workers import free_port
+from benchmarks.load_test import start_process, wait_for
+from benchmarks.synthetic_data import build_synthetic_dataset
+
+COLLECTION = "bench_movies"
+
+
+def pool_configs(concurrency: int) -> dict[str, HttpSettings]:
+    return {
+        "no keep-alive": HttpSettings(max_keepalive=0, max_retries=0),
+        "pooled": HttpSettings(max_retries=0),
+        "pooled, keep-alive >= concurrency": HttpSettings(max_keepalive=concurrency, max_retries=0),
+        "small pool": HttpSettings(max_connections=max(concurrency // 8, 1), max_retries=0),
+    }
+
+
+async def drive(concurrency: int, requests: int, send) -> dict:
+    latencies, failed = [], 0
+    counter = itertools.count()
+
+    async def worker():
+        nonlocal failed
+        while (i := next(counter)) < requests:
+            t0 = time.perf_counter()
+            try:
+                await send(i)
+            except Exception:
+                failed += 1
+                continue
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {"elapsed": time.perf_counter() - t0, "latencies": latencies, "failed": failed}
+
+
+async def bench_qdrant(url: str, name: str, settings: HttpSettings, args) -> dict:
+    vectors = np.random.default_rng(0).standard_normal((64, args.dim)).round(4).tolist()
+    bodies = [
+        json.dumps({"query": v, "using": "dense_vector", "limit": 20, "with_payload": False}).encode()
+        for v in vectors
+    ]
+    headers = {"content-type": "application/json"}
+
+    async with build_async_http_client(name, settings, base_url=url) as http:
+
+        async def send(i: int):
+            r = await http.post(f"/collections/{COLLECTION}/points/query", content=bodies[i % len(bodies)], headers=headers)
+            r.raise_for_status()
+
+        return await drive(args.concurrency, args.requests, send)
+
+
+async def bench_openai(url: str, name: str, settings: HttpSettings, args) -> dict:
+    body = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "Hi"}], "stream": True}
+
+    async with build_async_http_client(name, settings, base_url=url) as http:
+
+        async def send(i: int):
+            async with http.stream("POST", "/v1/chat/completions", json=body) as r:
+                r.raise_for_status()
+                async for _ in r.aiter_lines():
+                    pass
+
+        return await drive(args.concurrency, max(args.requests // 10, args.concurrency), send)
+
+
+def report(client: str, config: str, name: str, result: dict):
+    stats = pools[name].stats()
+    p50, p99 = np.percentile(np.array(result["latencies"] or [0.0]) * 1000, [50, 99])
+    print(
+        f"| {client} | {config} | {len(result['latencies']) / result['elapsed']:.0f} | {result['failed']} | "
+        f"{p50:.1f} | {p99:.1f} | {stats['connections_opened']} | {stats['avg_connect_ms']:.2f} | "
+        f"{stats['saturated']} | {stats['avg_pool_wait_ms']:.2f} | {stats['retries']} |"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="Qdrant queries per configuration")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--points", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--data-dir", default=str(Path(tempfile.gettempdir()) / "rag_bench_transport"))
+    parser.add_argument("--qdrant-latency-ms", type=float, default=2.0)
+    parser.add_argument("--error-rate", type=float, default=0.05, help="503 rate of the failing Qdrant")
+    args = parser.parse_args()
+
+    data_dir = build_synthetic_dataset(args.data_dir, {"movie": COLLECTION}, points=args.points, dim=args.dim)
+    qdrant_port, failing_port, openai_port = free_port(), free_port(), free_port()
+    qdrant_args = ["--index", data_dir / "index", "--latency-ms", args.qdrant_latency_ms]
+    processes = [
+        start_process("benchmarks.fake_qdrant", [*qdrant_args, "--port", qdrant_port]),
+        start_process(
+            "benchmarks.fake_qdrant", [*qdrant_args, "--port", failing_port, "--error-rate", args.error_rate]
+        ),
+        start_process(
+            "benchmarks.fake_openai", ["--port", openai_port, "--ttft-ms", 50, "--token-rate", 1000, "--answer-tokens", 50]
+        ),
+    ]
+    try:
+        wait_for(f"http://127.0.0.1:{qdrant_port}/", 60, processes[0])
+        wait_for(f"http://127.0.0.1:{failing_port}/", 60, processes[1])
+        wait_for(f"http://127.0.0.1:{openai_port}/stats", 60, processes[2])
+
+        print(f"Concurrency {args.concurrency}; latency in ms\n")
+        print(
+            "| Client | Pool | Req/s | Failed | p50 | p99 | Connections opened | Connect ms "
+            "| Saturated | Pool wait ms | Retries |"
+        )
+        print("|---|---|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|")
+        runs = [
+            ("qdrant", config, bench_qdrant, f"http://127.0.0.1:{qdrant_port}", settings)
+            for config, settings in pool_configs(args.concurrency).items()
+        ]
+        runs += [
+            ("openai (streaming)", config, bench_openai, f"http://127.0.0.1:{openai_port}", settings)
+            for config, settings in pool_configs(args.concurrency).items()
+        ]
+        runs += [
+            (f"qdrant, {args.error_rate:.0%} 503s", config, bench_qdrant, f"http://127.0.0.1:{failing_port}", settings)
+            for config, settings in {
+                "pooled, no retries": HttpSettings(max_keepalive=args.concurrency, max_retries=0),
+                "pooled, 2 retries": HttpSettings(max_keepalive=args.concurrency, max_retries=2, backoff_ms=20),
+            }.items()
+        ]
+        for i, (client, config, bench, url, settings) in enumerate(runs):
+            name = f"bench_{i}"
+            result = asyncio.run(bench(url, name, settings, args))
+            report(client, config, name, result)
+    finally:
+        for process in reversed(processes):
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    main()
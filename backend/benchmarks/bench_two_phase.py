@@ -0,0 +1,103 @@
+"""Compare single-phase and two-phase retrieval: payload bytes transferred and latency.
+
+Usage (from backend/, with the usual .env pointing at Qdrant):
+    python -m benchmarks.bench_two_phase [--queries 50] [--media-type movies]
+
+Query vectors are random unit vectors (dense) and random vocab terms (sparse), so the
+numbers reflect transfer/deserialization cost rather than relevance. Payload bytes are
+the JSON-serialized size of the payloads each mode receives.
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+import numpy as np
+from app.config import (
+    QDRANT_API_KEY,
+    QDRANT_ENDPOINT,
+    QDRANT_MOVIE_COLLECTION_NAME,
+    QDRANT_TV_COLLECTION_NAME,
+)
+from app.media_retriever import CONTEXT_PAYLOAD_FIELDS, MediaRetriever
+from app.vectorstore import connect_qdrant
+
+
+class ByteCountingClient:
+    """Wraps QdrantClient and tallies the JSON size of every payload it returns."""
+
+    def __init__(self, client):
+        self._client = client
+        self.payload_bytes = 0
+
+    def _count(self, points):
+        self.payload_bytes += sum(len(json.dumps(p.payload or {})) for p in points)
+
+    def query_batch_points(self, **kwargs):
+        responses = self._client.query_batch_points(**kwargs)
+        for r in responses:
+            self._count(r.points)
+        return responses
+
+    def retrieve(self, **kwargs):
+        records = self._client.retrieve(**kwargs)
+        self._count(records)
+        return records
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def random_queries(n: int, dim: int, vocab_size: int, rng: np.random.Generator):
+    for _ in range(n):
+        dense = rng.standard_normal(dim)
+        dense /= np.linalg.norm(dense)
+        indices = rng.choice(vocab_size, size=5, replace=False)
+        yield dense.tolist(), {"indices": indices.tolist(), "values": [1.0] * 5}
+
+
+def run_mode(retriever: MediaRetriever, client: ByteCountingClient, queries, media_type):
+    client.payload_bytes = 0
+    latencies = []
+    for dense, sparse in queries:
+        t0 = time.perf_counter()
+        retriever.retrieve_and_rerank(dense, sparse, media_type)
+        latencies.append(1000 * (time.perf_counter() - t0))
+    return client.payload_bytes / len(queries), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--media-type", choices=["movies", "tvs"], default="movies")
+    parser.add_argument("--vocab-size", type=int, default=30000)
+    args = parser.parse_args()
+
+    client = ByteCountingClient(connect_qdrant(QDRANT_ENDPOINT, QDRANT_API_KEY))
+    retriever = MediaRetriever(
+        embed_model=None,
+        qdrant_client=client,
+        bm25_indexes={},
+        movie_collection_name=QDRANT_MOVIE_COLLECTION_NAME,
+        tv_collection_name=QDRANT_TV_COLLECTION_NAME,
+    )
+    collection = retriever._collection_for(args.media_type)
+    dense_params = client.get_collection(collection).config.params.vectors["dense_vector"]
+    queries = list(
+        random_queries(args.queries, dense_params.size, args.vocab_size, np.random.default_rng(0))
+    )
+
+    print("| Mode | Payload KB / query | p50 (ms) | p95 (ms) |")
+    print("|---|:---:|:---:|:---:|")
+    for two_phase in (False, True):
+        retriever.two_phase_retrieval = two_phase
+        run_mode(retriever, client, queries[:3], args.media_type)  # warm connections
+        kb, latencies = run_mode(retriever, client, queries, args.media_type)
+        p95 = statistics.quantiles(latencies, n=20)[-1]
+        label = "two-phase" if two_phase else f"single-phase ({'+'.join(CONTEXT_PAYLOAD_FIELDS)} for all)"
+        print(f"| {label} | {kb / 1024:.1f} | {statistics.median(latencies):.1f} | {p95:.1f} |")
+
+
+if __name__ == "__main__":
+    main()
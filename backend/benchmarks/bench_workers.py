@@ -0,0 +1,210 @@
+"""Per-worker memory and throughput scaling for multi-worker serving, with and without preloading.
+
+Usage (from backend/, with the usual .env pointing at Qdrant):
+    python -m benchmarks.bench_workers [--workers 1 2 4] [--modes preload no-preload] [--concurrency 16]
+
+For each mode and worker count this starts `gunicorn main:app -c gunicorn.conf.py` and waits
+until /health/ready succeeds on every worker. It then drives /chat with concurrent
+recommendation queries for --duration seconds. The chat model is a local stub that streams
+a fixed answer instantly, so throughput reflects intent, embedding, retrieval and reranking
+work only.
+
+Memory comes from /proc/<pid>/smaps_rollup (Linux only):
+- USS is memory private to one worker.
+- PSS splits shared pages evenly across the processes that share them.
+With preloading, model weights live in pages shared copy-on-write with the master, so
+per-worker USS should stay small as workers are added.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+QUERIES = [
+    "Can you recommend a feel-good movie?",
+    "Dark comedies with moral ambiguity",
+    "Mind-bending sci-fi like Inception",
+    "Cozy mysteries set in small English villages",
+    "90s action movies with car chases",
+    "A slow-burn thriller that is not too gory",
+    "Heist films with a twist ending",
+    "Underrated horror gems from the 1980s",
+]
+
+
+class StubChatHandler(BaseHTTPRequestHandler):
+    # Minimal OpenAI-compatible streaming chat completion
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for token in ["Here ", "are ", "some ", "picks."]:
+            chunk = {
+                "id": "stub",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": "stub",
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_llm() -> str:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubChatHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def children(pid: int):
+    pids = []
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            fields = stat.read_text().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        if int(fields[1]) == pid:
+            pids.append(int(stat.parent.name))
+    return pids
+
+
+def memory_mb(pid: int) -> dict:
+    values = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        key, value = line.split(":", 1)
+        values[key] = int(value.split()[0]) / 1024
+    return {
+        "rss": values["Rss"],
+        "pss": values["Pss"],
+        "uss": values["Private_Clean"] + values["Private_Dirty"],
+    }
+
+
+def wait_ready(base_url: str, workers: int, timeout: float):
+    # Requests land on arbitrary workers; require a run of successes to cover all of them
+    deadline = time.monotonic() + timeout
+    streak = 0
+    while time.monotonic() < deadline:
+        try:
+            ok = httpx.get(f"{base_url}/health/ready", timeout=2).status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        streak = streak + 1 if ok else 0
+        if streak >= 4 * workers:
+            return
+        time.sleep(0.05 if ok else 0.5)
+    raise TimeoutError(f"Server not ready after {timeout}s")
+
+
+async def drive_load(base_url: str, concurrency: int, duration: float) -> tuple[int, int]:
+    completed = failed = 0
+    deadline = time.monotonic() + duration
+
+    async def client(i: int):
+        nonlocal completed, failed
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as http:
+            n = i
+            while time.monotonic() < deadline:
+                body = {
+                    "question": QUERIES[n % len(QUERIES)] + f" #{n}",  # Defeat the query caches
+                    "history": [],
+                    "media_type": "movies",
+                    "genres": [],
+                    "providers": [],
+                    "year_range": [1970, 2025],
+                }
+                n += concurrency
+                try:
+                    async with http.stream("POST", "/chat", json=body) as r:
+                        async for _ in r.aiter_bytes():
+                            pass
+                    completed += r.status_code == 200
+                    failed += r.status_code != 200
+                except httpx.HTTPError:
+                    failed += 1
+
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    return completed, failed
+
+
+def run_server(mode: str, workers: int, args, llm_url: str):
+    port = free_port()
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        WEB_CONCURRENCY=str(workers),
+        PRELOAD_MODELS="true" if mode == "preload" else "false",
+        OPENAI_BASE_URL=llm_url,
+        RESPONSE_CACHE_ENABLED="false",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "main:app", "-c", "gunicorn.conf.py"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        t0 = time.perf_counter()
+        wait_ready(base_url, workers, args.ready_timeout)
+        ready_s = time.perf_counter() - t0
+        completed, failed = asyncio.run(drive_load(base_url, args.concurrency, args.duration))
+        worker_memory = [memory_mb(pid) for pid in children(server.pid)]
+        master_memory = memory_mb(server.pid)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+    return ready_s, completed / args.duration, failed, master_memory, worker_memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--modes", nargs="+", choices=["preload", "no-preload"], default=["preload", "no-preload"])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--ready-timeout", type=float, default=600.0)
+    args = parser.parse_args()
+
+    llm_url = start_stub_llm()
+    print("| Mode | Workers | Ready (s) | Req/s | Scaling | Failed | Worker USS (MB) | Worker PSS (MB) | Total PSS (MB) |")
+    print("|---|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|")
+    for mode in args.modes:
+        baseline = None
+        for workers in args.workers:
+            ready_s, rps, failed, master, worker_memory = run_server(mode, workers, args, llm_url)
+            baseline = rps if baseline is None else baseline
+            uss = sum(m["uss"] for m in worker_memory) / max(len(worker_memory), 1)
+            pss = sum(m["pss"] for m in worker_memory) / max(len(worker_memory), 1)
+            total_pss = master["pss"] + sum(m["pss"] for m in worker_memory)
+            print(
+                f"| {mode} | {workers} | {ready_s:.1f} | {rps:.1f} | {rps / baseline if baseline else 0:.2f}x | {failed} | "
+                f"{uss:.0f} | {pss:.0f} | {total_pss:.0f} |"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Local stand-in for the OpenAI streaming chat completions API.
+
+Usage (from backend/):
+    python -m benchmarks.fake_openai [--port 8100] [--ttft-ms 300] [--token-rate 60] [--answer-tokens 250]
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:8100/v1. Every request to
+/v1/chat/completions streams --answer-tokens tokens: the first after --ttft-ms, the rest at
+--token-rate tokens per second, roughly what gpt-4o-mini streams. Prompt sizes are
+recorded so the load test can report prompt tokens per request (GET /stats).
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import uvicorn
+from fastapi import Body, FastAPI
+from fastapi.responses import StreamingResponse
+
+ANSWER_WORDS = (
+    "Here are a few picks you might enjoy . **Heat** ( 1995 ) is a tense crime thriller with "
+    "a legendary heist sequence and a slow-burn rivalry between cop and thief . "
+).split()
+
+
+def _chunk(model: str, created: int, delta: dict, finish_reason=None) -> bytes:
+    body = {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(body)}\n\n".encode()
+
+
+def create_app(ttft_ms: float, token_rate: float, answer_tokens: int) -> FastAPI:
+    app = FastAPI()
+    stats = {"requests": 0, "prompt_chars": 0}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(body: dict = Body(...)):
+        stats["requests"] += 1
+        stats["prompt_chars"] += sum(len(m.get("content") or "") for m in body.get("messages", []))
+        model = body.get("model", "fake")
+        created = int(time.time())
+
+        async def stream():
+            await asyncio.sleep(ttft_ms / 1000)
+            yield _chunk(model, created, {"role": "assistant", "content": ""})
+            for i in range(answer_tokens):
+                if i:
+                    await asyncio.sleep(1 / token_rate)
+                yield _chunk(model, created, {"content": ANSWER_WORDS[i % len(ANSWER_WORDS)] + " "})
+            yield _chunk(model, created, {}, finish_reason="stop")
+            yield b"data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--ttft-ms", type=float, default=300.0)
+    parser.add_argument("--token-rate", type=float, default=60.0, help="Streamed tokens per second")
+    parser.add_argument("--answer-tokens", type=int, default=250)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_app(args.ttft_ms, args.token_rate, args.answer_tokens),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Local stand-in for the Qdrant REST API, serving snapshots through LocalVectorStore.
+
+Usage (from backend/):
+    python -m benchmarks.fake_qdrant --index <dir with one snapshot per collection> [--port 6333] [--latency-ms 0]
+                                     [--error-rate 0]
+
+Implements the endpoints the app's QdrantClient/AsyncQdrantClient calls: version check,
+points/query, points/query/batch, point retrieval and scroll. --latency-ms adds a fixed
+per-request delay to approximate a network round-trip to a hosted cluster. --error-rate
+answers that fraction of point requests with 503, like an overloaded cluster, to exercise
+client retries (benchmarks.bench_transport).
+"""
+
+import argparse
+import random
+import time
+
+import uvicorn
+from app.local_vectorstore import LocalVectorStore
+from fastapi import Body, FastAPI
+from fastapi.responses import JSONResponse
+from qdrant_client.http import models
+
+
+def _ok(result, t0: float) -> dict:
+    return {"result": result, "status": "ok", "time": time.perf_counter() - t0}
+
+
+def _dump(obj):
+    return obj.model_dump(mode="json", exclude_none=True)
+
+
+def create_app(store: LocalVectorStore, latency_ms: float = 0.0, error_rate: float = 0.0) -> FastAPI:
+    app = FastAPI()
+    rng = random.Random(0)
+
+    @app.middleware("http")
+    async def inject_errors(request, call_next):
+        if request.method == "POST" and error_rate and rng.random() < error_rate:
+            return JSONResponse({"status": {"error": "Service Unavailable (injected)"}}, status_code=503)
+        return await call_next(request)
+
+    # Plain (non-async) handlers: searches run in FastAPI's threadpool, not on the event loop
+    def delay():
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+
+    @app.get("/")
+    async def root():
+        return {"title": "qdrant - vector search engine (fake)", "version": "1.14.0"}
+
+    @app.post("/collections/{collection_name}/points/query")
+    def query(collection_name: str, body: dict = Body(...)):
+        t0 = time.perf_counter()
+        delay()
+        request = models.QueryRequest.model_validate(body)
+        (response,) = store.query_batch_points(collection_name, [request])
+        return _ok(_dump(response), t0)
+
+    @app.post("/collections/{collection_name}/points/query/batch")
+    def query_batch(collection_name: str, body: dict = Body(...)):
+        t0 = time.perf_counter()
+        delay()
+        request = models.QueryRequestBatch.model_validate(body)
+        responses = store.query_batch_points(collection_name, request.searches)
+        return _ok([_dump(r) for r in responses], t0)
+
+    @app.post("/collections/{collection_name}/points")
+    def retrieve(collection_name: str, body: dict = Body(...)):
+        t0 = time.perf_counter()
+        delay()
+        request = models.PointRequest.model_validate(body)
+        records = store.retrieve(collection_name, request.ids, with_payload=request.with_payload)
+        return _ok([_dump(r) for r in records], t0)
+
+    @app.post("/collections/{collection_name}/points/scroll")
+    def scroll(collection_name: str, body: dict = Body(...)):
+        t0 = time.perf_counter()
+        delay()
+        request = models.ScrollRequest.model_validate(body)
+        collection = store.collection(collection_name)
+        start = collection.position[request.offset] if request.offset is not None else 0
+        end = min(start + (request.limit or 10), len(collection))
+        records = store.retrieve(
+            collection_name, collection.ids[start:end], with_payload=request.with_payload
+        )
+        next_offset = collection.ids[end] if end < len(collection) else None
+        return _ok({"points": [_dump(r) for r in records], "next_page_offset": next_offset}, t0)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index", required=True)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6333)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of point requests answered with 503")
+    args = parser.parse_args()
+
+    app = create_app(LocalVectorStore(args.index), args.latency_ms, args.error_rate)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
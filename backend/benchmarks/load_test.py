@@ -0,0 +1,335 @@
+"""End-to-end load test of /chat against local stand-ins for Qdrant and OpenAI.
+
+Usage (from backend/):
+    python -m benchmarks.load_test [--concurrency 1 4 16] [--duration 30] [--points 20000]
+                                   [--chat-ratio 0.2] [--qdrant-latency-ms 2] [--token-rate 60]
+
+Boots three processes on free local ports:
+- benchmarks.fake_qdrant, serving a synthetic dense + sparse collection (benchmarks.synthetic_data)
+- benchmarks.fake_openai, streaming answers at a configurable TTFT and token rate
+- the app itself (uvicorn main:app), pointed at both through QDRANT_ENDPOINT / OPENAI_BASE_URL
+
+Only the embedding and intent models are real, so the numbers isolate the app's own work:
+classification, embeddings, BM25, retrieval round-trips, fusion/rerank and streaming.
+
+Each concurrency level drives /chat with a mix of recommendation queries (random genre,
+provider and year filters, movies and TV) and small-talk for --duration seconds. It reports:
+- throughput, failures and admission rejections (429/503, retried after Retry-After)
+- TTFT and total latency as p50/p95/p99
+- a per-stage breakdown from the deltas of the app's rag_stage_seconds histograms on /metrics
+
+Queries get a unique suffix so the caches don't serve them. Pass --repeat-queries to measure
+a warm-cache workload instead. Extra app settings can be passed as --app-env KEY=VALUE
+(e.g. QDRANT_RETRIEVAL_MODE=parallel) to compare configurations.
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+import numpy as np
+from prometheus_client.parser import text_string_to_metric_families
+
+from app.telemetry import STAGES
+from benchmarks.bench_workers import free_port
+from benchmarks.synthetic_data import GENRES, PROVIDERS, build_synthetic_dataset
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+COLLECTIONS = {"movie": "bench_movies", "tv": "bench_tvs"}
+REC_QUERIES = [
+    "Can you recommend a feel-good movie?",
+    "Dark comedies with moral ambiguity",
+    "Mind-bending sci-fi like Inception",
+    "Cozy mysteries set in small English villages",
+    "90s action movies with car chases",
+    "A slow-burn thriller that is not too gory",
+    "Heist films with a twist ending",
+    "Underrated horror gems from the 1980s",
+    "Shows about a dysfunctional family running a business",
+    "Something like Breaking Bad but funnier",
+    "Epic fantasy with dragons and political intrigue",
+    "Documentaries about nature and the ocean",
+]
+CHAT_QUERIES = [
+    "Hi there!",
+    "Thanks, that's helpful",
+    "What can you do?",
+    "Who directed the first one you mentioned?",
+]
+REQUEST_IDS = itertools.count()  # Unique across warmup and every level, so no query repeats
+
+
+def analyzed_terms(queries) -> set:
+    # Terms the app's BM25 lookup will produce, so synthetic sparse vectors can hit them
+    import nltk
+
+    nltk.data.path.append(str(BACKEND_DIR / "data" / "nltk_data"))
+    from app.query_analyzer import QueryAnalyzer
+
+    analyzer = QueryAnalyzer()
+    return {term for q in queries for term in analyzer.analyze(q)}
+
+
+def random_request(rng: random.Random, n: int, chat_ratio: float, repeat: bool) -> dict:
+    chat = rng.random() < chat_ratio
+    question = rng.choice(CHAT_QUERIES if chat else REC_QUERIES)
+    if not repeat:
+        question += f" #{n}"
+    filtered = rng.random() < 0.5
+    start = rng.choice([1950, 1970, 1990, 2000, 2010])
+    return {
+        "question": question,
+        "history": [],
+        "media_type": "movies" if rng.random() < 0.7 else "tvs",
+        "genres": rng.sample(GENRES, rng.randint(1, 2)) if filtered else [],
+        "providers": rng.sample(PROVIDERS, rng.randint(1, 3)) if filtered and rng.random() < 0.5 else [],
+        "year_range": [start, rng.randint(start + 5, 2025)] if filtered else [1920, 2025],
+    }
+
+
+def start_process(module: str, args, env=None) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", module, *map(str, args)],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_for(url: str, timeout: float, process: subprocess.Popen):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url}: process exited with code {process.returncode}")
+        try:
+            if httpx.get(url, timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+
+def stage_histograms(base_url: str) -> dict:
+    """rag_stage_seconds summed over intents: {stage: {"count", "sum", "buckets": {le: count}}}."""
+    text = httpx.get(f"{base_url}/metrics", timeout=10).text
+    stages = defaultdict(lambda: {"count": 0.0, "sum": 0.0, "buckets": defaultdict(float)})
+    for family in text_string_to_metric_families(text):
+        if family.name != "rag_stage_seconds":
+            continue
+        for sample in family.samples:
+            stage = stages[sample.labels["stage"]]
+            if sample.name.endswith("_bucket"):
+                stage["buckets"][float(sample.labels["le"])] += sample.value
+            elif sample.name.endswith("_count"):
+                stage["count"] += sample.value
+            elif sample.name.endswith("_sum"):
+                stage["sum"] += sample.value
+    return stages
+
+
+def histogram_quantile(q: float, buckets: dict) -> float:
+    # Linear interpolation within the bucket, as Prometheus' histogram_quantile does
+    bounds = sorted(buckets)
+    total = buckets[bounds[-1]]
+    if not total:
+        return float("nan")
+    rank = q * total
+    lower, below = 0.0, 0.0
+    for bound in bounds:
+        if buckets[bound] >= rank:
+            if bound == float("inf"):
+                return lower
+            return lower + (bound - lower) * (rank - below) / max(buckets[bound] - below, 1e-12)
+        lower, below = bound, buckets[bound]
+    return lower
+
+
+def stage_breakdown(before: dict, after: dict) -> list[tuple]:
+    rows = []
+    for stage, end in after.items():
+        start = before.get(stage, {"count": 0.0, "sum": 0.0, "buckets": {}})
+        count = end["count"] - start["count"]
+        if count <= 0:
+            continue
+        buckets = {le: n - start["buckets"].get(le, 0.0) for le, n in end["buckets"].items()}
+        rows.append(
+            (
+                stage,
+                int(count),
+                1000 * (end["sum"] - start["sum"]) / count,
+                1000 * histogram_quantile(0.5, buckets),
+                1000 * histogram_quantile(0.95, buckets),
+            )
+        )
+    return sorted(rows, key=lambda row: STAGES.index(row[0]) if row[0] in STAGES else len(STAGES))
+
+
+async def drive_load(base_url: str, concurrency: int, duration: float, args) -> dict:
+    results = {"ttft": [], "total": [], "failed": 0, "rejected": 0, "completed": 0}
+    deadline = time.monotonic() + duration
+    rng = random.Random(args.seed + concurrency)
+
+    async def client(n: int):
+        # Each simulated user is a separate client for the per-client admission limit
+        headers = {"X-API-Key": f"load-test-{n}"}
+        async with httpx.AsyncClient(base_url=base_url, timeout=120, headers=headers) as http:
+            while time.monotonic() < deadline:
+                body = random_request(rng, next(REQUEST_IDS), args.chat_ratio, args.repeat_queries)
+                t0 = time.perf_counter()
+                ttft = None
+                try:
+                    async with http.stream("POST", "/chat", json=body) as r:
+                        async for chunk in r.aiter_bytes():
+                            if ttft is None and chunk:
+                                ttft = time.perf_counter() - t0
+                    ok = r.status_code == 200
+                    if r.status_code in (429, 503):  # Admission control turned it away
+                        results["rejected"] += 1
+                        await asyncio.sleep(float(r.headers.get("retry-after", 1)))
+                        continue
+                except httpx.HTTPError:
+                    ok = False
+                if not ok:
+                    results["failed"] += 1
+                    continue
+                results["completed"] += 1
+                results["total"].append(time.perf_counter() - t0)
+                if ttft is not None:
+                    results["ttft"].append(ttft)
+
+    await asyncio.gather(*(client(n) for n in range(concurrency)))
+    return results
+
+
+def percentiles_ms(values) -> str:
+    if not values:
+        return "- | - | -"
+    p50, p95, p99 = np.percentile(np.array(values) * 1000, [50, 95, 99])
+    return f"{p50:.0f} | {p95:.0f} | {p99:.0f}"
+
+
+def app_environment(args, qdrant_port: int, openai_port: int, data_dir: Path) -> dict:
+    env = dict(
+        os.environ,
+        VECTOR_BACKEND="qdrant",
+        QDRANT_ENDPOINT=f"http://127.0.0.1:{qdrant_port}",
+        QDRANT_API_KEY="fake",
+        QDRANT_MOVIE_COLLECTION_NAME_BGE=COLLECTIONS["movie"],
+        QDRANT_TV_COLLECTION_NAME_BGE=COLLECTIONS["tv"],
+        BM25_PATH=str(data_dir / "bm25"),
+        OPENAI_BASE_URL=f"http://127.0.0.1:{openai_port}/v1",
+        OPENAI_API_KEY="fake",
+        LOG_LEVEL="WARNING",
+    )
+    if not args.repeat_queries:
+        env.update(RESPONSE_CACHE_ENABLED="false")
+    for item in args.app_env:
+        key, value = item.split("=", 1)
+        env[key] = value
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per concurrency level")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds before the first level")
+    parser.add_argument("--points", type=int, default=20000, help="Synthetic points per collection")
+    parser.add_argument("--dim", type=int, default=768, help="Must match the embedding model")
+    parser.add_argument("--data-dir", default=str(Path(tempfile.gettempdir()) / "rag_load_test"))
+    parser.add_argument("--chat-ratio", type=float, default=0.2, help="Fraction of small-talk queries")
+    parser.add_argument("--repeat-queries", action="store_true", help="Allow cache hits")
+    parser.add_argument("--qdrant-latency-ms", type=float, default=2.0)
+    parser.add_argument("--ttft-ms", type=float, default=300.0)
+    parser.add_argument("--token-rate", type=float, default=60.0)
+    parser.add_argument("--answer-tokens", type=int, default=250)
+    parser.add_argument("--app-env", nargs="*", default=[], metavar="KEY=VALUE")
+    parser.add_argument("--ready-timeout", type=float, default=600.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    data_dir = build_synthetic_dataset(
+        args.data_dir,
+        COLLECTIONS,
+        points=args.points,
+        dim=args.dim,
+        query_terms=analyzed_terms(REC_QUERIES),
+        seed=args.seed,
+    )
+
+    qdrant_port, openai_port, app_port = free_port(), free_port(), free_port()
+    processes = [
+        start_process(
+            "benchmarks.fake_qdrant",
+            ["--index", data_dir / "index", "--port", qdrant_port, "--latency-ms", args.qdrant_latency_ms],
+        ),
+        start_process(
+            "benchmarks.fake_openai",
+            ["--port", openai_port, "--ttft-ms", args.ttft_ms, "--token-rate", args.token_rate,
+             "--answer-tokens", args.answer_tokens],
+        ),
+    ]
+    try:
+        wait_for(f"http://127.0.0.1:{qdrant_port}/", 60, processes[0])
+        wait_for(f"http://127.0.0.1:{openai_port}/stats", 60, processes[1])
+        processes.append(
+            start_process(
+                "uvicorn",
+                ["main:app", "--port", app_port, "--log-level", "warning"],
+                env=app_environment(args, qdrant_port, openai_port, data_dir),
+            )
+        )
+        base_url = f"http://127.0.0.1:{app_port}"
+        wait_for(f"{base_url}/health/ready", args.ready_timeout, processes[-1])
+        if args.warmup:
+            asyncio.run(drive_load(base_url, max(args.concurrency), args.warmup, args))
+
+        print(
+            "| Concurrency | Req/s | Failed | Rejected | TTFT p50 | TTFT p95 | TTFT p99 "
+            "| Total p50 | Total p95 | Total p99 |"
+        )
+        print("|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|")
+        breakdowns = {}
+        for concurrency in args.concurrency:
+            before = stage_histograms(base_url)
+            results = asyncio.run(drive_load(base_url, concurrency, args.duration, args))
+            breakdowns[concurrency] = stage_breakdown(before, stage_histograms(base_url))
+            print(
+                f"| {concurrency} | {results['completed'] / args.duration:.1f} | {results['failed']} | "
+                f"{results['rejected']} | "
+                f"{percentiles_ms(results['ttft'])} | {percentiles_ms(results['total'])} |"
+            )
+
+        for concurrency, rows in breakdowns.items():
+            print(f"\nPer-stage breakdown at concurrency {concurrency} (ms, all intents):")
+            print("| Stage | Count | Mean | p50 | p95 |")
+            print("|---|:---:|:---:|:---:|:---:|")
+            for stage, count, mean, p50, p95 in rows:
+                print(f"| {stage} | {count} | {mean:.2f} | {p50:.2f} | {p95:.2f} |")
+
+        # Whole run, including warmup (SPECULATION_MODE)
+        print("\nSpeculative work per request (ms):")
+        print("| Intent | Requests | Saved | Wasted |")
+        print("|---|:---:|:---:|:---:|")
+        for intent, stats in httpx.get(f"{base_url}/stats/speculation", timeout=10).json().items():
+            print(f"| {intent} | {stats['requests']} | {stats['avg_saved_ms']:.1f} | {stats['avg_wasted_ms']:.1f} |")
+    finally:
+        for process in reversed(processes):
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Microbenchmarks for the CPU-side retrieval steps: embed_sparse, fuse and rerank.
+
+Usage (from backend/):
+    python -m benchmarks.microbench_retrieval [--rounds 2000] [--sizes 300 1000 3000]
+                                              [--bm25-path data/bm25_files]
+
+embed_sparse runs uncached (analyzer + BM25 term lookup + weighting) over the load-test query
+mix. It uses the real BM25 tables when --bm25-path has them, and synthetic tables otherwise.
+fuse and rerank run on synthetic candidate sets of N dense hits plus N/15 sparse hits. The
+app retrieves 300 dense + 20 sparse per query by default. Reports mean, p50 and p99 per call
+in microseconds, so changes to MediaRetriever or app.reranker can be compared in isolation
+from model inference and network round-trips.
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.bm25_index import CompactBM25
+from app.media_retriever import MediaRetriever
+from app.reranker import fuse, rerank
+from benchmarks.bench_rerank import synthetic_candidates
+from benchmarks.load_test import REC_QUERIES, analyzed_terms
+from benchmarks.synthetic_data import _vocabulary, build_bm25_tables
+
+BM25_PATH = Path(__file__).resolve().parent.parent / "data" / "bm25_files"
+
+
+def load_bm25(path: Path) -> dict:
+    if all(CompactBM25.exists(path, media) for media in ("movie", "tv")):
+        return {media: CompactBM25.load(path, media) for media in ("movie", "tv")}
+
+    print(f"⚠️ No compact BM25 tables in {path}, using synthetic tables")
+    directory = Path(tempfile.mkdtemp(prefix="bm25_microbench_"))
+    rng = np.random.default_rng(0)
+    vocab = _vocabulary(analyzed_terms(REC_QUERIES), 30000)
+    for media in ("movie", "tv"):
+        build_bm25_tables(directory, media, vocab, rng)
+    return {media: CompactBM25.load(directory, media) for media in ("movie", "tv")}
+
+
+def time_calls(fn, rounds: int) -> tuple[float, float, float]:
+    fn()  # Warm up lazy resources (stopwords, stemmer caches)
+    samples = np.empty(rounds)
+    for i in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        samples[i] = time.perf_counter() - t0
+    samples *= 1e6
+    return samples.mean(), np.percentile(samples, 50), np.percentile(samples, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[300, 1000, 3000])
+    parser.add_argument("--bm25-path", default=str(BM25_PATH))
+    args = parser.parse_args()
+
+    retriever = MediaRetriever(
+        embed_model=None,
+        qdrant_client=None,
+        bm25_indexes=load_bm25(Path(args.bm25_path)),
+        movie_collection_name="movies",
+        tv_collection_name="tvs",
+    )
+    weights = dict(
+        dense_weight=retriever.dense_weight,
+        sparse_weight=retriever.sparse_weight,
+        rating_weight=retriever.rating_weight,
+        popularity_weight=retriever.popularity_weight,
+        top_k=retriever.top_k,
+    )
+    queries = iter(lambda: random.choice(REC_QUERIES), None)
+
+    print("| Step | Input | Mean (µs) | p50 (µs) | p99 (µs) |")
+    print("|---|---|:---:|:---:|:---:|")
+    for media_type in ("movies", "tvs"):
+        mean, p50, p99 = time_calls(lambda: retriever.embed_sparse(next(queries), media_type), args.rounds)
+        print(f"| embed_sparse | {media_type} query | {mean:.1f} | {p50:.1f} | {p99:.1f} |")
+
+    rng = random.Random(0)
+    for n in args.sizes:
+        dense, sparse = synthetic_candidates(n, rng)
+        fused = fuse(dense.points, sparse.points)
+        label = f"{n} dense + {len(sparse.points)} sparse"
+        for step, fn in (
+            ("fuse", lambda: fuse(dense.points, sparse.points)),
+            ("rerank", lambda: rerank(fused, **weights)),
+        ):
+            mean, p50, p99 = time_calls(fn, max(args.rounds // 10, 50))
+            print(f"| {step} | {label} | {mean:.1f} | {p50:.1f} | {p99:.1f} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Synthetic movie/TV collections and BM25 tables for the load-test stand-ins.
+
+Writes, under `root`:
+    index/<collection>/   local vector snapshots served by benchmarks.fake_qdrant
+    bm25/                 compact BM25 tables in the layout bootstrap loads (BM25_PATH)
+
+Dense vectors are clustered unit vectors (so filtered and unfiltered searches have
+realistic score distributions), sparse vectors draw terms from a vocabulary that includes
+every analyzed term of the load-test query mix, and payloads carry the fields the
+retriever filters and reranks on plus an llm_context of realistic size.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+from app.bm25_index import CompactBM25
+from app.local_vectorstore import write_local_snapshot
+
+GENRES = [
+    "Action", "Adventure", "Animation", "Comedy", "Crime", "Documentary", "Drama", "Family",
+    "Fantasy", "History", "Horror", "Music", "Mystery", "Romance", "Science Fiction",
+    "Thriller", "War", "Western",
+]
+PROVIDERS = [
+    "Netflix", "Hulu", "Disney Plus", "Max", "Amazon Prime Video", "Apple TV Plus",
+    "Peacock", "Paramount Plus", "Criterion Channel", "MUBI", "Shudder", "Tubi",
+]
+WORDS = (
+    "heist thriller noir detective space alien robot love family war western comedy dark "
+    "quirky slow burn twist ending cozy mystery village horror gore ghost haunted road trip "
+    "coming age friendship betrayal revenge epic kingdom dragon magic school music band "
+    "courtroom journalist spy assassin zombie apocalypse survival island ocean mountain city "
+    "small town crime boss gangster anime documentary nature history biography sports team"
+).split()
+
+
+def _vocabulary(extra_terms, size: int):
+    terms = sorted(set(extra_terms) | set(WORDS))
+    terms += [f"term{i}" for i in range(max(0, size - len(terms)))]
+    return terms
+
+
+def _payload(rng: np.random.Generator, i: int, context_chars: int) -> dict:
+    title = " ".join(rng.choice(WORDS, size=rng.integers(1, 4))).title() + f" {i}"
+    genres = rng.choice(GENRES, size=rng.integers(1, 4), replace=False).tolist()
+    providers = rng.choice(PROVIDERS, size=rng.integers(0, 4), replace=False).tolist()
+    year = int(rng.integers(1950, 2026))
+    overview = " ".join(rng.choice(WORDS, size=context_chars // 7))
+    return {
+        "title": title,
+        "genres": genres,
+        "watch_providers": providers,
+        "release_year": year,
+        "popularity": float(np.round(rng.pareto(1.5) * 10, 3)),
+        "vote_average": float(np.round(rng.uniform(3, 9.5), 1)),
+        "llm_context": f"Title: {title}\nYear: {year}\nGenres: {', '.join(genres)}\n"
+        f"Where to watch: {', '.join(providers) or 'N/A'}\nOverview: {overview}\n"
+        f"Poster: https://image.tmdb.org/t/p/w500/{i}.jpg",
+    }
+
+
+def build_collection(
+    path: Path,
+    points: int,
+    dim: int,
+    vocab_size: int,
+    rng: np.random.Generator,
+    context_chars: int = 900,
+    terms_per_doc: int = 40,
+):
+    centroids = rng.standard_normal((64, dim))
+    dense = centroids[rng.integers(0, len(centroids), points)] + 0.6 * rng.standard_normal((points, dim))
+
+    sparse = []
+    for _ in range(points):
+        indices = np.unique(rng.zipf(1.3, terms_per_doc) % vocab_size)
+        sparse.append({"indices": indices.tolist(), "values": rng.uniform(0.5, 8.0, len(indices)).round(3).tolist()})
+
+    write_local_snapshot(
+        path,
+        ids=list(range(1, points + 1)),
+        dense=dense.astype(np.float32),
+        sparse=sparse,
+        payloads=[_payload(rng, i, context_chars) for i in range(1, points + 1)],
+        dense_dtype="float16",
+    )
+
+
+def build_bm25_tables(directory: Path, prefix: str, vocab, rng: np.random.Generator):
+    sorted_terms = sorted(vocab)
+    ids = {t: i for i, t in enumerate(vocab)}
+    CompactBM25(
+        terms=np.array([t.encode("utf-8") for t in sorted_terms], dtype=np.bytes_),
+        term_ids=np.array([ids[t] for t in sorted_terms], dtype=np.int64),
+        idf=rng.uniform(0.5, 9.0, len(vocab)),
+        avgdl=60.0,
+        k1=1.5,
+        b=0.75,
+        corpus_size=len(vocab) * 4,
+    ).save(directory, prefix)
+
+
+def build_synthetic_dataset(
+    root: str | Path,
+    collections: dict,  # BM25 prefix ("movie"/"tv") -> collection name
+    points: int,
+    dim: int = 768,
+    vocab_size: int = 30000,
+    query_terms=(),
+    seed: int = 0,
+) -> Path:
+    root = Path(root)
+    marker = root / "dataset.json"
+    spec = {"collections": collections, "points": points, "dim": dim, "vocab_size": vocab_size, "seed": seed}
+    if marker.exists() and json.loads(marker.read_text()) == spec:
+        return root  # Reuse an identical dataset from a previous run
+
+    rng = np.random.default_rng(seed)
+    vocab = _vocabulary(query_terms, vocab_size)
+    for prefix, collection in collections.items():
+        print(f"⏳ Generating {points} synthetic points for '{collection}'...")
+        build_collection(root / "index" / collection, points, dim, len(vocab), rng)
+        build_bm25_tables(root / "bm25", prefix, vocab, rng)
+    marker.write_text(json.dumps(spec))
+    return root
@@ -0,0 +1,49 @@
+# Multi-worker serving with models loaded once in the master and shared copy-on-write.
+#
+#   gunicorn main:app -c gunicorn.conf.py
+#
+# `uvicorn --workers N` starts each worker from scratch, so every worker loads its own copy
+# of the embedding/intent weights. Here the master imports the app, preloads the shared
+# startup components (app.bootstrap.preload) and forks; each worker then only builds its
+# per-process clients, caches and batcher threads in the FastAPI lifespan.
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("PRELOAD_MODELS", "true").lower() == "true"
+timeout = 120
+graceful_timeout = 30
+
+
+def when_ready(server):
+    # Runs in the master after the app is imported and before any worker is forked
+    if not preload_app:
+        return
+    from app import bootstrap
+
+    if not bootstrap.preload():
+        server.log.warning("Shared startup components failed to preload; workers will retry")
+
+
+def post_fork(server, worker):
+    # Split CPU cores between workers so torch intra-op pools don't oversubscribe
+    threads = int(os.getenv("TORCH_THREADS_PER_WORKER", "0")) or max(1, (os.cpu_count() or 1) // workers)
+    try:
+        import torch
+
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def child_exit(server, worker):
+    # Drop a dead or recycled worker's samples, so livesum gauges (HTTP pools, admission)
+    # stop counting it in the aggregated /metrics
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        return
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,9 +1,21 @@
+from contextlib import asynccontextmanager
+
+from app import bootstrap
 from app.api_routes import router
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Models and indexes load in the background; /health/ready reports progress
+    bootstrap.start()
+    yield
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,5 +30,12 @@ app.include_router(router)
 
 
 @app.get("/health")
+@app.get("/health/live")
 def health_check():
     return {"status": "ok"}
+
+
+@app.get("/health/ready")
+def readiness_check():
+    report = bootstrap.startup.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
@@ -0,0 +1,194 @@
+"""Add, update or remove documents in the BM25 model and publish a new version without a restart.
+
+Usage (from backend/, with the usual .env pointing at Qdrant):
+    python -m scripts.bm25_incremental_update --media movie --input new_titles.jsonl
+                                              [--bm25-dir data/bm25_files] [--keep 5]
+                                              [--refresh-all] [--no-upsert]
+
+--input has one JSON object per line: {"id": <point id>, "text": "..."} to add or replace
+a document, or {"id": <point id>, "delete": true} to remove one. Text goes through the same
+analyzer as queries.
+
+The pipeline:
+1. Load the statistics of the current version. The first run starts from the
+   rank_bm25 joblib model ({media}_bm25_model.joblib + vocab) or, with --from-scratch, from
+   an empty corpus (then --input should hold every document). Documents from the joblib
+   model are only counted, not tracked by id: updating one of them would count it twice,
+   so rebuild once with --from-scratch over the whole catalog to make every document
+   updatable.
+2. Update document frequencies, corpus size and total length per document. idf and avgdl
+   follow, and new terms get new vocab ids.
+3. Write the sparse vectors of the added documents to the collection (update_vectors; the
+   points must already exist). --refresh-all rewrites every tracked document, for when
+   avgdl has drifted far from the value older vectors were written with.
+4. Publish the new tables as versions/<version> and switch CURRENT to it atomically.
+   Running workers pick it up within BM25_RELOAD_INTERVAL_S.
+
+With VECTOR_BACKEND=local the app serves an exported snapshot that step 3 can't write to,
+so the script refuses to run. Run it against Qdrant (VECTOR_BACKEND=qdrant), then re-export
+the snapshot with scripts.export_qdrant_snapshot and restart the app.
+
+Steps 1-4 hold an exclusive lock on <bm25-dir>/.update.lock, so concurrent runs queue up
+instead of publishing from the same starting version.
+"""
+
+import argparse
+import json
+import shutil
+import time
+from pathlib import Path
+
+from app.bm25_builder import IncrementalBM25
+from app.bm25_index import CompactBM25
+from app.bm25_versions import (
+    MEDIA_PREFIXES,
+    current_version,
+    prune_versions,
+    publish_version,
+    update_lock,
+    version_dir,
+)
+from app.config import (
+    BM25_PATH,
+    QDRANT_API_KEY,
+    QDRANT_ENDPOINT,
+    QDRANT_MOVIE_COLLECTION_NAME,
+    QDRANT_TV_COLLECTION_NAME,
+    VECTOR_BACKEND,
+)
+from qdrant_client.http import models
+
+AVGDL_DRIFT_WARNING = 0.05  # Relative avgdl change at which --refresh-all is suggested
+
+
+def load_builder(bm25_dir: Path, media: str, from_scratch: bool) -> IncrementalBM25:
+    version = current_version(bm25_dir)
+    if version is not None and IncrementalBM25.exists(version_dir(bm25_dir, version), media):
+        print(f"📚 Continuing from BM25 version '{version}'")
+        return IncrementalBM25.load(version_dir(bm25_dir, version), media)
+    if from_scratch:
+        return IncrementalBM25()
+
+    import joblib
+
+    print(f"📚 Starting from {media}_bm25_model.joblib")
+    try:
+        return IncrementalBM25.from_bm25okapi(
+            joblib.load(bm25_dir / f"{media}_bm25_model.joblib"),
+            joblib.load(bm25_dir / f"{media}_bm25_vocab.joblib"),
+        )
+    except FileNotFoundError as e:
+        raise SystemExit(f"No BM25 statistics to continue from ({e}); use --from-scratch with every document")
+
+
+def copy_tables(source: Path, target: Path, media: str):
+    # The other media type is unchanged, but every version holds both
+    if not CompactBM25.exists(source, media):
+        import joblib
+
+        CompactBM25.from_bm25okapi(
+            joblib.load(source / f"{media}_bm25_model.joblib"),
+            joblib.load(source / f"{media}_bm25_vocab.joblib"),
+        ).save(target, media)
+        return
+    for path in source.glob(f"{media}_bm25_*"):
+        if path.suffix in (".npy", ".json", ".npz"):
+            shutil.copy2(path, target / path.name)
+
+
+def upsert_sparse_vectors(builder: IncrementalBM25, doc_ids, collection: str, batch_size: int):
+    from app.vectorstore import connect_qdrant
+
+    client = connect_qdrant(QDRANT_ENDPOINT, QDRANT_API_KEY)
+    doc_ids = list(doc_ids)
+    for start in range(0, len(doc_ids), batch_size):
+        client.update_vectors(
+            collection_name=collection,
+            points=[
+                models.PointVectors(
+                    id=doc_id,
+                    vector={"sparse_vector": models.SparseVector(**builder.document_vector(doc_id))},
+                )
+                for doc_id in doc_ids[start : start + batch_size]
+            ],
+            wait=True,
+        )
+        print(f"⬆️ {min(start + batch_size, len(doc_ids))}/{len(doc_ids)} sparse vectors written to '{collection}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--media", choices=MEDIA_PREFIXES, required=True)
+    parser.add_argument("--input", type=Path, required=True)
+    parser.add_argument("--bm25-dir", type=Path, default=BM25_PATH)
+    parser.add_argument("--collection", help="Defaults to the movie/TV collection from .env")
+    parser.add_argument("--version", help="Version name (default: a UTC timestamp)")
+    parser.add_argument("--from-scratch", action="store_true", help="Start from an empty corpus on the first run")
+    parser.add_argument("--refresh-all", action="store_true", help="Rewrite every tracked document's sparse vector")
+    parser.add_argument("--no-upsert", action="store_true", help="Only publish the tables")
+    parser.add_argument("--upsert-batch", type=int, default=256)
+    parser.add_argument("--keep", type=int, default=5, help="Published versions to keep")
+    args = parser.parse_args()
+    if VECTOR_BACKEND == "local":
+        raise SystemExit(
+            "VECTOR_BACKEND=local: new sparse vectors would only reach Qdrant, not the local snapshot. "
+            "Rerun with VECTOR_BACKEND=qdrant, then re-export with scripts.export_qdrant_snapshot and restart."
+        )
+
+    from app import bootstrap
+
+    analyzer = bootstrap.load_query_analyzer()
+    # Held from loading the current statistics to pruning: a concurrent run would otherwise
+    # build on the same version and its publish would drop this run's documents
+    with update_lock(args.bm25_dir):
+        builder = load_builder(args.bm25_dir, args.media, args.from_scratch)
+        avgdl_before, corpus_before = builder.avgdl, builder.corpus_size
+
+        changed, removed = [], 0
+        t0 = time.perf_counter()
+        with args.input.open() as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record.get("delete"):
+                    removed += builder.remove(record["id"])
+                else:
+                    builder.add(record["id"], analyzer.analyze(record["text"]))
+                    changed.append(record["id"])
+        print(
+            f"✅ {len(changed)} documents added/updated, {removed} removed in {time.perf_counter() - t0:.1f}s: "
+            f"corpus {corpus_before} -> {builder.corpus_size}, vocab {len(builder.vocab)}, "
+            f"avgdl {avgdl_before:.2f} -> {builder.avgdl:.2f}"
+        )
+        if avgdl_before and abs(builder.avgdl - avgdl_before) / avgdl_before > AVGDL_DRIFT_WARNING and not args.refresh_all:
+            print("⚠️ avgdl moved by more than 5%; consider --refresh-all to rewrite older sparse vectors")
+
+        if not args.no_upsert:
+            collection = args.collection or (
+                QDRANT_MOVIE_COLLECTION_NAME if args.media == "movie" else QDRANT_TV_COLLECTION_NAME
+            )
+            # Documents first: until CURRENT moves, queries use the old tables, which simply
+            # don't know the new terms yet
+            targets = builder.docs.keys() if args.refresh_all else [d for d in dict.fromkeys(changed) if d in builder.docs]
+            upsert_sparse_vectors(builder, targets, collection, args.upsert_batch)
+
+        previous = current_version(args.bm25_dir)
+        source = version_dir(args.bm25_dir, previous) if previous else args.bm25_dir
+        version = args.version or time.strftime("v%Y%m%dT%H%M%SZ", time.gmtime())
+
+        def write(directory: Path):
+            builder.save(directory, args.media)
+            for other in MEDIA_PREFIXES:
+                if other != args.media:
+                    copy_tables(source, directory, other)
+
+        path = publish_version(args.bm25_dir, version, write)
+        print(f"🚀 Published BM25 version '{version}' ({path}), previous: {previous or 'unversioned'}")
+        deleted = prune_versions(args.bm25_dir, args.keep)
+        if deleted:
+            print(f"🧹 Removed old versions: {', '.join(deleted)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Precompute a short-form llm_context for every point, used when the prompt budget is tight.
+
+Usage (from backend/, with the usual .env pointing at Qdrant):
+    python -m scripts.build_short_contexts [--max-tokens 150] [--dry-run]
+
+Scrolls each collection and shortens llm_context with app.context_builder.shorten_context:
+the longest lines (the overview) are cut first, at whole sentences where possible. The
+result is stored as the llm_context_short payload field. At request time ContextBuilder
+uses that field for items longer than CONTEXT_ITEM_MAX_TOKENS instead of shortening them on
+the fly. With VECTOR_BACKEND=local, re-run scripts.export_qdrant_snapshot afterwards.
+"""
+
+import argparse
+import time
+
+from app.config import (
+    OPENAI_MODEL,
+    QDRANT_API_KEY,
+    QDRANT_ENDPOINT,
+    QDRANT_MOVIE_COLLECTION_NAME,
+    QDRANT_TV_COLLECTION_NAME,
+)
+from app.context_builder import CONTEXT_FIELD, SHORT_CONTEXT_FIELD, TokenCounter, shorten_context
+from app.vectorstore import connect_qdrant
+from qdrant_client.http import models
+
+
+def build_collection(client, collection: str, counter: TokenCounter, max_tokens: int, batch_size: int, dry_run: bool):
+    offset = None
+    points = shortened = full_tokens = short_tokens = 0
+    t0 = time.perf_counter()
+    while True:
+        records, offset = client.scroll(
+            collection_name=collection,
+            limit=batch_size,
+            offset=offset,
+            with_payload=[CONTEXT_FIELD],
+            with_vectors=False,
+        )
+        operations = []
+        for r in records:
+            full = (r.payload or {}).get(CONTEXT_FIELD, "")
+            short = shorten_context(full, max_tokens, counter)
+            points += 1
+            shortened += short != full
+            full_tokens += counter.count(full)
+            short_tokens += counter.count(short)
+            operations.append(
+                models.SetPayloadOperation(
+                    set_payload=models.SetPayload(payload={SHORT_CONTEXT_FIELD: short}, points=[r.id])
+                )
+            )
+        if operations and not dry_run:
+            client.batch_update_points(collection_name=collection, update_operations=operations)
+        print(f"   {collection}: {points} points", end="\r")
+        if offset is None:
+            break
+
+    print(
+        f"✅ {collection}: {points} points, {shortened} shortened, avg tokens "
+        f"{full_tokens / max(points, 1):.0f} -> {short_tokens / max(points, 1):.0f} "
+        f"in {time.perf_counter() - t0:.1f}s" + (" (dry run)" if dry_run else "")
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--collections", nargs="+", default=[QDRANT_MOVIE_COLLECTION_NAME, QDRANT_TV_COLLECTION_NAME])
+    parser.add_argument("--max-tokens", type=int, default=150)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--dry-run", action="store_true", help="Report sizes without writing payloads")
+    args = parser.parse_args()
+
+    counter = TokenCounter(OPENAI_MODEL)
+    if not counter.exact:
+        print("⚠️ tiktoken is not installed; token counts are approximate")
+    client = connect_qdrant(QDRANT_ENDPOINT, QDRANT_API_KEY)
+    for collection in args.collections:
+        build_collection(client, collection, counter, args.max_tokens, args.batch_size, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Parity check: local in-process vector index vs the Qdrant collection it was exported from.
+
+Usage (from backend/, with the usual .env pointing at Qdrant):
+    python -m scripts.check_local_parity --index data/local_index [--probes 50] [--ann exact]
+
+Probe queries are perturbed copies of stored dense/sparse vectors, run with no filter and
+with genre, provider and year-range filters built by MediaRetriever._build_filter. Reports
+top-k overlap, exact-order agreement and max score difference per query type; exits non-zero
+when mean overlap falls below --min-overlap.
+"""
+
+import argparse
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+from app.config import (
+    QDRANT_API_KEY,
+    QDRANT_ENDPOINT,
+    QDRANT_MOVIE_COLLECTION_NAME,
+    QDRANT_TV_COLLECTION_NAME,
+)
+from app.local_vectorstore import LocalVectorStore
+from app.media_retriever import MediaRetriever
+from app.vectorstore import connect_qdrant
+from qdrant_client.http import models
+
+
+def probe_filters(collection, rng: random.Random):
+    payloads = collection.payloads
+    genres = sorted({g for p in payloads for g in p.get("genres", [])})
+    providers = sorted({w for p in payloads for w in p.get("watch_providers", [])})
+    yield "none", None
+    if genres:
+        yield "genres", MediaRetriever._build_filter(rng.sample(genres, min(2, len(genres))))
+    if providers:
+        yield "providers", MediaRetriever._build_filter(providers=[rng.choice(providers)])
+    yield "year_range", MediaRetriever._build_filter(year_range=(1990, 2005))
+    if genres and providers:
+        yield "combined", MediaRetriever._build_filter(
+            [rng.choice(genres)], [rng.choice(providers)], (2000, 2025)
+        )
+
+
+def compare(remote, local, limit: int):
+    remote_ids = [p.id for p in remote.points]
+    local_ids = [p.id for p in local.points]
+    overlap = len(set(remote_ids) & set(local_ids)) / max(len(remote_ids), 1)
+    score_diff = max(
+        (abs(a.score - b.score) for a, b in zip(remote.points, local.points)), default=0.0
+    )
+    return overlap, remote_ids == local_ids, score_diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index", type=Path, required=True)
+    parser.add_argument("--collections", nargs="+", default=[QDRANT_MOVIE_COLLECTION_NAME, QDRANT_TV_COLLECTION_NAME])
+    parser.add_argument("--probes", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--ann", choices=["exact", "hnsw"], default="exact")
+    parser.add_argument("--min-overlap", type=float, default=0.95)
+    args = parser.parse_args()
+
+    remote = connect_qdrant(QDRANT_ENDPOINT, QDRANT_API_KEY)
+    local = LocalVectorStore(args.index, ann=args.ann)
+    rng = random.Random(0)
+    np_rng = np.random.default_rng(0)
+
+    failed = False
+    for name in args.collections:
+        collection = local.collection(name)
+        results = {}
+        for _ in range(args.probes):
+            pos = rng.randrange(len(collection))
+            dense = np.asarray(collection.dense[pos], dtype=np.float32)
+            dense = (dense + 0.05 * np_rng.standard_normal(dense.shape)).tolist()
+            terms = collection.postings.keys()
+            sparse = models.SparseVector(
+                indices=rng.sample(sorted(terms), min(5, len(terms))), values=[1.0] * min(5, len(terms))
+            )
+
+            for filter_name, query_filter in probe_filters(collection, rng):
+                for kind, query, using in [
+                    ("dense", dense, collection.dense_name),
+                    ("sparse", sparse, collection.sparse_name),
+                ]:
+                    kwargs = dict(
+                        collection_name=name,
+                        query=query,
+                        using=using,
+                        query_filter=query_filter,
+                        limit=args.limit,
+                        with_payload=False,
+                    )
+                    results.setdefault((kind, filter_name), []).append(
+                        compare(remote.query_points(**kwargs), local.query_points(**kwargs), args.limit)
+                    )
+
+        print(f"\n{name}")
+        print("| Query | Filter | Mean overlap@k | Same order | Max score diff |")
+        print("|---|---|:---:|:---:|:---:|")
+        for (kind, filter_name), rows in sorted(results.items()):
+            overlaps, same_order, diffs = zip(*rows)
+            mean_overlap = float(np.mean(overlaps))
+            failed |= mean_overlap < args.min_overlap
+            print(
+                f"| {kind} | {filter_name} | {mean_overlap:.3f} | {np.mean(same_order):.0%} | {max(diffs):.2e} |"
+            )
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Convert the rank_bm25 joblib models into compact, memory-mappable query tables.
+
+Usage (from backend/):
+    python -m scripts.export_bm25_tables [--bm25-dir data/bm25_files]
+
+Reads {movie,tv}_bm25_model.joblib + {movie,tv}_bm25_vocab.joblib and writes
+{movie,tv}_bm25_{terms,term_ids,idf}.npy and {movie,tv}_bm25_meta.json next to them,
+which bootstrap loads instead of the full models.
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import joblib
+from app.bm25_index import CompactBM25
+
+DEFAULT_BM25_DIR = Path(__file__).resolve().parent.parent / "data" / "bm25_files"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bm25-dir", type=Path, default=DEFAULT_BM25_DIR)
+    args = parser.parse_args()
+
+    for media in ("movie", "tv"):
+        model_path = args.bm25_dir / f"{media}_bm25_model.joblib"
+        vocab_path = args.bm25_dir / f"{media}_bm25_vocab.joblib"
+
+        t0 = time.perf_counter()
+        model, vocab = joblib.load(model_path), joblib.load(vocab_path)
+        joblib_load_s = time.perf_counter() - t0
+
+        compact = CompactBM25.from_bm25okapi(model, vocab)
+        compact.save(args.bm25_dir, media)
+
+        t0 = time.perf_counter()
+        CompactBM25.load(args.bm25_dir, media)
+        compact_load_s = time.perf_counter() - t0
+
+        joblib_mb = (model_path.stat().st_size + vocab_path.stat().st_size) / 1e6
+        compact_mb = sum(
+            p.stat().st_size for p in args.bm25_dir.glob(f"{media}_bm25_*") if p.suffix in (".npy", ".json")
+        ) / 1e6
+        print(
+            f"✅ {media}: {len(compact)} terms | joblib {joblib_mb:.1f} MB, load {joblib_load_s:.2f}s "
+            f"→ compact {compact_mb:.1f} MB, load {compact_load_s * 1000:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Export the embedding and intent models to int8 ONNX for EMBED_BACKEND/INTENT_BACKEND=onnx.
+
+Usage (from backend/):
+    python -m scripts.export_onnx_models [--models embedding intent] [--arch avx2] [--min-cosine 0.99]
+
+The embedding model is exported with sentence-transformers' ONNX backend and dynamically
+quantized to int8. The export is rejected unless its min cosine similarity to the fp32
+embeddings is at least --min-cosine. The intent classifier is exported and quantized with
+optimum; its label agreement with the PyTorch pipeline is reported. Each output directory
+gets a fidelity.json that the app checks when it loads the model.
+
+Requires: pip install "sentence-transformers[onnx]" "optimum[onnxruntime]"
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from app.config import EMBEDDING_MODEL, INTENT_MODEL, ONNX_MODEL_DIR
+from app.inference_backends import (
+    FIDELITY_SENTENCES,
+    embedding_cosines,
+    label_agreement,
+    load_intent_pipeline,
+    write_fidelity,
+)
+
+INTENT_SAMPLE_QUERIES = [
+    "Can you recommend a feel-good movie?",
+    "Who directed The Godfather?",
+    "Do you like action films?",
+    "Something like Nolan's films but less confusing",
+    "What's the plot of Inception?",
+    "Best TV shows about found family",
+    "Is Breaking Bad worth watching?",
+    "Give me some 90s horror movies",
+]
+
+
+def load_queries(path: Path | None, defaults):
+    if path is None:
+        return list(defaults)
+    return [line.strip() for line in path.read_text().splitlines() if line.strip()]
+
+
+def export_embedding(output: Path, arch: str, min_cosine: float, sentences) -> bool:
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    output.mkdir(parents=True, exist_ok=True)
+    print(f"⏳ Exporting {EMBEDDING_MODEL} to ONNX...")
+    onnx_model = SentenceTransformer(EMBEDDING_MODEL, backend="onnx", device="cpu")
+    onnx_model.save(str(output))
+    export_dynamic_quantized_onnx_model(onnx_model, quantization_config=arch, model_name_or_path=str(output))
+
+    file_name = f"onnx/model_qint8_{arch}.onnx"
+    quantized = SentenceTransformer(str(output), backend="onnx", device="cpu", model_kwargs={"file_name": file_name})
+    reference = SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+    cosines = embedding_cosines(
+        reference.encode(sentences, show_progress_bar=False),
+        quantized.encode(sentences, show_progress_bar=False),
+    )
+    write_fidelity(
+        output,
+        source=EMBEDDING_MODEL,
+        file_name=file_name,
+        arch=arch,
+        sentences=len(sentences),
+        min_cosine=float(cosines.min()),
+        mean_cosine=float(cosines.mean()),
+    )
+    ok = cosines.min() >= min_cosine
+    print(f"{'✅' if ok else '❌'} Embedding: min cosine {cosines.min():.4f}, mean {cosines.mean():.4f} (threshold {min_cosine})")
+    return ok
+
+
+def export_intent(output: Path, arch: str, queries) -> float:
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    output.mkdir(parents=True, exist_ok=True)
+    print(f"⏳ Exporting {INTENT_MODEL} to ONNX...")
+    ORTModelForSequenceClassification.from_pretrained(INTENT_MODEL, export=True).save_pretrained(output)
+    AutoTokenizer.from_pretrained(INTENT_MODEL).save_pretrained(output)
+
+    quantizer = ORTQuantizer.from_pretrained(output)
+    qconfig = getattr(AutoQuantizationConfig, arch)(is_static=False, per_channel=False)
+    quantizer.quantize(save_dir=output, quantization_config=qconfig)
+
+    reference = load_intent_pipeline("torch", INTENT_MODEL, output.parent)
+    quantized = load_intent_pipeline("onnx", INTENT_MODEL, output.parent)
+    agreement = label_agreement(reference(queries), quantized(queries))
+    write_fidelity(output, source=INTENT_MODEL, arch=arch, queries=len(queries), label_agreement=agreement)
+    print(f"✅ Intent: label agreement with PyTorch {agreement:.1%} on {len(queries)} queries")
+    return agreement
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", choices=["embedding", "intent"], default=["embedding", "intent"])
+    parser.add_argument("--output", type=Path, default=ONNX_MODEL_DIR)
+    parser.add_argument("--arch", choices=["arm64", "avx2", "avx512", "avx512_vnni"], default="avx2")
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    parser.add_argument("--queries", type=Path, help="Optional file of sample queries (one per line) for the fidelity checks")
+    args = parser.parse_args()
+
+    ok = True
+    if "embedding" in args.models:
+        sentences = load_queries(args.queries, FIDELITY_SENTENCES)
+        ok &= export_embedding(args.output / "embedding", args.arch, args.min_cosine, sentences)
+    if "intent" in args.models:
+        export_intent(args.output / "intent", args.arch, load_queries(args.queries, INTENT_SAMPLE_QUERIES))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
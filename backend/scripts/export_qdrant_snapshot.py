@@ -0,0 +1,88 @@
+"""Export Qdrant collections into snapshots for the local in-process vector index.
+
+Usage (from backend/, with the usual .env pointing at Qdrant):
+    python -m scripts.export_qdrant_snapshot --output data/local_index [--dense-dtype float16]
+
+Writes one directory per collection (named after it) in the layout loaded by
+app.local_vectorstore.LocalCollection. Set VECTOR_BACKEND=local and
+LOCAL_INDEX_PATH=<output> to serve from it.
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from app.config import (
+    QDRANT_API_KEY,
+    QDRANT_ENDPOINT,
+    QDRANT_MOVIE_COLLECTION_NAME,
+    QDRANT_TV_COLLECTION_NAME,
+)
+from app.local_vectorstore import write_local_snapshot
+from app.vectorstore import connect_qdrant
+
+
+def export_collection(client, collection: str, output: Path, dense_name: str, sparse_name: str, dense_dtype: str, batch_size: int):
+    ids, dense, sparse, payloads = [], [], [], []
+    offset = None
+    t0 = time.perf_counter()
+    while True:
+        records, offset = client.scroll(
+            collection_name=collection,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=[dense_name, sparse_name],
+        )
+        for r in records:
+            sparse_vector = r.vector.get(sparse_name)
+            ids.append(r.id)
+            dense.append(r.vector[dense_name])
+            sparse.append(
+                {"indices": list(sparse_vector.indices), "values": list(sparse_vector.values)}
+                if sparse_vector is not None
+                else {"indices": [], "values": []}
+            )
+            payloads.append(r.payload or {})
+        print(f"   {collection}: {len(ids)} points", end="\r")
+        if offset is None:
+            break
+
+    write_local_snapshot(
+        output / collection,
+        ids,
+        dense,
+        sparse,
+        payloads,
+        dense_vector_name=dense_name,
+        sparse_vector_name=sparse_name,
+        dense_dtype=dense_dtype,
+    )
+    print(f"✅ {collection}: {len(ids)} points exported in {time.perf_counter() - t0:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", type=Path, required=True)
+    parser.add_argument("--collections", nargs="+", default=[QDRANT_MOVIE_COLLECTION_NAME, QDRANT_TV_COLLECTION_NAME])
+    parser.add_argument("--dense-vector-name", default="dense_vector")
+    parser.add_argument("--sparse-vector-name", default="sparse_vector")
+    parser.add_argument("--dense-dtype", choices=["float32", "float16"], default="float32")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    client = connect_qdrant(QDRANT_ENDPOINT, QDRANT_API_KEY)
+    for collection in args.collections:
+        export_collection(
+            client,
+            collection,
+            args.output,
+            args.dense_vector_name,
+            args.sparse_vector_name,
+            args.dense_dtype,
+            args.batch_size,
+        )
+
+
+if __name__ == "__main__":
+    main()
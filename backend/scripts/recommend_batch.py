@@ -0,0 +1,62 @@
+"""Precompute recommendations for many prompts offline (landing pages, newsletters).
+
+Usage (from backend/, with the usual .env pointing at Qdrant):
+    python -m scripts.recommend_batch --input prompts.jsonl --output recommendations.jsonl
+                                      [--batch-size 64] [--include-context]
+
+--input has one JSON object per line with the /recommend/batch query fields: `question`
+and optional `media_type`, `genres`, `providers` and `year_range`. Runs the same retrieval
+as the app, in process and without the LLM, via MediaRetriever.recommend_batch: bulk
+embedding and BM25, then batched Qdrant queries. Writes one line per prompt with its ranked
+recommendations, in input order.
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from app import bootstrap
+from app.config import FACET_INDEX_ENABLED
+from app.llm_services import load_sentence_model
+from app.media_retriever import to_recommendations
+from app.schemas import RecommendQuery
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", type=Path, required=True)
+    parser.add_argument("--output", type=Path, required=True)
+    parser.add_argument("--batch-size", type=int, default=64, help="Queries per embedding call and Qdrant request")
+    parser.add_argument("--chunk", type=int, default=1000, help="Prompts processed (and written) per step")
+    parser.add_argument("--include-context", action="store_true", help="Also write llm_context")
+    args = parser.parse_args()
+
+    with args.input.open() as f:
+        queries = [RecommendQuery(**json.loads(line)).model_dump(mode="json") for line in f if line.strip()]
+    print(f"📄 {len(queries)} prompts from {args.input}")
+
+    vector_store = bootstrap.connect_vector_store()
+    retriever = bootstrap.setup_retriever(
+        load_sentence_model(),
+        vector_store,
+        bootstrap.load_bm25_indexes(),
+        bootstrap.load_query_analyzer(),
+        bootstrap.load_facet_indexes(vector_store[0]) if FACET_INDEX_ENABLED else None,
+    )
+
+    t0 = time.perf_counter()
+    with args.output.open("w") as out:
+        for start in range(0, len(queries), args.chunk):
+            chunk = queries[start : start + args.chunk]
+            results = retriever.recommend_batch(chunk, batch_size=args.batch_size, with_context=args.include_context)
+            for query, points in zip(chunk, results):
+                record = {**query, "recommendations": to_recommendations(points, args.include_context)}
+                out.write(json.dumps(record) + "\n")
+            done = start + len(chunk)
+            print(f"⏳ {done}/{len(queries)} prompts ({done / (time.perf_counter() - t0):.1f}/s)")
+    print(f"✅ Wrote {args.output} in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Train the embedding-based intent head and compare it with the DistilBERT classifier.
+
+Usage (from backend/):
+    python -m scripts.train_intent_head --data intents.jsonl [--compare]
+
+`--data` is a JSONL or CSV file with `text` and `label` columns, using the same labels
+as the DistilBERT intent model (recommendation, factual, generic).
+"""
+
+import argparse
+import csv
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+from app.config import EMBEDDING_MODEL, INTENT_HEAD_PATH, INTENT_MODEL
+from app.intent_head import EmbeddingIntentClassifier
+from sentence_transformers import SentenceTransformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+
+
+def load_examples(path: Path) -> tuple[list[str], list[str]]:
+    if path.suffix == ".csv":
+        with path.open(newline="") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with path.open() as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    return [r["text"] for r in rows], [r["label"] for r in rows]
+
+
+def timed_per_query(fn, texts: list[str]) -> tuple[list, float]:
+    outputs = []
+    t0 = time.perf_counter()
+    for text in texts:
+        outputs.append(fn(text))
+    return outputs, 1000 * (time.perf_counter() - t0) / len(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", type=Path, required=True)
+    parser.add_argument("--output", type=Path, default=INTENT_HEAD_PATH)
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--C", type=float, default=1.0, help="Inverse regularization strength")
+    parser.add_argument("--compare", action="store_true", help="Benchmark against the DistilBERT classifier")
+    args = parser.parse_args()
+
+    texts, labels = load_examples(args.data)
+    train_x, test_x, train_y, test_y = train_test_split(
+        texts, labels, test_size=args.test_size, stratify=labels, random_state=42
+    )
+    print(f"📚 {len(train_x)} training / {len(test_x)} held-out examples")
+
+    embed_model = SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+    train_emb = embed_model.encode(train_x, batch_size=64, show_progress_bar=True)
+
+    clf = LogisticRegression(C=args.C, max_iter=2000)
+    clf.fit(train_emb, train_y)
+    head = EmbeddingIntentClassifier(clf.coef_, clf.intercept_, clf.classes_.tolist())
+    head.save(args.output)
+    print(f"💾 Intent head saved to {args.output}")
+
+    # Embedding-head latency includes the encode call, since chat() pays it for retrieval anyway
+    head_preds, embed_ms = timed_per_query(
+        lambda t: head.predict(embed_model.encode(t)), test_x
+    )
+    _, head_only_ms = timed_per_query(
+        head.predict, list(embed_model.encode(test_x, batch_size=64))
+    )
+    head_acc = np.mean([p == y for p, y in zip(head_preds, test_y)])
+
+    print("\n| Classifier | Accuracy | Latency / query |")
+    print("|---|:---:|:---:|")
+    print(f"| Embedding head (encode + head) | {head_acc:.3f} | {embed_ms:.2f} ms |")
+    print(f"| Embedding head (head only, embedding reused) | {head_acc:.3f} | {head_only_ms:.3f} ms |")
+
+    if args.compare:
+        from transformers import pipeline
+
+        distilbert = pipeline("text-classification", model=INTENT_MODEL, device="cpu")
+        distilbert(test_x[:4])  # warmup
+        bert_preds, bert_ms = timed_per_query(lambda t: distilbert(t)[0]["label"], test_x)
+        bert_acc = np.mean([p == y for p, y in zip(bert_preds, test_y)])
+        print(f"| DistilBERT pipeline | {bert_acc:.3f} | {bert_ms:.2f} ms |")
+
+
+if __name__ == "__main__":
+    main()
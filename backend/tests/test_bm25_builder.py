@@ -0,0 +1,109 @@
+import random
+
+import numpy as np
+import pytest
+from rank_bm25 import BM25Okapi
+
+from app.bm25_builder import IncrementalBM25
+
+WORDS = "heist noir space alien robot love family war western comedy ghost spy zombie island".split()
+COMMON = ["film", "stori"]  # In most documents, so BM25Okapi floors their negative idf
+
+
+def corpus(n: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    return {
+        doc_id: COMMON[: rng.randint(1, 2)] + rng.choices(WORDS, k=rng.randint(1, 12))
+        for doc_id in range(100, 100 + n)
+    }
+
+
+def assert_matches_okapi(builder: IncrementalBM25, docs: dict):
+    model = BM25Okapi(list(docs.values()))
+    idf = builder.idf()
+    assert builder.corpus_size == model.corpus_size
+    assert builder.avgdl == pytest.approx(model.avgdl, rel=1e-12)
+    for term, expected in model.idf.items():
+        assert idf[builder.vocab[term]] == pytest.approx(expected, rel=1e-12, abs=1e-12)
+    for term, idx in builder.vocab.items():
+        if term not in model.idf:
+            assert idf[idx] == 0.0  # Known term that no current document contains
+
+
+def test_matches_bm25okapi_fitted_on_the_same_documents():
+    docs = corpus(60)
+    builder = IncrementalBM25()
+    for doc_id, terms in docs.items():
+        builder.add(doc_id, terms)
+    film_df = sum("film" in terms for terms in docs.values())
+    assert np.log(len(docs) - film_df + 0.5) < np.log(film_df + 0.5)  # The floor is exercised
+    assert_matches_okapi(builder, docs)
+
+
+def test_updates_and_removals_match_a_refit():
+    docs = corpus(60)
+    builder = IncrementalBM25()
+    for doc_id, terms in docs.items():
+        builder.add(doc_id, terms)
+
+    rng = random.Random(1)
+    for doc_id in rng.sample(sorted(docs), 15):
+        assert builder.remove(doc_id)
+        del docs[doc_id]
+    for doc_id in rng.sample(sorted(docs), 10):
+        docs[doc_id] = ["remake"] + rng.choices(WORDS, k=5)
+        builder.add(doc_id, docs[doc_id])
+    assert not builder.remove(-1)
+    assert_matches_okapi(builder, docs)
+
+
+def test_continues_from_a_fitted_model():
+    docs = corpus(40)
+    builder = IncrementalBM25.from_bm25okapi(
+        BM25Okapi(list(docs.values())), {t: i for i, t in enumerate(sorted({t for d in docs.values() for t in d}))}
+    )
+    new = corpus(10, seed=5)
+    new = {doc_id + 1000: terms + ["sequel"] for doc_id, terms in new.items()}
+    for doc_id, terms in new.items():
+        builder.add(doc_id, terms)
+    assert_matches_okapi(builder, {**docs, **new})
+
+
+def test_document_vector_dot_query_idf_is_the_bm25_score():
+    docs = corpus(50)
+    builder = IncrementalBM25()
+    for doc_id, terms in docs.items():
+        builder.add(doc_id, terms)
+    model = BM25Okapi(list(docs.values()))
+    idf = builder.idf()
+
+    query = ["heist", "spy", "film", "unknown"]
+    query_vector = {builder.vocab[t]: idf[builder.vocab[t]] for t in query if t in builder.vocab}
+    scores = model.get_scores(query)
+    for position, doc_id in enumerate(docs):
+        vector = builder.document_vector(doc_id)
+        score = sum(query_vector.get(i, 0.0) * v for i, v in zip(vector["indices"], vector["values"]))
+        assert score == pytest.approx(scores[position], rel=1e-9)
+
+
+def test_save_load_round_trip(tmp_path):
+    docs = corpus(30)
+    builder = IncrementalBM25()
+    for doc_id, terms in docs.items():
+        builder.add(doc_id, terms)
+    builder.add("tt0113277", ["heist", "noir", "heist"])  # String point ids survive too
+    builder.save(tmp_path, "movie")
+
+    loaded = IncrementalBM25.load(tmp_path, "movie")
+    assert IncrementalBM25.exists(tmp_path, "movie")
+    assert loaded.vocab == builder.vocab
+    assert loaded.df == builder.df
+    assert loaded.docs == builder.docs
+    assert (loaded.corpus_size, loaded.total_length) == (builder.corpus_size, builder.total_length)
+    assert (loaded.k1, loaded.b, loaded.epsilon) == (builder.k1, builder.b, builder.epsilon)
+    np.testing.assert_array_equal(loaded.idf(), builder.idf())
+
+    # Updates continue where the saved statistics left off
+    loaded.remove("tt0113277")
+    builder.remove("tt0113277")
+    np.testing.assert_array_equal(loaded.idf(), builder.idf())
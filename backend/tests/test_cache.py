@@ -0,0 +1,47 @@
+import time
+
+from app.cache import SqliteCacheBackend, TTLCache
+
+
+def test_disk_layer_stays_within_max_rows(tmp_path):
+    backend = SqliteCacheBackend(tmp_path / "cache.sqlite", max_rows=100)
+    now = time.time()
+    for i in range(1000):
+        backend.set("embedding", f"q{i}", [float(i)], now + 60 + i)
+        assert backend.stats()["rows"] <= 105  # At most max_rows // 20 writes between sweeps
+
+    # The rows closest to expiring went first
+    assert backend.get("embedding", "q0") is None
+    assert backend.get("embedding", "q999")[0] == [999.0]
+    assert backend.stats()["evictions"] >= 895
+
+
+def test_expired_rows_are_swept_without_being_read(tmp_path):
+    backend = SqliteCacheBackend(tmp_path / "cache.sqlite", max_rows=1000, sweep_interval_s=0)
+    now = time.time()
+    for i in range(10):
+        backend.set("retrieval", f"old{i}", i, now - 1)
+    backend.set("retrieval", "fresh", "value", now + 60)
+    assert backend.stats()["rows"] == 1
+    assert backend.stats()["expired"] == 10
+
+
+def test_leftover_expired_rows_are_swept_on_open(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    backend = SqliteCacheBackend(path, sweep_interval_s=3600)
+    backend.set("sparse", "old", 1, time.time() - 1)
+    assert SqliteCacheBackend(path).stats()["rows"] == 0
+
+
+def test_disk_hit_is_promoted_with_its_disk_expiry(tmp_path):
+    backend = SqliteCacheBackend(tmp_path / "cache.sqlite")
+    TTLCache("embedding", ttl_seconds=60, disk_backend=backend).set("heat", [1.0])
+    expires_at = backend.get("embedding", repr("heat"))[1]
+
+    cache = TTLCache("embedding", ttl_seconds=3600, disk_backend=backend)  # e.g. after a restart
+    assert cache.get("heat") == [1.0]
+    assert cache._entries["heat"][0] == expires_at
+    assert cache.get("heat") == [1.0]
+    stats = cache.stats()
+    assert (stats["hits"], stats["disk_hits"], stats["misses"]) == (1, 1, 0)
+    assert cache.get("other") is None and cache.stats()["misses"] == 1
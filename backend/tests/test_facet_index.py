@@ -0,0 +1,87 @@
+import pytest
+from qdrant_client.http import models
+
+from app.facet_index import FacetIndex, FacetRefresher, apply_plan
+
+PAYLOADS = [
+    {"genres": ["Drama"], "watch_providers": ["Netflix"], "release_year": 1995},
+    {"genres": ["Drama", "Crime"], "watch_providers": ["Hulu"], "release_year": 2005},
+    {"genres": ["Comedy"], "watch_providers": ["Netflix"], "release_year": 2015},
+    {"genres": ["Crime"], "watch_providers": [], "release_year": None},
+]
+IDS = [10, 11, 12, 13]
+
+
+def matches(payload, genres=None, providers=None, year_range=None):
+    # Plain-Python version of MediaRetriever._build_filter's semantics
+    if genres and not set(genres) & set(payload.get("genres") or []):
+        return False
+    if providers and not set(providers) & set(payload.get("watch_providers") or []):
+        return False
+    if year_range:
+        year = payload.get("release_year")
+        if year is None or not year_range[0] <= year <= year_range[1]:
+            return False
+    return True
+
+
+@pytest.fixture
+def index():
+    return FacetIndex.from_payloads(IDS, PAYLOADS)
+
+
+@pytest.mark.parametrize(
+    "genres, providers, year_range",
+    [
+        (["Drama"], None, None),
+        (["Drama", "Comedy"], ["Netflix"], None),
+        (None, None, (2000, 2020)),
+        (["Crime"], ["Hulu"], (2000, 2010)),
+        (["Western"], None, None),
+    ],
+)
+def test_mask_matches_payload_filter(index, genres, providers, year_range):
+    mask = index.mask(genres, providers, year_range)
+    assert mask.tolist() == [matches(p, genres, providers, year_range) for p in PAYLOADS]
+
+
+def test_unfiltered_without_facets(index):
+    assert index.plan().strategy == "unfiltered"
+
+
+def test_selective_filter_is_prefiltered_on_top_of_the_payload_filter(index):
+    plan = index.plan(genres=["Comedy"], exact_threshold=0.5)
+    assert plan.strategy == "exact_prefiltered" and plan.ids == [12]
+
+    payload_filter = models.Filter(must=[models.FieldCondition(key="genres", match=models.MatchAny(any=["Comedy"]))])
+    qdrant_filter, params = apply_plan(plan, payload_filter)
+    assert isinstance(qdrant_filter.must[0], models.HasIdCondition)
+    assert qdrant_filter.must[1:] == payload_filter.must
+    assert params.exact
+
+
+def test_empty_plan_still_sends_the_payload_filter(index):
+    # Points added after the bitmaps were built may match: Qdrant has the final say
+    plan = index.plan(genres=["Western"])
+    assert plan.strategy == "empty"
+
+    payload_filter = models.Filter(must=[models.FieldCondition(key="genres", match=models.MatchAny(any=["Western"]))])
+    assert apply_plan(plan, payload_filter) == (payload_filter, None)
+
+
+def test_refresher_keeps_current_indexes_when_a_rebuild_fails(index):
+    loaded = []
+    results = iter([RuntimeError("scroll failed"), {"movies": index}])
+
+    def load():
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    refresher = FacetRefresher(load, loaded.append, interval_s=60)
+    assert not refresher.refresh()
+    assert loaded == [] and refresher.stats()["last_error"] == "scroll failed"
+    assert refresher.refresh()
+    assert loaded == [{"movies": index}]
+    assert refresher.stats()["failures"] == 1 and refresher.stats()["last_error"] is None
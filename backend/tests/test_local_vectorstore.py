@@ -0,0 +1,173 @@
+import numpy as np
+import pytest
+from qdrant_client.http import models
+
+from app.local_vectorstore import LocalCollection, LocalVectorStore, write_local_snapshot
+from app.media_retriever import MediaRetriever
+from benchmarks.synthetic_data import build_collection
+
+COLLECTION = "movies"
+POINTS = 400
+DIM = 32
+VOCAB_SIZE = 300
+
+FILTERS = [
+    (["Drama"], None, None),
+    (["Comedy", "Horror"], None, None),
+    (None, ["Netflix", "MUBI"], None),
+    (None, None, (1990, 2005)),
+    (["Crime", "Thriller"], ["Hulu"], (1970, 2020)),
+    (["Western"], ["Criterion Channel"], (2024, 2025)),  # Few or no matches
+]
+
+
+@pytest.fixture(scope="module")
+def root(tmp_path_factory):
+    root = tmp_path_factory.mktemp("local_index")
+    build_collection(root / COLLECTION, POINTS, DIM, VOCAB_SIZE, np.random.default_rng(0))
+    return root
+
+
+@pytest.fixture(scope="module")
+def store(root):
+    return LocalVectorStore(root)
+
+
+@pytest.fixture(scope="module")
+def collection(store) -> LocalCollection:
+    return store.collection(COLLECTION)
+
+
+def matches(payload, genres=None, providers=None, year_range=None):
+    # Plain-Python version of the filter MediaRetriever._build_filter sends to Qdrant
+    if genres and not set(genres) & set(payload.get("genres") or []):
+        return False
+    if providers and not set(providers) & set(payload.get("watch_providers") or []):
+        return False
+    if year_range:
+        year = payload.get("release_year")
+        if year is None or not year_range[0] <= year <= year_range[1]:
+            return False
+    return True
+
+
+def brute_force_dense(collection, vector, mask=None):
+    query = np.asarray(vector, dtype=np.float32)
+    query /= np.linalg.norm(query)
+    scores = np.asarray(collection.dense, dtype=np.float32) @ query
+    candidates = np.arange(len(collection)) if mask is None else np.flatnonzero(mask)
+    order = np.argsort(-scores[candidates], kind="stable")
+    return candidates[order], scores[candidates][order]
+
+
+def brute_force_sparse(path, vector: models.SparseVector, mask=None):
+    indptr = np.load(path / "sparse_indptr.npy")
+    indices = np.load(path / "sparse_indices.npy")
+    values = np.load(path / "sparse_values.npy")
+    weights = dict(zip(vector.indices, vector.values))
+    scored = []
+    for position in range(len(indptr) - 1):
+        terms = indices[indptr[position] : indptr[position + 1]]
+        if mask is not None and not mask[position]:
+            continue
+        if not any(int(t) in weights for t in terms):
+            continue  # Qdrant only returns points sharing a term with the query
+        doc = values[indptr[position] : indptr[position + 1]]
+        scored.append((position, sum(weights.get(int(t), 0.0) * float(v) for t, v in zip(terms, doc))))
+    scored.sort(key=lambda item: -item[1])
+    return np.array([p for p, _ in scored], dtype=np.int64), np.array([s for _, s in scored], dtype=np.float32)
+
+
+@pytest.mark.parametrize("genres, providers, year_range", FILTERS)
+def test_filter_mask_matches_payload_predicate(collection, genres, providers, year_range):
+    mask = collection.filter_mask(MediaRetriever._build_filter(genres, providers, year_range))
+    expected = [matches(p, genres, providers, year_range) for p in collection.payloads]
+    assert mask.tolist() == expected
+    assert sum(expected) < POINTS
+
+
+def test_has_id_narrows_the_payload_filter(collection):
+    payload_filter = MediaRetriever._build_filter(["Drama"], None, None)
+    ids = collection.ids[:50]
+    mask = collection.filter_mask(
+        models.Filter(must=[models.HasIdCondition(has_id=ids)] + list(payload_filter.must))
+    )
+    expected = [
+        collection.ids[i] in ids and matches(p, ["Drama"]) for i, p in enumerate(collection.payloads)
+    ]
+    assert mask.tolist() == expected
+
+
+@pytest.mark.parametrize("filter_index", [None, 0, 4, 5])
+@pytest.mark.parametrize("exact", [False, True])
+def test_search_dense_matches_brute_force(collection, filter_index, exact):
+    rng = np.random.default_rng(1)
+    mask = None
+    if filter_index is not None:
+        mask = collection.filter_mask(MediaRetriever._build_filter(*FILTERS[filter_index]))
+    for _ in range(5):
+        vector = rng.standard_normal(DIM)
+        positions, scores = collection.search_dense(vector, 20, mask, exact=exact)
+        expected_positions, expected_scores = brute_force_dense(collection, vector, mask)
+        assert positions.tolist() == expected_positions[:20].tolist()
+        np.testing.assert_allclose(scores, expected_scores[:20], rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize("filter_index", [None, 1, 4])
+def test_search_sparse_matches_brute_force(root, collection, filter_index):
+    rng = np.random.default_rng(2)
+    mask = None
+    if filter_index is not None:
+        mask = collection.filter_mask(MediaRetriever._build_filter(*FILTERS[filter_index]))
+    for _ in range(5):
+        terms = np.unique(rng.integers(0, VOCAB_SIZE, 6))
+        vector = models.SparseVector(indices=terms.tolist(), values=rng.uniform(0.1, 3.0, len(terms)).tolist())
+        positions, scores = collection.search_sparse(vector, 20, mask)
+        expected_positions, expected_scores = brute_force_sparse(root / COLLECTION, vector, mask)
+        np.testing.assert_allclose(scores, expected_scores[:20], rtol=1e-5)
+        # Positions may only differ where scores tie
+        assert set(positions.tolist()) <= set(expected_positions.tolist())
+        assert len(positions) == min(20, len(expected_positions))
+
+
+def test_query_batch_points_returns_one_response_per_request(store, collection):
+    rng = np.random.default_rng(3)
+    sparse = models.SparseVector(indices=[0, 1, 2, 3], values=[1.0, 1.0, 1.0, 1.0])
+    requests = [
+        models.QueryRequest(query=rng.standard_normal(DIM).tolist(), using="dense_vector", limit=7, with_payload=True),
+        models.QueryRequest(
+            query=sparse,
+            using="sparse_vector",
+            limit=5,
+            filter=MediaRetriever._build_filter(["Drama"], None, None),
+            with_payload=["title", "genres"],
+        ),
+        models.QueryRequest(query=rng.standard_normal(DIM).tolist(), using="dense_vector", limit=3),
+    ]
+    responses = store.query_batch_points(COLLECTION, requests)
+
+    assert [type(r) for r in responses] == [models.QueryResponse] * 3
+    assert len(responses[0].points) == 7
+    assert set(responses[0].points[0].payload) == set(collection.payloads[0])
+    assert len(responses[1].points) <= 5
+    for point in responses[1].points:
+        assert set(point.payload) <= {"title", "genres"}
+        assert "Drama" in point.payload["genres"]
+    assert len(responses[2].points) == 3 and all(p.payload is None for p in responses[2].points)
+    for response in responses:
+        scores = [p.score for p in response.points]
+        assert scores == sorted(scores, reverse=True)
+
+
+def test_retrieve_keeps_order_and_skips_unknown_ids(store, collection):
+    ids = [collection.ids[5], -1, collection.ids[2]]
+    records = store.retrieve(COLLECTION, ids, with_payload=["title"])
+    assert [r.id for r in records] == [collection.ids[5], collection.ids[2]]
+    assert records[0].payload == {"title": collection.payloads[5]["title"]}
+    assert store.retrieve(COLLECTION, ids[:1], with_payload=False)[0].payload is None
+
+
+def test_empty_snapshot_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="no points"):
+        write_local_snapshot(tmp_path / "empty", [], np.zeros((0, 0)), [], [])
+    assert not (tmp_path / "empty").exists()
@@ -0,0 +1,71 @@
+import random
+import string
+from pathlib import Path
+
+import nltk
+import pytest
+
+from benchmarks.bench_query_analyzer import SAMPLE_QUERIES
+
+nltk.data.path.append(str(Path(__file__).resolve().parent.parent / "data" / "nltk_data"))
+
+from app.query_analyzer import QueryAnalyzer, nltk_tokenize_and_preprocess  # noqa: E402
+
+# Inputs where word_tokenize's output depends on context: clitics, quotes, sentence-final
+# and inner periods, runs of `,`/`:`, digits after separators, and non-ASCII punctuation
+ADVERSARIAL_QUERIES = [
+    "I can't decide. Won't you help?",
+    "don't, won't, shouldn't've, y'all'd",
+    "Gimme something I cannot stop watching, gonna binge it",
+    "lemme see... gotta be good",
+    "'Single quotes' and \"double quotes\" and ``backticks''",
+    "Mr. Smith Goes to Washington.",
+    "U.S. films vs. U.K. films, e.g. Ealing comedies.",
+    "The end.   ",
+    "Wait..",
+    "ratio 16:9, time 2:30, 1,000,000 views,, more::less",
+    "a,b:c , d : e",
+    "Amélie-style whimsy—like “Amélie” or ‘Big Fish’…",
+    "naïve café résumé ¿qué? ¡sí!",
+    "C++ & C# devs; <html> [brackets] {braces} (parens)",
+    "email me@example.com or #hashtag $5 100% *stars*",
+    "--double--dash -- spaced - single-hyphen",
+    "",
+    "   ",
+    "?!.",
+    "THE AND OF A",
+]
+
+
+def fuzz_queries(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters * 3 + string.digits + " " * 12 + string.punctuation
+    queries = []
+    for _ in range(n):
+        q = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 60)))
+        if rng.random() < 0.3:
+            q += rng.choice([".", ". ", "?", "!."])
+        queries.append(q)
+    return queries
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return QueryAnalyzer()
+
+
+@pytest.mark.parametrize("query", SAMPLE_QUERIES + ADVERSARIAL_QUERIES)
+def test_matches_nltk_pipeline(analyzer, query):
+    assert analyzer.analyze(query) == nltk_tokenize_and_preprocess(query)
+
+
+def test_matches_nltk_pipeline_on_random_punctuation(analyzer):
+    mismatches = [q for q in fuzz_queries(5000) if analyzer.analyze(q) != nltk_tokenize_and_preprocess(q)]
+    assert mismatches == []
+
+
+def test_plain_queries_take_the_fast_path():
+    analyzer = QueryAnalyzer()
+    analyzer.analyze("Dark comedies with moral ambiguity and character-driven narrative")
+    analyzer.analyze("I can't decide.")
+    assert (analyzer.fast_path_hits, analyzer.fallbacks) == (1, 1)
@@ -0,0 +1,128 @@
+import random
+from pathlib import Path
+from types import SimpleNamespace
+
+import nltk
+import numpy as np
+import pytest
+
+nltk.data.path.append(str(Path(__file__).resolve().parent.parent / "data" / "nltk_data"))
+
+from app.media_retriever import MediaRetriever  # noqa: E402
+from app.reranker import fuse_and_rerank  # noqa: E402
+from benchmarks.bench_rerank import synthetic_candidates  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def retriever():
+    return MediaRetriever(
+        embed_model=None,
+        qdrant_client=None,
+        bm25_indexes={},
+        movie_collection_name="movies",
+        tv_collection_name="tvs",
+    )
+
+
+def point(id_, score, **payload):
+    return SimpleNamespace(id=id_, score=score, payload=payload)
+
+
+def scalar(retriever, dense, sparse):
+    # Reference: the original dict-based fusion and sorted() rerank, with each point's score
+    fused = retriever.fuse_dense_sparse(SimpleNamespace(points=dense), SimpleNamespace(points=sparse))
+    ranked = retriever.rerank_fused_results(fused)[: retriever.top_k]
+    max_popularity = max(float(f["point"].payload.get("popularity", 0)) for f in fused.values())
+    scores = [
+        retriever.dense_weight * fused[p.id]["dense_score"]
+        + retriever.sparse_weight * fused[p.id]["sparse_score"]
+        + retriever.rating_weight * (float(p.payload.get("vote_average", 0)) / 10.0)
+        + retriever.popularity_weight * (float(p.payload.get("popularity", 0)) / max_popularity)
+        for p in ranked
+    ]
+    return [p.id for p in ranked], scores
+
+
+def vectorized(retriever, dense, sparse, top_k=None):
+    result = fuse_and_rerank(
+        dense,
+        sparse,
+        dense_weight=retriever.dense_weight,
+        sparse_weight=retriever.sparse_weight,
+        rating_weight=retriever.rating_weight,
+        popularity_weight=retriever.popularity_weight,
+        top_k=top_k or retriever.top_k,
+    )
+    return [p.id for p in result.points], result.scores.tolist()
+
+
+def assert_same_ranking(retriever, dense, sparse):
+    expected_ids, expected_scores = scalar(retriever, dense, sparse)
+    ids, scores = vectorized(retriever, dense, sparse)
+    assert ids == expected_ids
+    assert scores == expected_scores  # Same operation order, so bit-identical
+
+
+@pytest.mark.parametrize("ties", [False, True])
+@pytest.mark.parametrize("n", [30, 300, 1000])
+def test_matches_scalar_rerank_on_synthetic_candidates(retriever, n, ties):
+    rng = random.Random(n)
+    for _ in range(20):
+        dense, sparse = synthetic_candidates(n, rng, ties=ties)
+        assert_same_ranking(retriever, dense.points, sparse.points)
+
+
+def test_ties_keep_fused_order(retriever):
+    # Equal payloads: score ties are broken by fused position (dense hits, then sparse-only)
+    dense = [point(i, 0.5, popularity=10, vote_average=7) for i in range(5)]
+    sparse = [point(i, 2.0, popularity=10, vote_average=7) for i in (3, 7, 8)]
+    assert_same_ranking(retriever, dense, sparse)
+    assert vectorized(retriever, dense, sparse, top_k=8)[0] == [3, 0, 1, 2, 4, 7, 8]
+
+
+def test_missing_popularity_and_vote_average(retriever):
+    dense = [
+        point(1, 0.9, popularity=50.0),
+        point(2, 0.8, vote_average=8.5),
+        point(3, 0.7),
+        point(4, 0.6, popularity=5.0, vote_average=6.0),
+    ]
+    sparse = [point(3, 4.0), point(5, 2.0, vote_average=9.0)]
+    assert_same_ranking(retriever, dense, sparse)
+
+
+def test_no_popularity_anywhere_does_not_divide_by_zero(retriever):
+    dense = [point(1, 0.4, vote_average=9.0), point(2, 0.9), point(3, 0.6, vote_average=2.0)]
+    ids, scores = vectorized(retriever, dense, [])
+    expected = {
+        1: retriever.dense_weight * 0.4 + retriever.rating_weight * 0.9,
+        2: retriever.dense_weight * 0.9,
+        3: retriever.dense_weight * 0.6 + retriever.rating_weight * 0.2,
+    }
+    assert ids == sorted(expected, key=expected.get, reverse=True)
+    np.testing.assert_allclose(scores, [expected[i] for i in ids])
+
+
+def test_disjoint_dense_and_sparse(retriever):
+    dense = [point(i, 1.0 - i / 10, popularity=i, vote_average=5) for i in range(1, 6)]
+    sparse = [point(i, float(i), popularity=i, vote_average=6) for i in range(10, 16)]
+    assert_same_ranking(retriever, dense, sparse)
+
+
+def test_only_dense_or_only_sparse(retriever):
+    hits = [point(i, i / 7, popularity=i * 3, vote_average=i % 10) for i in range(1, 8)]
+    assert_same_ranking(retriever, hits, [])
+    assert_same_ranking(retriever, [], hits)
+
+
+@pytest.mark.parametrize("extra", [-3, -1, 0])
+def test_candidate_count_at_or_below_top_k(retriever, extra):
+    n = retriever.top_k + extra
+    rng = random.Random(extra)
+    dense = [point(i, rng.random(), popularity=rng.random() * 100, vote_average=rng.random() * 10) for i in range(n)]
+    assert_same_ranking(retriever, dense, [])
+    assert len(vectorized(retriever, dense, [])[0]) == n
+
+
+def test_empty_candidates(retriever):
+    assert vectorized(retriever, [], []) == ([], [])
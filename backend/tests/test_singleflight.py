@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+
+from app.singleflight import SingleFlight
+
+CHUNKS = 20
+DELAY_S = 0.002
+
+
+class Upstream:
+    # Stand-in for chat_fn: counts calls and streams numbered chunks
+    def __init__(self, chunks: int = CHUNKS, delay_s: float = DELAY_S, fail_after: int | None = None):
+        self.chunks = chunks
+        self.delay_s = delay_s
+        self.fail_after = fail_after
+        self.calls = 0
+        self.cancelled = 0
+
+    async def start(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay_s)  # Admission, classification and retrieval
+        return self._stream()
+
+    async def _stream(self):
+        try:
+            for i in range(self.chunks):
+                if self.fail_after is not None and i == self.fail_after:
+                    raise RuntimeError("upstream failed")
+                await asyncio.sleep(self.delay_s)
+                yield f"chunk {i} "
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+async def collect(stream, limit: int | None = None) -> list[str]:
+    chunks = []
+    try:
+        async for chunk in stream:
+            chunks.append(chunk)
+            if limit is not None and len(chunks) >= limit:
+                break
+    finally:
+        await stream.aclose()
+    return chunks
+
+
+def key(question: str = "Movies like Heat", history=None, genres=None):
+    return SingleFlight.key(question, history, "movies", genres, None, (1970, 2025))
+
+
+EXPECTED = [f"chunk {i} " for i in range(CHUNKS)]
+
+
+@pytest.mark.parametrize("subscribers", [2, 50])
+def test_duplicates_share_one_upstream_call(subscribers):
+    async def run():
+        flight, upstream = SingleFlight(), Upstream()
+        results = await asyncio.gather(
+            *(collect(flight.subscribe(key(), upstream.start)) for _ in range(subscribers))
+        )
+        return flight, upstream, results
+
+    flight, upstream, results = asyncio.run(run())
+    assert upstream.calls == 1
+    assert all(result == EXPECTED for result in results)
+    assert flight.stats() == {
+        "in_flight": 0,
+        "subscribers": 0,
+        "leader": 1,
+        "follower": subscribers - 1,
+        "abandoned": 0,
+    }
+
+
+def test_late_joiner_gets_chunks_streamed_so_far():
+    async def run():
+        flight, upstream = SingleFlight(), Upstream()
+        first = flight.subscribe(key(), upstream.start)
+        seen = [await anext(first) for _ in range(CHUNKS // 2)]
+        late = await collect(flight.subscribe(key(), upstream.start))
+        return upstream, late, seen + await collect(first)
+
+    upstream, late, first = asyncio.run(run())
+    assert upstream.calls == 1
+    assert late == first == EXPECTED
+
+
+def test_distinct_questions_and_filters_get_their_own_upstream():
+    async def run():
+        flight, upstream = SingleFlight(), Upstream()
+        keys = [key(), key("  movies LIKE heat "), key(genres=["Crime"]), key("Something else")]
+        await asyncio.gather(*(collect(flight.subscribe(k, upstream.start)) for k in keys))
+        return upstream
+
+    assert asyncio.run(run()).calls == 3  # The first two normalize to the same question
+
+
+def test_chat_history_is_never_coalesced():
+    assert key(history=[{"role": "user", "content": "Hi"}]) is None
+
+
+def test_one_disconnect_does_not_interrupt_the_others():
+    async def run():
+        flight, upstream = SingleFlight(), Upstream()
+        early, full = await asyncio.gather(
+            collect(flight.subscribe(key(), upstream.start), limit=2),
+            collect(flight.subscribe(key(), upstream.start)),
+        )
+        return upstream, early, full
+
+    upstream, early, full = asyncio.run(run())
+    assert early == EXPECTED[:2]
+    assert full == EXPECTED
+    assert upstream.cancelled == 0
+
+
+def test_upstream_cancelled_once_every_subscriber_left():
+    async def run():
+        flight, upstream = SingleFlight(), Upstream()
+        await asyncio.gather(*(collect(flight.subscribe(key(), upstream.start), limit=2) for _ in range(3)))
+        await asyncio.sleep(DELAY_S * 2)
+        return flight, upstream
+
+    flight, upstream = asyncio.run(run())
+    assert upstream.cancelled == 1
+    assert flight.stats()["in_flight"] == 0
+    assert flight.requests["abandoned"] == 1
+
+
+def test_upstream_error_reaches_every_subscriber_and_is_not_reused():
+    async def run():
+        flight, upstream = SingleFlight(), Upstream(fail_after=3)
+        results = await asyncio.gather(
+            *(collect(flight.subscribe(key(), upstream.start)) for _ in range(5)), return_exceptions=True
+        )
+        upstream.fail_after = None
+        retry = await collect(flight.subscribe(key(), upstream.start))
+        return upstream, results, retry
+
+    upstream, results, retry = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert retry == EXPECTED
+    assert upstream.calls == 2